@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Entity archetypes.
+
+Costs, timers, upgrade factors, symbols, colors and visibility radii of
+the entities are defined in a JSON (or TOML) file, archetypes.json by
+default. The file is validated and compiled once into flat tables: the
+stats of a building at every level are precomputed, so an upgrade is a
+table lookup.
+
+A building level is derived from the previous one as:
+  health = health_per_level * level
+  production_rate = int(previous * production_factor)
+  maintenance_cost = previous + level
+  timer = max(timer_min, previous - timer_step)
+and its upgrade and recover costs follow the economy cost formulas.
+
+`use` swaps the active archetypes, e.g. to sweep over configs, and keeps
+the matching Settings constants in sync.
+"""
+
+from collections import namedtuple
+from pathlib import Path
+import json
+
+from .settings import Settings
+from .economy import cost_table, upgrade_cost, recover_cost
+
+DEFAULT_PATH = Path(__file__).with_name("archetypes.json")
+
+BUILDING_KEYS = (
+    "cost",
+    "health",
+    "health_per_level",
+    "production_rate",
+    "production_factor",
+    "maintenance_cost",
+    "timer",
+    "timer_step",
+    "timer_min",
+    "symbols",
+    "colors",
+)
+KIND_KEYS = ("cost", "visibility")
+
+# Settings constants mirrored from the archetypes: name -> (table, kind)
+SETTINGS = {
+    "MINE_INITIAL_COST": ("cost", "Mine"),
+    "CANNON_INITIAL_COST": ("cost", "Cannon"),
+    "SATELITE_INITIAL_COST": ("cost", "Satelite"),
+    "LANTERN_INITIAL_COST": ("cost", "Lantern"),
+    "PLAYER_VISIBILITY": ("visibility", "Player"),
+    "BASE_VISIBILITY": ("visibility", "Base"),
+    "LINTERN_VISIBILITY": ("visibility", "Lantern"),
+    "SATELITE_VISIBILITY": ("visibility", "Satelite"),
+    "ENEMY_VISIBILITY": ("visibility", "Zombie"),
+}
+
+Level = namedtuple(
+    "Level",
+    (
+        "symbol",
+        "color",
+        "health",
+        "production_rate",
+        "maintenance_cost",
+        "timer",
+        "upgrade_cost",
+        "recover_cost",
+    ),
+)
+
+
+class Archetypes:
+    """
+    Compiled archetypes: `levels[kind][level]` are the stats of a building
+    kind at a level (index 0 is unused), `cost[kind]` and
+    `visibility[kind]` the flat stats of every kind.
+    """
+
+    def __init__(self, max_level, levels, cost, visibility, source=None):
+        self.max_level = max_level
+        self.levels = levels
+        self.cost = cost
+        self.visibility = visibility
+        self.source = source
+
+    def level(self, kind, level) -> Level:
+        table = self.levels[kind]
+        return table[max(1, min(level, self.max_level))]
+
+
+def read(path=DEFAULT_PATH) -> dict:
+    """
+    raw archetypes definition from a .json or .toml file
+    """
+    path = Path(path)
+    if path.suffix == ".toml":
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError("TOML archetypes need Python 3.11 or later")
+        with path.open("rb") as f:
+            return tomllib.load(f)
+
+    with path.open() as f:
+        return json.load(f)
+
+
+def _number(where, key, value, minimum=0):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{where}: {key} must be a number")
+    if value < minimum:
+        raise ValueError(f"{where}: {key} must be at least {minimum}")
+    return value
+
+
+def validate(definition: dict) -> dict:
+    """
+    checks a raw definition, raising ValueError on the first problem
+    """
+    max_level = definition.get("max_level")
+    if isinstance(max_level, bool) or not isinstance(max_level, int):
+        raise ValueError("max_level must be an integer")
+    if max_level < 1:
+        raise ValueError("max_level must be at least 1")
+
+    for section, keys in (("buildings", BUILDING_KEYS), ("kinds", KIND_KEYS)):
+        for kind, stats in definition.get(section, {}).items():
+            where = f"{section}.{kind}"
+            unknown = set(stats).difference(keys)
+            if unknown:
+                raise ValueError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+
+            if section == "buildings":
+                missing = set(keys).difference(stats)
+                if missing:
+                    raise ValueError(
+                        f"{where}: missing keys {', '.join(sorted(missing))}"
+                    )
+
+                for key in keys[:-2]:
+                    _number(where, key, stats[key])
+                # level 1 runs on timer itself, and economy.py divides by it
+                _number(where, "timer", stats["timer"], minimum=1)
+                _number(where, "timer_min", stats["timer_min"], minimum=1)
+                if stats["timer"] < stats["timer_min"]:
+                    raise ValueError(f"{where}: timer must be at least timer_min")
+
+                if len(stats["symbols"]) != max_level:
+                    raise ValueError(f"{where}: symbols needs one per level")
+
+                if not stats["colors"] or stats["colors"][0][0] != 1:
+                    raise ValueError(f"{where}: colors must start at level 1")
+            else:
+                for key, value in stats.items():
+                    _number(where, key, value)
+
+    kinds = set(definition.get("buildings", {})).union(definition.get("kinds", {}))
+    missing = set(kind for _, kind in SETTINGS.values()).difference(kinds)
+    if missing:
+        raise ValueError(f"missing kinds {', '.join(sorted(missing))}")
+
+    return definition
+
+
+def _levels(stats, max_level) -> tuple:
+    colors = sorted(stats["colors"])
+    table = [None]
+
+    health = stats["health"]
+    rate = stats["production_rate"]
+    upkeep = stats["maintenance_cost"]
+    timer = stats["timer"]
+
+    for level in range(1, max_level + 1):
+        if level > 1:
+            health = stats["health_per_level"] * level
+            rate = int(rate * stats["production_factor"])
+            upkeep = upkeep + level
+            timer = max(stats["timer_min"], timer - stats["timer_step"])
+
+        color = [c for start, c in colors if start <= level][-1]
+        table.append(
+            Level(
+                symbol=stats["symbols"][level - 1],
+                color=color,
+                health=health,
+                production_rate=rate,
+                maintenance_cost=upkeep,
+                timer=timer,
+                upgrade_cost=upgrade_cost(stats["cost"], level),
+                recover_cost=recover_cost(stats["cost"], level),
+            )
+        )
+
+    return tuple(table)
+
+
+def compile(definition: dict, source=None) -> Archetypes:
+    """
+    validates a raw definition and compiles its lookup tables
+    """
+    validate(definition)
+    max_level = definition["max_level"]
+
+    levels, cost, visibility = {}, {}, {}
+    for kind, stats in definition.get("buildings", {}).items():
+        levels[kind] = _levels(stats, max_level)
+        cost[kind] = stats["cost"]
+
+    for kind, stats in definition.get("kinds", {}).items():
+        if "cost" in stats:
+            cost[kind] = stats["cost"]
+        if "visibility" in stats:
+            visibility[kind] = stats["visibility"]
+
+    return Archetypes(max_level, levels, cost, visibility, source)
+
+
+def load(path=DEFAULT_PATH) -> Archetypes:
+    return compile(read(path), source=str(path))
+
+
+def settings(archetypes: Archetypes) -> dict:
+    """
+    values of the Settings constants mirrored from archetypes
+    """
+    values = {"MAX_BUILDING_LEVEL": archetypes.max_level}
+    for name, (table, kind) in SETTINGS.items():
+        values[name] = getattr(archetypes, table)[kind]
+    return values
+
+
+def active() -> Archetypes:
+    return ACTIVE
+
+
+def use(archetypes: Archetypes):
+    """
+    makes archetypes the active ones, for the entities built from now on
+    """
+    global ACTIVE
+
+    ACTIVE = archetypes
+    for name, value in settings(archetypes).items():
+        setattr(Settings, name, value)
+    cost_table.cache_clear()
+
+
+ACTIVE = None
+use(load())
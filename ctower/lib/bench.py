@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput benchmark.
+
+Runs a fixed number of ticks on synthetic worlds (see scenarios) and
+reports, for each scenario, the ticks per second, the frame time
+percentiles and the peak resident memory, as JSON, so that runs on
+different commits can be compared. With --gc, it reports the entity
+allocations with and without the entity pool instead, and with --cadence
+the frame time spread with the zombies moved all at once and in cohorts.
+With --record, the rendered frame times with and without recording them,
+and with --host the number of sessions one multi-session host keeps at
+Settings.FPS, each probe lasting --ticks frames.
+"""
+
+from .scenarios import SCENARIOS, build, spec_of
+from .render import NullBackend, AnsiBackend
+from .recording import CastWriter, record as recorded
+from .host import Host, NullTransport
+from .pool import EntityPool
+from .settings import Settings
+import multiprocessing
+import tracemalloc
+import argparse
+import statistics
+import resource
+import asyncio
+import tempfile
+import platform
+import time
+import json
+import sys
+import gc
+import os
+
+
+def percentile(values, p):
+    """
+    p-th percentile (nearest rank) of values
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def peak_rss_kb() -> int:
+    """
+    peak resident set size of this process, in KiB
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes everywhere else
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def bench(spec, ticks=1000, render=False, name=None, cohorts=None, record=False):
+    """
+    runs ticks on the world described by spec, returns the measures.
+
+    A frame is one tick, plus drawing on a NullBackend when render is True
+    (or on an AnsiBackend writing to os.devnull when it is "ansi"),
+    recorded to a temporary cast when record is True. Zombies are moved in
+    Settings.ENEMY_COHORTS cohorts unless cohorts is given.
+    """
+    spec = spec_of(spec)
+    t0 = time.perf_counter()
+    game = build(spec)
+    setup = time.perf_counter() - t0
+
+    if cohorts is not None:
+        game.enemy_cohorts = cohorts
+
+    writer = devnull = None
+    if render == "ansi":
+        devnull = open(os.devnull, "wb")
+        game.backend = AnsiBackend(devnull, spec["height"], spec["width"])
+    elif render:
+        game.backend = NullBackend(spec["height"], spec["width"])
+    if render and record:
+        cast = tempfile.NamedTemporaryFile(suffix=".cast", delete=False)
+        cast.close()
+        writer = CastWriter(cast.name, spec["height"], spec["width"])
+        game.backend = recorded(game.backend, writer)
+
+    frame_times = []
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        start = time.perf_counter()
+        game.tick()
+        if render:
+            game.render_all()
+            game.print_stats()
+            game.backend.flush()
+        frame_times.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - t0
+
+    if devnull is not None:
+        devnull.close()
+
+    cast = {}
+    if writer is not None:
+        writer.close()
+        cast = {
+            "cast_events": writer.events,
+            "cast_kb": writer.bytes / 1024,
+            "encode_ms_per_frame": 1000 * writer.busy / max(writer.frames, 1),
+        }
+        os.remove(writer.path)
+
+    return {
+        "scenario": name,
+        "spec": spec,
+        "ticks": ticks,
+        "render": render,
+        "cohorts": game.enemy_cohorts,
+        "setup_s": setup,
+        "elapsed_s": elapsed,
+        "ticks_per_second": ticks / elapsed if elapsed > 0 else float("inf"),
+        "frame_ms_p50": 1000 * percentile(frame_times, 50),
+        "frame_ms_p99": 1000 * percentile(frame_times, 99),
+        "frame_ms_max": 1000 * max(frame_times, default=0.0),
+        "frame_ms_stdev": 1000 * statistics.pstdev(frame_times or [0.0]),
+        "peak_rss_kb": peak_rss_kb(),
+        "enemies_left": len(game.enemies),
+        **cast,
+    }
+
+
+def gc_pressure(spec, ticks=10000, pooled=True, name=None):
+    """
+    runs ticks on the world described by spec, with or without reusing
+    the transient entities, and measures the garbage collector pressure:
+    the memory blocks allocated for entities each tick (traced by
+    tracemalloc), the gc generation 0 collections, and the pool counters
+    """
+    spec = spec_of(spec)
+    game = build(spec)
+    game.pool = EntityPool() if pooled else EntityPool(limit=0)
+
+    # entities are allocated by the pool, or by the entities module
+    sites = [
+        tracemalloc.Filter(True, "*/ctower/lib/pool.py"),
+        tracemalloc.Filter(True, "*/ctower/lib/entities.py"),
+    ]
+    blocks = size = 0
+    collections = gc.get_stats()[0]["collections"]
+
+    tracemalloc.start()
+    try:
+        for _ in range(ticks):
+            game.tick()
+            snapshot = tracemalloc.take_snapshot().filter_traces(sites)
+            for stat in snapshot.statistics("filename"):
+                blocks += stat.count
+                size += stat.size
+            tracemalloc.clear_traces()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "ticks": ticks,
+        "pooled": pooled,
+        "entity_blocks_allocated": blocks,
+        "entity_kb_allocated": size / 1024,
+        "gc_gen0_collections": gc.get_stats()[0]["collections"] - collections,
+        "pool": game.pool.stats(),
+    }
+
+
+def _bench(args):
+    return bench(*args)
+
+
+def recording(spec, ticks=1000, render=True, name=None):
+    """
+    frame times with and without recording the frames, on an AnsiBackend
+    (recorded from its output) and on a NullBackend (recorded from its
+    cell writes); the overhead counts the time of the writer thread
+    """
+    keys = ("frame_ms_p50", "frame_ms_p99", "ticks_per_second")
+    report = {"scenario": name, "ticks": ticks}
+    for backend in ("ansi", True):
+        plain = bench(spec, ticks, backend, name)
+        cast = bench(spec, ticks, backend, name, record=True)
+        report["ansi" if backend == "ansi" else "null"] = {
+            "plain": {key: plain[key] for key in keys},
+            "recorded": {
+                key: cast[key]
+                for key in keys + ("cast_events", "cast_kb", "encode_ms_per_frame")
+            },
+            "overhead": plain["ticks_per_second"] / cast["ticks_per_second"] - 1,
+        }
+    return report
+
+
+def cadence(spec, ticks=1000, render=False, name=None):
+    """
+    frame time spread with the zombies moved all at once, and in
+    Settings.ENEMY_COHORTS round-robin cohorts
+    """
+    runs = [
+        bench(spec, ticks, render, name, cohorts)
+        for cohorts in (1, Settings.ENEMY_COHORTS)
+    ]
+    keys = ("frame_ms_p50", "frame_ms_p99", "frame_ms_max", "frame_ms_stdev")
+    return {
+        "scenario": name,
+        "ticks": ticks,
+        "render": render,
+        **{
+            f"cohorts_{run['cohorts']}": {key: run[key] for key in keys} for run in runs
+        },
+    }
+
+
+def hosted(spec, sessions, seconds):
+    """
+    plays sessions games of the world described by spec (with seeds of
+    their own) on one Host for seconds, returns the measures
+    """
+    spec = spec_of(spec)
+    host = Host(spec["height"], spec["width"])
+    for i in range(sessions):
+        game = build(dict(spec, seed=spec["seed"] + i))
+        # the world is built already, the session plays it as a resumed one
+        game.resumed = True
+        host.open(NullTransport(), game)
+
+    async def play():
+        task = asyncio.ensure_future(host.run())
+        await asyncio.sleep(seconds)
+        task.cancel()
+
+    t0 = time.perf_counter()
+    asyncio.run(play())
+    elapsed = time.perf_counter() - t0
+
+    rates = [s.pacer.ticks / elapsed for s in host.sessions]
+    frames = sum(s.pacer.frames for s in host.sessions)
+    dropped = sum(s.pacer.dropped + s.congested for s in host.sessions)
+    return {
+        "sessions": sessions,
+        "ticks_per_second_min": min(rates),
+        "ticks_per_second_mean": statistics.mean(rates),
+        "frames_dropped": dropped / max(frames + dropped, 1),
+        "busy": host.busy / elapsed,
+        "late_ms_p99": 1000 * percentile(list(host.late), 99),
+        "errors": host.errors,
+    }
+
+
+def sustained(probe) -> bool:
+    """
+    True if every session kept its tick rate, with few frames dropped
+    """
+    return (
+        probe["ticks_per_second_min"] >= 0.98 * Settings.FPS
+        and probe["frames_dropped"] <= 0.05
+        and probe["errors"] == 0
+    )
+
+
+def hosting(spec, ticks=1000, name=None, limit=512):
+    """
+    largest number of sessions (up to limit) of the world described by
+    spec that one Host sustains at Settings.FPS, doubling the sessions
+    until it can not, then bisecting; every probe lasts ticks frames
+    """
+    seconds = ticks / Settings.FPS
+    probes = []
+    best, worst = 0, limit + 1
+    sessions = 1
+    while worst - best > 1:
+        probe = hosted(spec, sessions, seconds)
+        probes.append(probe)
+        if sustained(probe):
+            best = sessions
+        else:
+            worst = sessions
+        if worst > limit:
+            sessions = min(2 * sessions, limit)
+            if sessions == best:
+                break
+        else:
+            sessions = (best + worst) // 2
+
+    return {
+        "scenario": name,
+        "ticks": ticks,
+        "fps": Settings.FPS,
+        "sessions_sustained": best,
+        "probes": probes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="ctower-bench", description="Benchmark ctower on synthetic worlds"
+    )
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        metavar="SCENARIO",
+        help=f"scenarios to run, from {', '.join(SCENARIOS)} (default: all)",
+    )
+    parser.add_argument(
+        "--spec",
+        metavar="PATH",
+        action="append",
+        default=[],
+        help="JSON file with a scenario spec, can be repeated",
+    )
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument(
+        "--render", action="store_true", help="draw every tick on a null backend"
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="run every scenario in this process (peak RSS is then cumulative)",
+    )
+    parser.add_argument(
+        "--gc",
+        action="store_true",
+        help="measure the allocations of entities, with and without the pool",
+    )
+    parser.add_argument(
+        "--cadence",
+        action="store_true",
+        help="compare the frame times with and without zombie cohorts",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="compare the rendered frame times with and without recording",
+    )
+    parser.add_argument(
+        "--host",
+        action="store_true",
+        help="find how many sessions one multi-session host sustains",
+    )
+    parser.add_argument("--output", metavar="PATH", help="write the JSON to PATH")
+    args = parser.parse_args()
+
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario: {name}")
+
+    jobs = [
+        (name, args.ticks, args.render, name)
+        for name in (args.scenarios or ([] if args.spec else list(SCENARIOS)))
+    ]
+    for path in args.spec:
+        with open(path) as f:
+            jobs.append((json.load(f), args.ticks, args.render, path))
+
+    if args.gc:
+        results = [
+            gc_pressure(spec, ticks, pooled, name)
+            for spec, ticks, _, name in jobs
+            for pooled in (False, True)
+        ]
+    elif args.cadence:
+        results = [cadence(*job) for job in jobs]
+    elif args.record:
+        results = [recording(*job) for job in jobs]
+    elif args.host:
+        results = [hosting(spec, ticks, name) for spec, ticks, _, name in jobs]
+    elif args.in_process:
+        results = [_bench(job) for job in jobs]
+    else:
+        # a fresh process per scenario, so each peak RSS is its own
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(1, maxtasksperchild=1) as pool:
+            results = pool.map(_bench, jobs, chunksize=1)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+Scripted players for automated load and soak testing.
+
+A bot receives an Observation of the world every tick and returns a list
+of action names from Game.ACTIONS, which are run as if typed on the
+keyboard. `run` drives a headless game with a bot as fast as possible.
+"""
+
+from dataclasses import dataclass
+from .settings import Settings
+import argparse
+import random
+import json
+import math
+import time
+
+MOVES = {
+    (0, -1): "move_left",
+    (1, 0): "move_down",
+    (-1, 0): "move_up",
+    (0, 1): "move_right",
+}
+
+
+@dataclass(frozen=True)
+class Observation:
+    tick: int
+    y: int
+    x: int
+    health: int
+    gold: int
+    bombs: int
+    points: int
+    level: int
+    base: tuple
+    base_deployed: bool
+    base_health: int
+    limits: tuple
+    enemies: tuple
+    mountains: tuple
+    buildings: tuple
+    fruits: tuple
+    here: str = None
+
+
+def observe(game, tick=0, radius=Settings.ENEMY_VISIBILITY) -> Observation:
+    """
+    builds the observation of the world seen by the player of game
+    """
+    player = game.player
+
+    def near(entities):
+        return tuple(
+            (e.y, e.x)
+            for e in entities
+            if abs(e.y - player.y) <= radius and abs(e.x - player.x) <= radius
+        )
+
+    buildings = tuple(
+        (b.kind, b.y, b.x, b.level) for b in game.mines + game.cannons + game.satelites
+    )
+    here = next(
+        (kind for kind, y, x, _ in buildings if (y, x) == (player.y, player.x)),
+        None,
+    )
+
+    return Observation(
+        tick=tick,
+        y=player.y,
+        x=player.x,
+        health=player.health,
+        gold=game.base.gold,
+        bombs=player.bombs,
+        points=player.points,
+        level=player.level,
+        base=(game.base.y, game.base.x),
+        base_deployed=game.base.deployed,
+        base_health=game.base.health,
+        limits=game.screen_limits,
+        enemies=near(game.enemies),
+        mountains=tuple((m.y, m.x) for m in game.mountains),
+        buildings=buildings,
+        fruits=near(game.fruits),
+        here=here,
+    )
+
+
+def step_towards(obs, y, x):
+    """
+    returns the move action that brings the player closer to (y, x), or None
+    """
+    dy, dx = y - obs.y, x - obs.x
+    if dy == dx == 0:
+        return None
+    if abs(dy) >= abs(dx):
+        return MOVES[(int(math.copysign(1, dy)), 0)]
+    return MOVES[(0, int(math.copysign(1, dx)))]
+
+
+class Bot:
+    """
+    Base bot, does nothing
+    """
+
+    name = "idle"
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        """
+        forgets any state about the previous world
+        """
+        pass
+
+    def act(self, obs: Observation) -> list:
+        return []
+
+
+class RandomBot(Bot):
+    """
+    Mashes keys: mostly moves, sometimes any other action
+    """
+
+    name = "random"
+    ACTIONS = [
+        "build_base",
+        "build_mine",
+        "build_cannon",
+        "build_lantern",
+        "upgrade_building",
+        "sell_building",
+        "throw_bomb",
+        "deploy_trap",
+    ]
+
+    def act(self, obs):
+        if self.rng.random() < 0.8:
+            return [self.rng.choice(list(MOVES.values()))]
+        return [self.rng.choice(self.ACTIONS)]
+
+
+class GreedyMinerBot(Bot):
+    """
+    Deploys the base next to a mountain and then builds and upgrades mines
+    around the mountains closest to it, all gold goes to mining
+    """
+
+    name = "greedy-miner"
+
+    def reset(self):
+        self.target = None
+        self.failed = set()
+
+    def _camp(self, obs):
+        """
+        a spot two cells away from the mountain closest to the player
+        """
+        min_y, max_y, _, _ = obs.limits
+        y, x = min(
+            obs.mountains, key=lambda m: (m[0] - obs.y) ** 2 + (m[1] - obs.x) ** 2
+        )
+        return (y + 2 if y + 2 <= max_y else y - 2), x
+
+    def _sites(self, obs):
+        taken = {(y, x) for _, y, x, _ in obs.buildings}
+        taken |= set(obs.mountains) | self.failed | {obs.base}
+        by, bx = obs.base
+        return sorted(
+            (
+                (y + dy, x + dx)
+                for y, x in obs.mountains
+                for dy in (-1, 0, 1)
+                for dx in (-1, 0, 1)
+                if (y + dy, x + dx) not in taken
+                and (y + dy - by) ** 2 + (x + dx - bx) ** 2 <= 100
+            ),
+            key=lambda c: (c[0] - obs.y) ** 2 + (c[1] - obs.x) ** 2,
+        )
+
+    def mine(self, obs):
+        """
+        next actions of the mining strategy
+        """
+        if not obs.base_deployed:
+            if self.target is None:
+                self.target = self._camp(obs)
+            move = step_towards(obs, *self.target)
+            if move is not None:
+                return [move]
+            self.target = None
+            return ["build_base"]
+
+        level = next(
+            (lvl for _, y, x, lvl in obs.buildings if (y, x) == (obs.y, obs.x)), 0
+        )
+        if obs.here == "Mine" and level < Settings.MAX_BUILDING_LEVEL:
+            self.target = None
+            return ["upgrade_building"]
+
+        if self.target is None:
+            sites = self._sites(obs)
+            if not sites:
+                return []
+            self.target = sites[0]
+
+        move = step_towards(obs, *self.target)
+        if move is not None:
+            return [move]
+
+        if obs.gold < Settings.MINE_INITIAL_COST:
+            return []
+
+        # a site is tried once (it may be too close to another mountain)
+        self.failed.add(self.target)
+        self.target = None
+        return ["build_mine"]
+
+    def act(self, obs):
+        return self.mine(obs)
+
+
+class TurtleBot(GreedyMinerBot):
+    """
+    Stays at home: after a first mine, surrounds the base with cannons and
+    lanterns, keeping enough gold for another mine, and bombs any zombie
+    that comes too close
+    """
+
+    name = "turtle"
+    RING = [(dy, dx) for dy in (-2, 0, 2) for dx in (-2, 0, 2) if (dy, dx) != (0, 0)]
+
+    def reset(self):
+        super().reset()
+        self.slot = 0
+
+    def act(self, obs):
+        if not any(kind == "Mine" for kind, _, _, _ in obs.buildings):
+            return self.mine(obs)
+
+        actions = []
+        if obs.bombs > 0 and any(
+            (y - obs.y) ** 2 + (x - obs.x) ** 2 <= 4 for y, x in obs.enemies
+        ):
+            actions.append("throw_bomb")
+
+        by, bx = obs.base
+        dy, dx = self.RING[self.slot % len(self.RING)]
+        move = step_towards(obs, by + dy, bx + dx)
+        reserve = Settings.MINE_INITIAL_COST
+
+        if move is not None:
+            actions.append(move)
+
+        elif obs.here is not None:
+            actions.append("upgrade_building")
+            self.slot += 1
+
+        elif obs.gold >= reserve + Settings.CANNON_INITIAL_COST:
+            actions.append("build_cannon")
+            if obs.gold >= reserve + 100:
+                actions.append("build_lantern")
+
+        else:
+            self.slot += 1
+
+        return actions
+
+
+BOTS = {bot.name: bot for bot in (Bot, RandomBot, GreedyMinerBot, TurtleBot)}
+
+
+def run(game, bot, ticks, restart=True):
+    """
+    drives game with bot for a number of ticks, starting a new world each
+    time a game is over (or stopping, if restart is False).
+
+    returns a dict of run statistics
+    """
+    outcomes = {"gameover": 0, "gamewon": 0}
+    t0 = time.perf_counter()
+
+    for tick in range(ticks):
+        actions = bot.act(observe(game, tick))
+        game.tick(*[game.ACTIONS[action] for action in actions])
+
+        if game.outcome is not None:
+            outcomes[game.outcome] += 1
+            if not restart:
+                break
+            game.init()
+            bot.reset()
+
+    elapsed = time.perf_counter() - t0
+
+    return {
+        "bot": bot.name,
+        "ticks": tick + 1,
+        "elapsed": elapsed,
+        "ticks_per_second": (tick + 1) / elapsed if elapsed > 0 else float("inf"),
+        "outcomes": outcomes,
+    }
+
+
+def main():
+    from ctower.main import Game
+
+    parser = argparse.ArgumentParser(description="Soak test ctower with a bot")
+    parser.add_argument("--bot", choices=sorted(BOTS), default="random")
+    parser.add_argument("--ticks", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--size", type=int, nargs=2, default=(40, 160))
+    args = parser.parse_args()
+
+    game = Game.headless(*args.size, seed=args.seed)
+    print(json.dumps(run(game, BOTS[args.bot](args.seed), args.ticks)))
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from .settings import Settings
+
+POLICIES = ("merge", "throttle", "cull")
+
+
+class EntityCaps:
+    """
+    Keeps the number of transient entities bounded.
+
+    Past the soft cap, zombies are degraded with one of the POLICIES:
+      - merge: zombies close to each other become a single zombie, with the
+        sum of their levels and health
+      - throttle: spawners slow down as the horde grows towards the hard cap
+      - cull: the oldest zombies are removed
+    The hard cap is never exceeded: spawners stop, and in any case the
+    oldest zombies are culled. Fruits and bombs to pick have their own cap,
+    the oldest disappear first.
+    """
+
+    def __init__(
+        self,
+        soft=Settings.ENEMY_SOFT_CAP,
+        hard=Settings.ENEMY_HARD_CAP,
+        policy=Settings.ENEMY_CAP_POLICY,
+        merge_radius=Settings.ENEMY_MERGE_RADIUS,
+        fruits=Settings.FRUIT_CAP,
+        bombs=Settings.BOMB_CAP,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown entity cap policy: {policy}")
+
+        self.soft = soft
+        self.hard = max(soft, hard)
+        self.policy = policy
+        self.merge_radius = merge_radius
+        self.fruits = fruits
+        self.bombs = bombs
+
+        self.merged = 0
+        self.culled = 0
+        self.throttled = 0
+
+    def allow_spawn(self, game) -> bool:
+        """
+        returns False if a spawner should not spawn now
+        """
+        n = len(game.enemies)
+        if n >= self.hard:
+            self.throttled += 1
+            return False
+
+        if n >= self.soft and self.policy == "throttle":
+            if game.rng.random() < (n - self.soft) / (self.hard - self.soft + 1):
+                self.throttled += 1
+                return False
+
+        return True
+
+    def enforce(self, game):
+        """
+        applies the caps to the entities of game
+        """
+        if len(game.enemies) > self.soft:
+            if self.policy == "merge":
+                self.merge(game)
+            elif self.policy == "cull":
+                self.cull(game, self.soft)
+
+        if len(game.enemies) > self.hard:
+            self.cull(game, self.hard)
+
+        for items, cap in ((game.fruits, self.fruits), (game.bombs_topick, self.bombs)):
+            if len(items) > cap:
+                for item in items[: len(items) - cap]:
+                    game.clear(item)
+                    game.pool.release(item)
+                del items[: len(items) - cap]
+
+    def cull(self, game, cap):
+        excess = len(game.enemies) - cap
+        for enemy in game.enemies[:excess]:
+            game.clear(enemy)
+            game.pool.release(enemy)
+        del game.enemies[:excess]
+        self.culled += excess
+
+    def merge(self, game):
+        """
+        merges the zombies sharing a block of merge_radius x merge_radius
+        cells into the oldest of them, until the horde is under the soft cap
+        """
+        r = self.merge_radius
+        excess = len(game.enemies) - self.soft
+
+        groups = {}
+        for enemy in game.enemies:
+            groups.setdefault((enemy.y // r, enemy.x // r), []).append(enemy)
+
+        absorbed = set()
+        for group in groups.values():
+            if excess <= 0:
+                break
+
+            leader, followers = group[0], group[1 : excess + 1]
+            for enemy in followers:
+                leader.level += enemy.level
+                leader.health += enemy.health
+                absorbed.add(id(enemy))
+                game.clear(enemy)
+            excess -= len(followers)
+
+        if absorbed:
+            for enemy in game.enemies:
+                if id(enemy) in absorbed:
+                    game.pool.release(enemy)
+            game.enemies[:] = [e for e in game.enemies if id(e) not in absorbed]
+            self.merged += len(absorbed)
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import time
+
+
+class WallClock:
+    """
+    Game clock following the system time, used when playing live
+    """
+
+    def now(self) -> float:
+        return time.time()
+
+    def advance(self, dt: float):
+        pass
+
+
+class SimClock:
+    """
+    Game clock that only moves when the simulation advances it, so headless
+    runs are deterministic and not limited by real time
+    """
+
+    def __init__(self, t0: float = 0.0):
+        self.t = t0
+
+    def now(self) -> float:
+        return self.t
+
+    def advance(self, dt: float):
+        self.t += dt
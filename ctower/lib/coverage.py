@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from .settings import Settings
+
+
+class CoverageGraph:
+    """
+    Dependency graph between buildings (mines, cannons) and the providers
+    (the base and satelites) whose influence they were built under.
+
+    Edges are added incrementally when a building or a provider is built,
+    and removed when they are sold or destroyed, so finding the buildings
+    that collapse with a provider costs O(dependents). A building covered
+    by more than one provider survives the loss of any of them.
+    """
+
+    def __init__(self, reach=None):
+        self.reach = Settings.SATELITE_VISIBILITY if reach is None else reach
+        self.dependents = {}  # id(provider) -> {id(building): building}
+        self.providers = {}  # id(building) -> set of id(provider)
+
+    def __len__(self):
+        return len(self.providers)
+
+    def covers(self, provider, building) -> bool:
+        return provider.distance(building) <= self.reach
+
+    def add_provider(self, provider, buildings=()):
+        """
+        adds provider and links it to the buildings in its reach
+        """
+        dependents = self.dependents.setdefault(id(provider), {})
+        for building in buildings:
+            if self.covers(provider, building):
+                dependents[id(building)] = building
+                self.providers.setdefault(id(building), set()).add(id(provider))
+
+    def add_building(self, building, providers=()):
+        """
+        adds building and links it to every provider in reach
+        """
+        linked = self.providers.setdefault(id(building), set())
+        for provider in providers:
+            if id(provider) in self.dependents and self.covers(provider, building):
+                self.dependents[id(provider)][id(building)] = building
+                linked.add(id(provider))
+
+    def remove_building(self, building):
+        for provider in self.providers.pop(id(building), ()):
+            self.dependents[provider].pop(id(building), None)
+
+    def remove_provider(self, provider) -> list:
+        """
+        removes provider, returns the buildings left without any provider
+        """
+        uncovered = []
+        for key, building in self.dependents.pop(id(provider), {}).items():
+            linked = self.providers.get(key)
+            if linked is None:
+                continue
+            linked.discard(id(provider))
+            if not linked:
+                uncovered.append(building)
+        return uncovered
+
+    def dependents_of(self, provider) -> list:
+        return list(self.dependents.get(id(provider), {}).values())
+
+    def providers_of(self, building) -> int:
+        """
+        number of providers covering building
+        """
+        return len(self.providers.get(id(building), ()))
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+from array import array
+from functools import lru_cache
+from .settings import Settings
+import time
+
+
+@lru_cache(maxsize=None)
+def cost_table(base_cost: int) -> tuple:
+    """
+    returns (upgrade, recover) cost tuples indexed by building level,
+    computed once per base cost for levels 1..Settings.MAX_BUILDING_LEVEL
+    """
+    levels = range(0, Settings.MAX_BUILDING_LEVEL + 1)
+
+    upgrade = tuple(base_cost + base_cost * (2 ** (lvl - 1)) for lvl in levels)
+
+    recover = [0]
+    for lvl in levels[1:]:
+        recover.append(recover[-1] + int(base_cost + base_cost * (2 ** (lvl - 2))) // 2)
+
+    return upgrade, tuple(recover)
+
+
+def upgrade_cost(base_cost: int, level: int) -> int:
+    upgrade, _ = cost_table(base_cost)
+    if 0 < level < len(upgrade):
+        return upgrade[level]
+    return base_cost + base_cost * (2 ** (level - 1))
+
+
+def recover_cost(base_cost: int, level: int) -> int:
+    _, recover = cost_table(base_cost)
+    if 0 < level < len(recover):
+        return recover[level]
+    return sum(
+        int(base_cost + base_cost * (2 ** (lvl - 2))) // 2
+        for lvl in range(1, level + 1)
+    )
+
+
+class Economy:
+    """
+    Ledger of gold producing (Mine) and gold consuming (Cannon) buildings.
+
+    Timers, clocks, income and upkeep live in flat arrays indexed like
+    `self.buildings`, so a whole tick is settled in a single pass and the
+    gold balance is touched once per tick.
+    """
+
+    def __init__(self):
+        self.buildings = []
+        self.clocks = array("d")
+        self.timers = array("d")
+        self.income = array("q")
+        self.upkeep = array("q")
+        self.gold_per_second = 0.0
+
+    def __len__(self):
+        return len(self.buildings)
+
+    def _rate(self, idx):
+        return (self.income[idx] - self.upkeep[idx]) / self.timers[idx]
+
+    def _columns(self, building):
+        if building.kind == "Mine":
+            return int(building.dig_value), 0
+        return 0, int(building.maintenance_cost)
+
+    def register(self, building):
+        income, upkeep = self._columns(building)
+        self.buildings.append(building)
+        self.clocks.append(building.clock)
+        self.timers.append(building.timer)
+        self.income.append(income)
+        self.upkeep.append(upkeep)
+        self.gold_per_second += self._rate(len(self.buildings) - 1)
+
+    def unregister(self, building):
+        """
+        removes building from the ledger (swap with last row), noop if unknown
+        """
+        for idx, b in enumerate(self.buildings):
+            if b is building:
+                break
+        else:
+            return
+
+        self.gold_per_second -= self._rate(idx)
+
+        last = len(self.buildings) - 1
+        columns = (self.buildings, self.clocks, self.timers, self.income, self.upkeep)
+        for column in columns:
+            column[idx] = column[last]
+            column.pop()
+
+        if len(self.buildings) == 0:
+            self.gold_per_second = 0.0
+
+    def refresh(self, building):
+        """
+        updates the ledger row of a building after its stats changed (upgrade)
+        """
+        for idx, b in enumerate(self.buildings):
+            if b is building:
+                self.gold_per_second -= self._rate(idx)
+                self.timers[idx] = building.timer
+                self.income[idx], self.upkeep[idx] = self._columns(building)
+                self.gold_per_second += self._rate(idx)
+                return
+
+    def clear(self):
+        self.__init__()
+
+    def settle(self, base, now=None):
+        """
+        pays every mine whose timer elapsed and charges the upkeep of every
+        cannon whose timer elapsed.
+
+        returns (fired, unpaid): cannons ready to shoot this tick, and the
+        subset of them whose maintenance could not be paid
+        """
+        now = time.time() if now is None else now
+
+        clocks, timers = self.clocks, self.timers
+        income, upkeep = self.income, self.upkeep
+
+        produced = 0
+        fired = []
+        for idx in range(len(self.buildings)):
+            if now - clocks[idx] > timers[idx]:
+                clocks[idx] = now
+                building = self.buildings[idx]
+                building.clock = now
+                if building.kind == "Cannon":
+                    fired.append(idx)
+                else:
+                    produced += income[idx]
+
+        gold = base.gold + produced
+        unpaid = []
+        for idx in fired:
+            if gold < upkeep[idx]:
+                unpaid.append(self.buildings[idx])
+            else:
+                gold -= upkeep[idx]
+
+        base.gold = gold
+
+        return [self.buildings[idx] for idx in fired], unpaid
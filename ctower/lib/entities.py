@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from dataclasses import dataclass, field
 from .settings import Settings
+from .economy import upgrade_cost, recover_cost
+from . import archetypes
 import time
 import math
 
@@ -20,6 +22,7 @@ class Entity:
     visible: bool = True
     level: int = 10
     health: int = 10
+    pooled: bool = field(default=False, repr=False, compare=False)
 
     def distance(self, other):
         """
@@ -38,93 +41,141 @@ class Mountain(Entity):
 
 @dataclass
 class Building(Entity):
+    """
+    Stats left to None are taken from the archetypes table of its kind at
+    its level, see archetypes.py
+    """
+
     base_cost: int = 50
     production_rate: int = 1.5
-    production_factor: int = 1.5
     maintenance_cost: int = 1
     timer: int = 5
     clock: float = field(default_factory=time.time)
     visible: bool = True
 
+    STATS = (
+        "symbol",
+        "color",
+        "health",
+        "production_rate",
+        "maintenance_cost",
+        "timer",
+    )
+
+    def __post_init__(self):
+        table = archetypes.active()
+        if self.kind not in table.levels:
+            return
+
+        row = table.level(self.kind, self.level)
+        for name in self.STATS:
+            if getattr(self, name) is None:
+                setattr(self, name, getattr(row, name))
+        if self.base_cost is None:
+            self.base_cost = table.cost[self.kind]
+
+    def _row(self):
+        """
+        archetypes table row of this building, if its costs follow it
+        """
+        table = archetypes.active()
+        if (
+            self.kind in table.levels
+            and 0 < self.level <= table.max_level
+            and self.base_cost == table.cost[self.kind]
+        ):
+            return table.levels[self.kind][self.level]
+        return None
+
     def cost_to_upgrade(self):
-        return self.base_cost + self.base_cost * (2 ** (self.level - 1))
+        row = self._row()
+        if row is None:
+            return upgrade_cost(self.base_cost, self.level)
+        return row.upgrade_cost
 
     def cost_to_recover(self):
-        return sum(
-            int(self.base_cost + self.base_cost * (2 ** (lvl - 2))) // 2
-            for lvl in range(1, self.level + 1)
-        )
-
-    def _process(self):
-        if time.time() - self.clock > self.timer:
-            self.clock = time.time()
+        row = self._row()
+        if row is None:
+            return recover_cost(self.base_cost, self.level)
+        return row.recover_cost
+
+    def _process(self, now=None):
+        now = time.time() if now is None else now
+        if now - self.clock > self.timer:
+            self.clock = now
             return True
         else:
             return False
 
+    def pending(self, now=None):
+        now = time.time() if now is None else now
+        return f"{self.timer - (now - self.clock):0.2}"
+
     @property
     def time_pending(self):
-        return f"{self.timer - (time.time() - self.clock):0.2}"
+        return self.pending()
 
     def upgrade(self):
-        self.level += 1
-        self.health = 5 * self.level
-        self.production_rate = int(self.production_rate * self.production_factor)
-        self.maintenance_cost += self.level
-        self.timer = max(1, self.timer - 0.5)
-        self._update_symbol()
-
-    def _update_symbol(self):
+        table = archetypes.active()
+        self.level = min(self.level + 1, table.max_level)
+        row = table.level(self.kind, self.level)
+        for name in self.STATS:
+            setattr(self, name, getattr(row, name))
+
+    def migrate(self):
         """
-        define in each instance of building if different
+        takes the stats and cost of its level in the active archetypes,
+        keeping the health it has left, up to the health of the level
         """
-        pass
+        table = archetypes.active()
+        if self.kind not in table.levels:
+            return
+
+        health = self.health
+        self.level = min(self.level, table.max_level)
+        row = table.level(self.kind, self.level)
+        for name in self.STATS:
+            setattr(self, name, getattr(row, name))
+        self.health = min(health, row.health)
+        self.base_cost = table.cost[self.kind]
 
 
 @dataclass
 class Mine(Building):
     kind: str = "Mine"
-    symbol: str = "1"
+    symbol: str = None
+    color: int = None
     resource: str = "Gold"
     level: int = 1
-    health: int = 5
-    production_factor: float = Settings.MINE_PRODUCTION_FACTOR
-    production_rate: float = Settings.MINE_PRODUCTION_RATE
-    maintenance_cost: int = Settings.MINE_MAINTENANCE_COST
-    timer: int = Settings.MINE_TIMER
+    health: int = None
+    base_cost: int = None
+    production_rate: float = None
+    maintenance_cost: int = None
+    timer: int = None
 
-    def dig_success(self):
-        return self._process()
+    def dig_success(self, now=None):
+        return self._process(now)
 
     @property
     def dig_value(self):
         return self.production_rate * self.level
 
-    def _update_symbol(self):
-        self.symbol = str(self.level)
-        if self.level > 2:
-            self.color = 15
-
 
 @dataclass
 class Cannon(Building):
     kind: str = "Cannon"
-    symbol: str = "I"
+    symbol: str = None
+    color: int = None
     level: int = 1
     kills: int = 0
-    health: int = 6
-    production_factor: float = Settings.CANNON_PRODUCTION_FACTOR  # factor for upgrade
-    production_rate: float = Settings.CANNON_PRODUCTION_RATE  # distance
-    timer: int = Settings.CANNON_TIMER  # speed
-
-    def shot_success(self):
-        return self._process()
+    health: int = None
+    base_cost: int = None
+    production_rate: float = None  # distance
+    maintenance_cost: int = None
+    timer: int = None  # speed
 
-    def _update_symbol(self):
-        symbols = "I V X D I V X D C".split(" ")
-        self.symbol = symbols[self.level - 1]
-        if self.level > 4:
-            self.color = 15
+    def shot_success(self, now=None):
+        return self._process(now)
 
 
 @dataclass
@@ -134,6 +185,7 @@ class Enemy(Entity):
     color: int = 5
     health: int = 2
     level: int = 1
+    uid: int = 0
 
     def move(self, new_y, new_x):
         self.y = new_y
@@ -148,8 +200,10 @@ class Spawner(Entity):
     level: int = 10
     color: int = 5
 
-    def spawn(self):
-        return Enemy(self.y, self.x)
+    def spawn(self, uid=0, pool=None):
+        if pool is None:
+            return Enemy(self.y, self.x, uid=uid)
+        return pool.acquire(Enemy, self.y, self.x, uid=uid)
 
 
 @dataclass
@@ -235,10 +289,13 @@ class Bomb(Entity):
             <= s
         )
 
-    @property
-    def is_kaboom(self):
+    def explodes(self, now=None):
         """
         check if timer is over and returns True to handle bomb self destruction, or False otherwise
         """
+        now = time.time() if now is None else now
+        return now - self.t0 > self.timer
 
-        return time.time() - self.t0 > self.timer
+    @property
+    def is_kaboom(self):
+        return self.explodes()
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-session host.
+
+Plays many games in one process. One asyncio event loop reads the keys
+of every connected terminal: TCP or Unix socket clients in raw mode,
+e.g. `socat -,raw,echo=0 TCP:localhost:7777`. A scheduler task on the
+same loop steps the games. Each game has its own world, random
+generator, clock and frame pacer, and draws with an AnsiBackend writing
+to its connection.
+
+The scheduler wakes on a grid of 1 / Settings.FPS, or when a key
+arrives. It steps each due session in turn: the ticks it is due, as the
+pacer of Game.loop counts them, then a render frame. It yields to the
+event loop after each session, so the connections are served in between
+and one game never holds the others for longer than its time slice.
+Idle games are stepped every Settings.IDLE_TIMEOUT, or when a key
+arrives, as Game.loop waits for them. A session whose connection does
+not keep up gets its frames dropped until its output drains. Messages
+(pause, help, game over) stay on screen without blocking the others.
+
+Settings and archetypes are shared by all the games of a host.
+"""
+
+from collections import deque
+import traceback
+import argparse
+import asyncio
+import random
+import time
+import math
+import sys
+
+from .settings import Settings
+from .clock import SimClock
+from .pacing import FramePacer
+from .render import AnsiBackend
+from .inputs import decode
+
+# bytes waiting to be sent to a client before its frames are dropped
+OUTPUT_LIMIT = 256 * 1024
+
+
+class Output:
+    """
+    Binary stream over an asyncio transport, for an AnsiBackend
+    """
+
+    def __init__(self, transport, limit=OUTPUT_LIMIT):
+        self.transport = transport
+        self.limit = limit
+        self.bytes = 0
+
+    def write(self, data):
+        if not self.transport.is_closing():
+            self.transport.write(data)
+            self.bytes += len(data)
+
+    def flush(self):
+        # the transport sends on its own, without blocking the loop
+        pass
+
+    @property
+    def congested(self) -> bool:
+        return self.transport.get_write_buffer_size() > self.limit
+
+
+class NullTransport:
+    """
+    Transport of a client reading everything at once, for load tests
+    """
+
+    def __init__(self):
+        self.closed = False
+
+    def write(self, data):
+        pass
+
+    def get_write_buffer_size(self) -> int:
+        return 0
+
+    def is_closing(self) -> bool:
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+class Session:
+    """
+    A game played on one connection
+    """
+
+    def __init__(self, game, transport, rows, cols):
+        self.game = game
+        self.transport = transport
+        self.output = Output(transport)
+        self.backend = AnsiBackend(self.output, rows, cols)
+
+        game.hosted = True
+        game.sound = False
+        game.attach(self.backend)
+        self.pacer = game.pacer = FramePacer()
+
+        self.wake = 0.0  # perf_counter time the session is due
+        self.closed = False
+        self.congested = 0  # frames dropped for a slow connection
+
+    def feed(self, data):
+        for key in decode(data):
+            self.game.inputs.feed(key)
+        self.wake = 0.0
+
+    def step(self, now):
+        """
+        runs the ticks due, then a render frame
+        """
+        game = self.game
+        if game.prompt is not None:
+            keys = game.inputs.keys
+            while keys and game.prompt is not None:
+                game.dismiss(keys.popleft())
+            if game.prompt is not None:
+                # nothing moves until the key arrives
+                self.wake = math.inf
+                return
+            if game.outcome is not None:
+                self.close()
+                return
+
+        ticks = self.pacer.due()
+        for i in range(ticks):
+            # Every key received is processed along with the first tick
+            game.tick(*(game.inputs.commands() if i == 0 else []))
+            if game.prompt is not None or game.outcome is not None:
+                break
+
+        if game.outcome == "quit":
+            self.close()
+            return
+
+        if game.outcome in ("gameover", "gamewon") and game.prompt is None:
+            # shows the message, the session ends once it is answered
+            getattr(game, game.outcome)()
+
+        if ticks > 0 and game.prompt is None and self.pacer.render():
+            if self.output.congested:
+                self.congested += 1
+            else:
+                game.present(game.snapshot())
+
+        if game.is_idle():
+            self.wake = now + self.pacer.idle_timeout
+        else:
+            self.wake = self.pacer.next_tick
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if not self.transport.is_closing():
+            self.backend.close()
+            self.transport.close()
+
+
+class Host:
+    def __init__(self, rows=40, cols=160, max_sessions=0):
+        self.rows = rows
+        self.cols = cols
+        self.max_sessions = max_sessions
+        self.sessions = []
+        self.dt = 1 / Settings.FPS
+        self.wakeup = None  # asyncio.Event, created on the loop
+        self.turn = 0
+
+        self.busy = 0.0  # seconds spent stepping the sessions
+        self.steps = 0
+        self.errors = 0
+        self.late = deque(maxlen=60 * Settings.FPS)  # seconds late of the wakes
+
+    def open(self, transport, game=None) -> Session:
+        """
+        starts a session on transport, playing game or a new one
+        """
+        if game is None:
+            from ctower.main import Game
+
+            game = Game(rng=random.Random(), clock=SimClock(time.time()))
+
+        session = Session(game, transport, self.rows, self.cols)
+        self.sessions.append(session)
+        self.wake()
+        return session
+
+    def wake(self):
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    async def connected(self, reader, writer):
+        if self.max_sessions and len(self.sessions) >= self.max_sessions:
+            writer.write(b"ctower: the host is full, try again later\r\n")
+            writer.close()
+            return
+
+        session = self.open(writer.transport)
+        try:
+            while not session.closed:
+                data = await reader.read(1024)
+                if not data:
+                    break
+                session.feed(data)
+                self.wake()
+        except ConnectionError:
+            pass
+        finally:
+            session.close()
+
+    def step(self, session, now):
+        t0 = time.perf_counter()
+        try:
+            session.step(now)
+        except Exception:
+            # one broken game does not take the others down
+            self.errors += 1
+            traceback.print_exc()
+            session.close()
+        self.busy += time.perf_counter() - t0
+        self.steps += 1
+
+    async def run(self):
+        """
+        steps the sessions, forever
+        """
+        self.wakeup = asyncio.Event()
+        t0 = time.perf_counter()
+        # the sessions opened before the host runs start along with it
+        for session in self.sessions:
+            session.pacer.reset()
+
+        while True:
+            now = time.perf_counter()
+            sessions = [s for s in self.sessions if s.wake <= now]
+            if sessions:
+                # a different session goes first each frame
+                self.turn = (self.turn + 1) % len(sessions)
+                for session in sessions[self.turn :] + sessions[: self.turn]:
+                    if not session.closed:
+                        self.step(session, now)
+                        await asyncio.sleep(0)
+            self.sessions = [s for s in self.sessions if not s.closed]
+
+            # sleeps until the frame of the earliest session, or a key
+            wake = min((s.wake for s in self.sessions), default=math.inf)
+            self.wakeup.clear()
+            if wake == math.inf:
+                await self.wakeup.wait()
+                continue
+
+            target = t0 + math.ceil((wake - t0) / self.dt) * self.dt
+            timeout = target - time.perf_counter()
+            if timeout <= 0:
+                await asyncio.sleep(0)
+                continue
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                self.late.append(max(0.0, time.perf_counter() - target))
+
+    async def serve(self, bind="127.0.0.1", port=7777, path=None):
+        if path is not None:
+            server = await asyncio.start_unix_server(self.connected, path)
+        else:
+            server = await asyncio.start_server(self.connected, bind, port)
+        async with server:
+            await self.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="ctower-host", description="Host many ctower games in one process"
+    )
+    parser.add_argument("--bind", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument(
+        "--unix", metavar="PATH", help="listen on a Unix socket at PATH instead"
+    )
+    parser.add_argument("--rows", type=int, default=40, help="terminal rows")
+    parser.add_argument("--cols", type=int, default=160, help="terminal columns")
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=0,
+        metavar="N",
+        help="turn away clients beyond N sessions (default: no limit)",
+    )
+    args = parser.parse_args()
+
+    host = Host(args.rows, args.cols, args.max_sessions)
+    where = args.unix or f"{args.bind}:{args.port}"
+    sys.stderr.write(f"ctower-host: serving on {where}\n")
+    try:
+        asyncio.run(host.serve(args.bind, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Status lines under the map.
+
+The HUD is split in segments (player coordinates, the place the player
+stands on, and the status line). Each segment is formatted again only when
+the values it shows change, and drawn again only when its text changes, so
+a player standing still costs a few tuple comparisons per frame.
+
+Formatting (`segments`) reads the game, drawing (`paint`) only the texts,
+so they can run on different threads.
+"""
+
+from itertools import chain
+
+# columns of the segments in the two status rows
+COORD_X = 5
+PLACE_X = 21
+STATUS_X = 23
+
+
+class Hud:
+    def __init__(self):
+        self.keys = {}  # segment name -> values it was formatted with
+        self.texts = {}  # segment name -> formatted text
+        self.shown = {}  # (y, x) -> text on screen
+        self.places_key = None
+        self.places = {}
+        self.redrawn = 0
+
+    def place(self, game):
+        """
+        the mine, cannon, mountain, satelite or base on the player cell
+        """
+        game.placement.update(game)
+        key = (id(game.placement), game.placement.key)
+        if key != self.places_key:
+            self.places = {}
+            for entity in chain(
+                game.mines, game.cannons, game.mountains, game.satelites, [game.base]
+            ):
+                self.places.setdefault((entity.y, entity.x), entity)
+            self.places_key = key
+
+        return self.places.get((game.player.y, game.player.x))
+
+    def draw(self, game, backend):
+        """
+        draws the segments that changed since the last frame, returns how
+        many of them were drawn
+        """
+        return self.paint(backend, self.segments(game))
+
+    def segments(self, game) -> tuple:
+        """
+        (y, x, text) of every segment
+        """
+        player, base = game.player, game.base
+        y = game.max_y + 2
+
+        coord = self._format(
+            "coord", (player.y, player.x), self.coord_text, player.y, player.x
+        )
+
+        place = self.place(game)
+        buildable = ()
+        if place is None:
+            if base.deployed:
+                buildable = game.placement.buildable(game, player.y, player.x)
+            key = (None, buildable)
+        elif place.kind in ("Mine", "Cannon"):
+            key = (
+                id(place),
+                place.level,
+                place.health,
+                place.kills if place.kind == "Cannon" else place.production_rate,
+                place.pending(game.now),
+            )
+        else:
+            key = (id(place), place.level, place.health)
+        place = self._format("place", key, self.place_text, place, game.now, buildable)
+
+        key = (
+            player.level,
+            player.health,
+            player.points,
+            base.health,
+            base.gold,
+            game.economy.gold_per_second,
+            len(game.enemies),
+            player.bombs,
+        )
+        status = self._format("status", key, self.status_text, *key)
+
+        return (
+            (y, COORD_X, coord),
+            (y, PLACE_X, place),
+            (y + 1, STATUS_X, status),
+        )
+
+    def _format(self, name, key, render, *args) -> str:
+        if self.keys.get(name, self) != key:
+            self.texts[name] = render(*args)
+            self.keys[name] = key
+        return self.texts[name]
+
+    def paint(self, backend, segments) -> int:
+        """
+        draws the segments whose text changed, padding shorter texts to
+        erase the previous one, returns how many were drawn
+        """
+        redrawn = 0
+        for y, x, text in segments:
+            old = self.shown.get((y, x))
+            if old == text:
+                continue
+            old = old or ""
+            backend.text(y, x, text + max(0, len(old) - len(text)) * " ")
+            self.shown[y, x] = text
+            redrawn += 1
+
+        self.redrawn += redrawn
+        return redrawn
+
+    @staticmethod
+    def coord_text(y, x):
+        return f"Coord: ({y:3},{x:3})"
+
+    @staticmethod
+    def place_text(place, now, buildable=()):
+        if place is None:
+            return f"  Can build: {', '.join(buildable)}" if buildable else ""
+
+        text = f"  Place: {place.kind}, lvl: {place.level}, health: {place.health}"
+
+        if place.kind == "Mine":
+            text += f", production: {place.production_rate}, cost to (u)pgrade: {place.cost_to_upgrade()}, (s)ell for {place.cost_to_recover()}"
+            text += f"  Time: {place.pending(now)}"
+
+        elif place.kind == "Cannon":
+            text += (
+                f", kills: {place.kills}, cost to (u)pgrade: {place.cost_to_upgrade()}"
+            )
+            text += f"  Time: {place.pending(now)}"
+
+        return text
+
+    @staticmethod
+    def status_text(level, health, points, base_health, gold, rate, enemies, bombs):
+        text = f"Level: {level:2}     "
+        text += f"Health: {health:3}     "
+        text += f"Points: {points:3}     "
+        text += f"Base Health: {base_health:3}     "
+        text += f"Gold: {gold:4} ({rate:+.1f}/s)     "
+        text += f"Enemies: {enemies:3}     "
+        text += f"Bombs: {bombs:3}"
+        return text
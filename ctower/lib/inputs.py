@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Keyboard input stage.
+
+Every pending key is drained each frame. Runs of movement keys are
+coalesced into a single displacement, while discrete actions keep their
+order, so auto-repeated keys never pile up behind the frame rate.
+
+Keys can be read by curses getch from the game loop, or by an asyncio
+reader on its own thread (`AsyncKeyReader`), decoding the terminal bytes
+itself, so reading input does not wait for the frame pacing.
+"""
+
+from collections import deque
+import threading
+import asyncio
+import curses
+import os
+
+# terminal escape sequences of the special keys used by the game
+ESCAPE_SEQUENCES = {
+    b"\x1b[A": curses.KEY_UP,
+    b"\x1b[B": curses.KEY_DOWN,
+    b"\x1b[C": curses.KEY_RIGHT,
+    b"\x1b[D": curses.KEY_LEFT,
+    b"\x1bOA": curses.KEY_UP,
+    b"\x1bOB": curses.KEY_DOWN,
+    b"\x1bOC": curses.KEY_RIGHT,
+    b"\x1bOD": curses.KEY_LEFT,
+    b"\x1bOP": curses.KEY_F1,
+    b"\x1b[11~": curses.KEY_F1,
+}
+
+
+def decode(data: bytes) -> list:
+    """
+    returns the curses key codes typed in data
+    """
+    keys = []
+    i = 0
+    while i < len(data):
+        for seq, key in ESCAPE_SEQUENCES.items():
+            if data.startswith(seq, i):
+                keys.append(key)
+                i += len(seq)
+                break
+        else:
+            keys.append(data[i])
+            i += 1
+    return keys
+
+
+class InputPipeline:
+    """
+    Queue of raw keys turned into the commands of one tick.
+
+    `moves` maps movement keys to a (dy, dx) step and `move` applies a
+    displacement; `bindings` maps any other key to its command.
+    """
+
+    def __init__(self, bindings, moves, move, max_keys=256):
+        self.bindings = bindings
+        self.moves = moves
+        self.move = move
+        self.max_keys = max_keys
+        self.keys = deque()
+        self.last = []  # keys turned into commands by the last call
+        self.arrived = threading.Event()
+
+        self.received = 0
+        self.coalesced = 0
+
+    def feed(self, key):
+        if key == curses.ERR:
+            return
+        self.keys.append(key)
+        self.received += 1
+        self.arrived.set()
+
+    def drain(self, screen):
+        """
+        reads every key already waiting on a curses screen
+        """
+        screen.timeout(0)
+        for _ in range(self.max_keys):
+            key = screen.getch()
+            if key == curses.ERR:
+                break
+            self.feed(key)
+
+    def wait(self, timeout):
+        """
+        waits up to timeout seconds for a key to arrive
+        """
+        if not self.keys:
+            self.arrived.wait(timeout)
+        self.arrived.clear()
+
+    def pop(self, timeout=None):
+        """
+        returns the next raw key, waiting up to timeout seconds, or curses.ERR
+        """
+        if not self.keys and timeout != 0:
+            self.wait(timeout)
+        return self.keys.popleft() if self.keys else curses.ERR
+
+    def commands(self) -> list:
+        """
+        returns the commands for the keys received since the last call
+        """
+        commands = []
+        dy = dx = 0
+        steps = 0
+        self.last = []
+
+        while self.keys:
+            key = self.keys.popleft()
+            self.last.append(key)
+            if key in self.moves:
+                ky, kx = self.moves[key]
+                dy, dx = dy + ky, dx + kx
+                steps += 1
+                continue
+
+            if steps:
+                commands.append(self._displacement(dy, dx, steps))
+                dy = dx = steps = 0
+
+            if key in self.bindings:
+                commands.append(self.bindings[key])
+
+        if steps:
+            commands.append(self._displacement(dy, dx, steps))
+
+        return commands
+
+    def _displacement(self, dy, dx, steps):
+        self.coalesced += steps - 1
+        return lambda: self.move(dy=dy, dx=dx)
+
+
+class AsyncKeyReader:
+    """
+    Reads keys from a terminal file descriptor on an asyncio event loop
+    running in a background thread, and feeds them to an InputPipeline
+    """
+
+    def __init__(self, pipeline, fd=0):
+        self.pipeline = pipeline
+        self.fd = fd
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.add_reader(self.fd, self._on_readable)
+        self.loop.run_forever()
+        self.loop.remove_reader(self.fd)
+        self.loop.close()
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 1024)
+        except OSError:
+            data = b""
+
+        if not data:
+            self.loop.remove_reader(self.fd)
+            return
+
+        for key in decode(data):
+            self.pipeline.feed(key)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Crash safe session journal.
+
+A session directory holds:
+  journal.jsonl  append-only JSON lines: the keys of every tick that got
+                 input, a tick mark every second, the checkpoints taken,
+                 and the gaps left by dropped records
+  checkpoint     the latest checkpoint, a zlib compressed pickle of the
+                 world state at a tick, replaced atomically
+
+Ticks are deterministic for a given state and input, so the state at the
+last journaled tick is rebuilt by loading the checkpoint and replaying
+the journal records that follow it.
+
+A new journal is never started over an existing one unless asked to
+(overwrite), so a session that could be resumed is not lost.
+
+Records are handed to a writer thread through a bounded queue, so the
+game loop never waits on the disk: the writer batches the fsync calls,
+and when the queue is full the record is dropped instead. A gap is then
+journaled, which ends the replay, until the next checkpoint (taken right
+away) makes the journal whole again.
+"""
+
+from .settings import Settings
+import threading
+import pickle
+import queue
+import json
+import time
+import zlib
+import os
+
+JOURNAL = "journal.jsonl"
+CHECKPOINT = "checkpoint"
+VERSION = 1
+
+CLOSE = object()
+
+
+class Journal:
+    def __init__(
+        self,
+        directory,
+        resume=False,
+        overwrite=False,
+        capacity=Settings.JOURNAL_CAPACITY,
+        fsync_interval=Settings.JOURNAL_FSYNC_INTERVAL,
+        checkpoint_interval=Settings.CHECKPOINT_INTERVAL,
+    ):
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, JOURNAL)
+        self.checkpoint_path = os.path.join(self.directory, CHECKPOINT)
+        if not resume and not overwrite and os.path.exists(self.path):
+            raise FileExistsError(f"{self.path} holds a journaled game")
+
+        self.fsync_interval = fsync_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.queue = queue.Queue(capacity)
+
+        self.last_mark = 0
+        self.last_checkpoint = None
+        self.lost = 0  # records dropped, ever
+        self.lost_at_checkpoint = 0
+        self.written = 0
+        self.syncs = 0
+        self.checkpoints = 0
+
+        if resume:
+            self.file = open(self.path, "a+")
+            # a crash may have left half a line, the next record starts anew
+            if self.file.tell() > 0:
+                self.file.seek(self.file.tell() - 1)
+                if self.file.read(1) != "\n":
+                    self.file.write("\n")
+        else:
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+            self.file = open(self.path, "w")
+            self.file.write(json.dumps({"version": VERSION, "started": time.time()}))
+            self.file.write("\n")
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _put(self, record) -> bool:
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.lost += 1
+            return False
+
+    def input(self, tick, keys):
+        """
+        journals the keys run along with tick
+        """
+        self._put({"t": tick, "keys": list(keys)})
+
+    def mark(self, tick):
+        """
+        journals the tick reached, once per second of game time
+        """
+        if tick - self.last_mark >= Settings.FPS:
+            if self._put({"t": tick}):
+                self.last_mark = tick
+
+    def due(self, tick) -> bool:
+        """
+        True when a checkpoint should be taken at tick
+        """
+        return (
+            self.last_checkpoint is None
+            or self.lost > self.lost_at_checkpoint
+            or tick - self.last_checkpoint >= self.checkpoint_interval
+        )
+
+    def invalidate(self):
+        """
+        makes a checkpoint due right away, e.g. when the settings changed and
+        the journal before it no longer replays the same
+        """
+        self.last_checkpoint = None
+
+    def checkpoint(self, tick, state: bytes):
+        """
+        saves state, the pickled world at tick, in the writer thread
+        """
+        lost = self.lost
+        if self._put((tick, state)):
+            self.last_checkpoint = tick
+            self.lost_at_checkpoint = lost
+
+    def _write_checkpoint(self, tick, state):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(zlib.compress(state))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        self.checkpoints += 1
+        return {"t": tick, "checkpoint": True}
+
+    def _run(self):
+        lost = 0
+        synced = time.monotonic()
+        pending = False
+        closing = False
+
+        while not closing:
+            try:
+                batch = [self.queue.get(timeout=self.fsync_interval)]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            force = False
+            for record in batch:
+                if record is CLOSE:
+                    closing = force = True
+                    continue
+
+                if self.lost != lost:
+                    # records were dropped since the last one written
+                    lost = self.lost
+                    self.file.write('{"gap": true}\n')
+
+                if isinstance(record, tuple):
+                    record = self._write_checkpoint(*record)
+                    force = True
+
+                self.file.write(json.dumps(record, separators=(",", ":")))
+                self.file.write("\n")
+                self.written += 1
+                pending = True
+
+            now = time.monotonic()
+            if pending and (force or now - synced >= self.fsync_interval):
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.syncs += 1
+                synced = now
+                pending = False
+
+    def close(self, tick=None):
+        """
+        journals the last tick reached, and waits for every record to be
+        on disk
+        """
+        if not self.thread.is_alive():
+            return
+        if tick is not None:
+            self.queue.put({"t": tick})
+        self.queue.put(CLOSE)
+        self.thread.join()
+        self.file.close()
+
+
+def load(directory) -> tuple:
+    """
+    returns (state, inputs, end) to resume the session saved in directory:
+    the world state of the latest checkpoint, the journaled keys
+    by tick after it, and the last tick to replay up to. Raises
+    FileNotFoundError when there is no checkpoint.
+    """
+    directory = os.path.expanduser(directory)
+    with open(os.path.join(directory, CHECKPOINT), "rb") as f:
+        state = pickle.loads(zlib.decompress(f.read()))
+    tick = state["tick"]
+
+    inputs = {}
+    end = tick
+    following = False
+    path = os.path.join(directory, JOURNAL)
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # half written by a crash
+
+            if record.get("checkpoint") and record["t"] == tick:
+                following = True
+                inputs.clear()
+                end = tick
+
+            elif not following:
+                continue
+
+            elif record.get("gap"):
+                break
+
+            elif "keys" in record:
+                # keys journaled with a tick are run by it
+                inputs[record["t"]] = record["keys"]
+                end = max(end, record["t"] + 1)
+
+            elif "t" in record:
+                end = max(end, record["t"])
+
+    return state, inputs, end
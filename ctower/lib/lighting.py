@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Light compositing.
+
+The lit cells of the screen are kept in a bytearray, one byte per cell,
+row after row. A light source is stamped by writing, for each row of its
+disc kernel, one slice of ones: a few slice assignments per source
+instead of building and merging sets of cells.
+
+Sources that do not move (the base, satelites and lanterns) are stamped
+into a static layer, rebuilt only when the set of sources changes; each
+frame starts from a copy of it and stamps the moving lights (the player)
+on top.
+"""
+
+from functools import lru_cache
+from itertools import compress
+from .placement import disc
+
+DARK, LIT = 0, 1
+INVERT = bytes.maketrans(bytes((DARK, LIT)), bytes((LIT, DARK)))
+
+
+@lru_cache(maxsize=None)
+def kernel(radius: int) -> tuple:
+    """
+    (dy, half width) of each row of the disc of radius
+    """
+    rows = {}
+    for dy, dx in disc(radius):
+        rows[dy] = max(rows.get(dy, 0), dx)
+    return tuple(sorted(rows.items()))
+
+
+class LightMap:
+    def __init__(self, limits):
+        self.min_y, self.max_y, self.min_x, self.max_x = limits
+        self.width = self.max_x - self.min_x + 1
+        self.height = self.max_y - self.min_y + 1
+        self.size = self.width * self.height
+
+        # cell of each byte, to turn a frame back into cells
+        self.cells = [
+            (y, x)
+            for y in range(self.min_y, self.max_y + 1)
+            for x in range(self.min_x, self.max_x + 1)
+        ]
+        self.ones = bytes([LIT]) * self.width
+
+        self.static_sources = None
+        self.static = bytearray(self.size)
+        self.rebuilds = 0
+
+    def stamp(self, frame: bytearray, y: int, x: int, radius: int):
+        """
+        lights the disc of radius around (y, x), clipped to the limits
+        """
+        for dy, half in kernel(radius):
+            row = y + dy
+            if row < self.min_y or row > self.max_y:
+                continue
+            x0 = max(self.min_x, x - half) - self.min_x
+            x1 = min(self.max_x, x + half) - self.min_x + 1
+            if x0 < x1:
+                offset = (row - self.min_y) * self.width
+                frame[offset + x0 : offset + x1] = self.ones[: x1 - x0]
+
+    def compose(self, static_sources, sources) -> bytearray:
+        """
+        frame lit by static_sources and sources, ((y, x), radius) tuples.
+
+        The static layer is cached for as long as the very same
+        static_sources tuple is given.
+        """
+        if static_sources is not self.static_sources:
+            self.static = bytearray(self.size)
+            for (y, x), radius in static_sources:
+                self.stamp(self.static, y, x, radius)
+            self.static_sources = static_sources
+            self.rebuilds += 1
+
+        frame = bytearray(self.static)
+        for (y, x), radius in sources:
+            self.stamp(frame, y, x, radius)
+        return frame
+
+    def lit(self, frame) -> set:
+        return set(compress(self.cells, frame))
+
+    def dark(self, frame) -> set:
+        return set(compress(self.cells, frame.translate(INVERT)))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from functools import lru_cache
+from .placement import disc
+
+
+@lru_cache(maxsize=64)
+def footprint(y: int, x: int, radius: int) -> frozenset:
+    """
+    cells within an (integer truncated) euclidean distance of radius of (y, x)
+    """
+    return frozenset((y + dy, x + dx) for dy, dx in disc(radius))
+
+
+class OccupancyMap:
+    """
+    Cells of the entities zombies can run into: the player, the base, the
+    buildings and the fruits and bombs lying around.
+
+    Lists of entities that do not move are tracked as layers and re-placed
+    only when the list changes, or when the revision of the pool they come
+    from does (a pooled entity taken back and handed out again is the same
+    object, at another cell); single entities that move (the player) are
+    re-placed with `place`, which costs nothing when they stand still.
+    Contact is then a lookup of the cell a zombie moved to, instead of a
+    comparison with every entity.
+    """
+
+    def __init__(self):
+        self.cells = {}  # (y, x) -> list of entities
+        self.where = {}  # id(entity) -> (y, x)
+        self.layers = {}  # layer name -> (key, entities)
+        self.rebuilds = 0
+
+    def __len__(self):
+        return len(self.where)
+
+    def place(self, entity):
+        """
+        adds entity, or moves it to its current cell
+        """
+        cell = (entity.y, entity.x)
+        old = self.where.get(id(entity))
+        if old == cell:
+            return
+        if old is not None:
+            self._discard(old, entity)
+
+        self.where[id(entity)] = cell
+        self.cells.setdefault(cell, []).append(entity)
+
+    def remove(self, entity):
+        cell = self.where.pop(id(entity), None)
+        if cell is not None:
+            self._discard(cell, entity)
+
+    def _discard(self, cell, entity):
+        here = self.cells[cell]
+        here.remove(entity)
+        if not here:
+            del self.cells[cell]
+
+    def layer(self, name, entities, revision=0):
+        """
+        tracks a list of entities that do not move, re-placed only when
+        the list or revision changes
+        """
+        key = (
+            id(entities),
+            len(entities),
+            id(entities[-1]) if entities else None,
+            revision,
+        )
+        cached = self.layers.get(name)
+        if cached is not None and cached[0] == key:
+            return
+
+        if cached is not None:
+            for entity in cached[1]:
+                self.remove(entity)
+        for entity in entities:
+            self.place(entity)
+
+        self.layers[name] = (key, tuple(entities))
+        self.rebuilds += 1
+
+    def at(self, y, x):
+        return self.cells.get((y, x), ())
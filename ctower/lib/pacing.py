@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from .settings import Settings
+import time
+
+
+class FramePacer:
+    """
+    Fixed timestep frame pacing.
+
+    The simulation runs Settings.FPS ticks per second of real time, whatever
+    the time spent in each frame: `due` tells how many ticks to run to catch
+    up, `render` drops render frames while the simulation is behind, and
+    `timeout` is the time left until the next tick (or a longer wait when
+    the world is idle), to be spent blocked waiting for input.
+    """
+
+    def __init__(
+        self,
+        fps=Settings.FPS,
+        max_ticks=Settings.MAX_CATCHUP_TICKS,
+        max_skip=Settings.MAX_FRAMESKIP,
+        idle_timeout=Settings.IDLE_TIMEOUT,
+        timer=time.perf_counter,
+    ):
+        self.dt = 1 / fps
+        self.max_ticks = max_ticks
+        self.max_skip = max_skip
+        self.idle_timeout = idle_timeout
+        self.timer = timer
+
+        self.ticks = 0
+        self.frames = 0
+        self.dropped = 0
+        self.skipped = 0
+
+        self.reset()
+
+    def reset(self):
+        """
+        forgets any pending ticks, e.g. after the game was paused
+        """
+        self.next_tick = self.timer()
+
+    def due(self) -> int:
+        """
+        number of simulation ticks to run now
+        """
+        now = self.timer()
+        if now < self.next_tick:
+            return 0
+
+        n = int((now - self.next_tick) / self.dt) + 1
+        if n > self.max_ticks:
+            # too far behind, the backlog is dropped and the game slows down
+            n = self.max_ticks
+            self.next_tick = now + self.dt
+        else:
+            self.next_tick += n * self.dt
+
+        self.ticks += n
+        return n
+
+    def render(self) -> bool:
+        """
+        True if this frame should be rendered, False to drop it because the
+        simulation is already late for its next tick
+        """
+        if self.timer() >= self.next_tick and self.skipped < self.max_skip:
+            self.skipped += 1
+            self.dropped += 1
+            return False
+
+        self.skipped = 0
+        self.frames += 1
+        return True
+
+    def timeout(self, idle=False) -> int:
+        """
+        milliseconds to wait for input before the next frame
+        """
+        if idle:
+            return int(self.idle_timeout * 1000)
+
+        return max(0, int((self.next_tick - self.timer()) * 1000))
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from functools import lru_cache
+from itertools import chain
+from .settings import Settings
+
+
+@lru_cache(maxsize=None)
+def disc(radius: int) -> tuple:
+    """
+    offsets (dy, dx) within an (integer truncated) euclidean distance of radius
+    """
+    return tuple(
+        (dy, dx)
+        for dy in range(-radius, radius + 1)
+        for dx in range(-radius, radius + 1)
+        if int((dy**2 + dx**2) ** 0.5) <= radius
+    )
+
+
+class PlacementMap:
+    """
+    Cached layer of the cells where a mine or a cannon can be built.
+
+    A cell is eligible for a cannon when it is empty (no building, mountain
+    or base on it) and within reach of the base or a satelite, and for a
+    mine when, in addition, the nearest mountain is at distance 1.
+
+    The layer is rebuilt only after `invalidate` is called, or when the
+    lists of buildings, satelites, mountains or the base are replaced.
+    """
+
+    def __init__(self, reach=None):
+        self.reach = Settings.SATELITE_VISIBILITY if reach is None else reach
+        self.revision = 0
+        self.key = None
+        self.mine_cells = frozenset()
+        self.cannon_cells = frozenset()
+
+    def invalidate(self):
+        self.revision += 1
+
+    def _key(self, game):
+        return (
+            self.revision,
+            id(game.mines),
+            len(game.mines),
+            id(game.cannons),
+            len(game.cannons),
+            id(game.satelites),
+            len(game.satelites),
+            id(game.mountains),
+            len(game.mountains),
+            game.base.deployed,
+            game.base.y,
+            game.base.x,
+        )
+
+    def update(self, game):
+        key = self._key(game)
+        if key == self.key:
+            return
+
+        blocked = set(
+            (e.y, e.x)
+            for e in chain(
+                game.mines, game.cannons, game.satelites, game.mountains, [game.base]
+            )
+        )
+
+        covered = set(
+            (p.y + dy, p.x + dx)
+            for p in chain(game.satelites, [game.base])
+            for dy, dx in disc(self.reach)
+        )
+
+        mountains = set((m.y, m.x) for m in game.mountains)
+        next_to_mountain = set(
+            (m.y + dy, m.x + dx) for m in game.mountains for dy, dx in disc(1)
+        ).difference(mountains)
+
+        self.cannon_cells = frozenset(covered.difference(blocked))
+        self.mine_cells = self.cannon_cells.intersection(next_to_mountain)
+        self.key = key
+
+    def can_build_mine(self, game, y, x) -> bool:
+        self.update(game)
+        return (y, x) in self.mine_cells
+
+    def can_build_cannon(self, game, y, x) -> bool:
+        self.update(game)
+        return (y, x) in self.cannon_cells
+
+    def buildable(self, game, y, x) -> tuple:
+        """
+        kinds of building that can be built on cell (y, x)
+        """
+        self.update(game)
+        return tuple(
+            kind
+            for kind, cells in (
+                ("Mine", self.mine_cells),
+                ("Cannon", self.cannon_cells),
+            )
+            if (y, x) in cells
+        )
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from .settings import Settings
+
+
+class EntityPool:
+    """
+    Free lists of transient entities (zombies, fruits, bombs).
+
+    `acquire` hands out a released instance of the type, reset by running
+    its dataclass __init__ again, or a new one if there is none; `release`
+    takes an instance back once the game has dropped every reference to
+    it. At most `limit` free instances are kept per type, a limit of 0
+    disables the reuse but keeps the stats.
+    """
+
+    def __init__(self, limit=Settings.POOL_LIMIT):
+        self.limit = limit
+        self.free = {}  # type -> list of released instances
+        self.counters = {}  # type -> [created, reused, released, live, high water]
+
+    def _counters(self, kind):
+        counters = self.counters.get(kind)
+        if counters is None:
+            counters = self.counters[kind] = [0, 0, 0, 0, 0]
+        return counters
+
+    def acquire(self, kind, *args, **kwargs):
+        counters = self._counters(kind)
+        free = self.free.get(kind)
+
+        if free:
+            entity = free.pop()
+            entity.__init__(*args, **kwargs)  # also clears entity.pooled
+            counters[1] += 1
+        else:
+            entity = kind(*args, **kwargs)
+            counters[0] += 1
+
+        counters[3] += 1
+        if counters[3] > counters[4]:
+            counters[4] = counters[3]
+        return entity
+
+    def release(self, entity):
+        """
+        takes entity back, releasing it twice is harmless
+        """
+        if entity.pooled:
+            return
+
+        kind = type(entity)
+        counters = self._counters(kind)
+        counters[2] += 1
+        counters[3] = max(0, counters[3] - 1)
+
+        free = self.free.setdefault(kind, [])
+        if len(free) < self.limit:
+            free.append(entity)
+            entity.pooled = True
+
+    def revision(self, kind) -> int:
+        """
+        number of instances of kind handed out or taken back, ever: a
+        released instance may come back elsewhere, as the same object
+        """
+        created, reused, released = self._counters(kind)[:3]
+        return created + reused + released
+
+    def stats(self) -> dict:
+        """
+        counters of each type, by type name
+        """
+        return {
+            kind.__name__: {
+                "created": created,
+                "reused": reused,
+                "released": released,
+                "live": live,
+                "high_water": high_water,
+                "free": len(self.free.get(kind, ())),
+            }
+            for kind, (
+                created,
+                reused,
+                released,
+                live,
+                high_water,
+            ) in self.counters.items()
+        }
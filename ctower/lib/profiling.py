@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Profiling.
+
+A `Profiler` runs the game (`ctower --profile PREFIX`) or a headless
+scenario (`ctower-profile`) under cProfile, and samples the stacks of
+the profiled thread from a thread of its own. Nothing is written while
+the game runs: on exit it writes
+
+  PREFIX.pstats  the cProfile stats, for pstats or snakeviz
+  PREFIX.folded  the sampled stacks, collapsed, one "a;b;c count" line
+                 per stack, for flamegraph.pl or speedscope
+  PREFIX.txt     the call counts and times of the functions usually
+                 looked at (WATCHED), and the top functions
+
+With sample_only, cProfile is left out (and so is its overhead): the
+summary then counts the samples each function shows up in.
+
+Only the thread that started the profiler is profiled, not the render
+or input reader threads.
+"""
+
+from collections import Counter
+from pathlib import Path
+import threading
+import argparse
+import cProfile
+import pstats
+import time
+import sys
+import io
+import os
+
+# (label, file, function name) of the functions the summary reports on;
+# a file of None is a builtin, e.g. a curses window method
+WATCHED = (
+    ("nearby_entities", "main.py", "nearby_entities"),
+    ("surronding_area", "main.py", "surronding_area"),
+    ("Entity.distance", "entities.py", "distance"),
+    ("Game.render", "main.py", "render"),
+    ("addch", None, "addch"),
+)
+
+
+def label(code) -> str:
+    """
+    frame label of a code object, e.g. main.py:Game.tick
+    """
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{os.path.basename(code.co_filename)}:{name}"
+
+
+class StackSampler:
+    """
+    Samples the stack of a thread every interval seconds, and counts the
+    collapsed stacks
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        own = sys._current_frames
+        while not self.stopping.wait(self.interval):
+            frame = own().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    def __init__(self, prefix, sample_only=False, interval=0.005):
+        self.prefix = str(prefix)
+        self.profile = None if sample_only else cProfile.Profile()
+        self.sampler = StackSampler(interval=interval)
+        self.t0 = None
+        self.elapsed = 0.0
+
+    @property
+    def paths(self) -> list:
+        suffixes = (
+            (".folded", ".txt")
+            if self.profile is None
+            else (".pstats", ".folded", ".txt")
+        )
+        return [self.prefix + suffix for suffix in suffixes]
+
+    def start(self):
+        self.t0 = time.perf_counter()
+        self.sampler.start()
+        if self.profile is not None:
+            self.profile.enable()
+        return self
+
+    def stop(self):
+        """
+        stops profiling and writes the files
+        """
+        if self.profile is not None:
+            self.profile.disable()
+        self.sampler.stop()
+        self.elapsed = time.perf_counter() - self.t0
+
+        Path(self.prefix).parent.mkdir(parents=True, exist_ok=True)
+        if self.profile is not None:
+            self.profile.dump_stats(self.prefix + ".pstats")
+        self.sampler.write(self.prefix + ".folded")
+        with open(self.prefix + ".txt", "w") as f:
+            f.write(self.summary())
+            f.write("\n")
+            f.write(self.top())
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def calls(self) -> dict:
+        """
+        label -> (calls, primitive calls, own seconds, cumulative seconds)
+        of the WATCHED functions, from cProfile
+        """
+        counts = {name: (0, 0, 0.0, 0.0) for name, _, _ in WATCHED}
+        stats = pstats.Stats(self.profile).stats
+        for (filename, _, function), (cc, nc, tt, ct, _) in stats.items():
+            for name, file, wanted in WATCHED:
+                if file is None:
+                    found = filename == "~" and function.startswith(
+                        f"<method '{wanted}'"
+                    )
+                else:
+                    found = function == wanted and filename.endswith(os.sep + file)
+                if found:
+                    total = counts[name]
+                    counts[name] = (
+                        total[0] + nc,
+                        total[1] + cc,
+                        total[2] + tt,
+                        total[3] + ct,
+                    )
+        return counts
+
+    def sampled(self) -> dict:
+        """
+        label -> (samples the function is in, samples it is running) of
+        the WATCHED functions, from the sampled stacks
+        """
+        counts = {name: [0, 0] for name, _, _ in WATCHED}
+        suffixes = {
+            name: (f":{wanted}", f".{wanted}")
+            for name, file, wanted in WATCHED
+            if file is not None
+        }
+        for stack, count in self.sampler.stacks.items():
+            frames = stack.split(";")
+            for name, (bare, method) in suffixes.items():
+                matches = [f.endswith(bare) or f.endswith(method) for f in frames]
+                if any(matches):
+                    counts[name][0] += count
+                if matches[-1]:
+                    counts[name][1] += count
+        return counts
+
+    def summary(self) -> str:
+        lines = [
+            f"{self.elapsed:.2f}s profiled, {self.sampler.samples} stack samples",
+            "",
+        ]
+        if self.profile is not None:
+            lines.append(
+                f"{'function':<18}{'calls':>12}{'primitive':>12}"
+                f"{'own s':>10}{'cumul. s':>10}"
+            )
+            for name, (nc, cc, tt, ct) in self.calls().items():
+                lines.append(f"{name:<18}{nc:>12}{cc:>12}{tt:>10.3f}{ct:>10.3f}")
+        else:
+            lines.append(f"{'function':<18}{'in samples':>12}{'running':>12}")
+            # builtins have no frames, so they are never sampled
+            builtins = {name for name, file, _ in WATCHED if file is None}
+            for name, (inside, running) in self.sampled().items():
+                if name in builtins:
+                    inside = running = "-"
+                lines.append(f"{name:<18}{inside:>12}{running:>12}")
+        return "\n".join(lines) + "\n"
+
+    def top(self, limit=30) -> str:
+        """
+        the functions taking the most cumulative time, as pstats prints them
+        """
+        if self.profile is None:
+            return ""
+        out = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+def main():
+    from .scenarios import SCENARIOS, build
+    from .render import NullBackend
+
+    parser = argparse.ArgumentParser(
+        prog="ctower-profile", description="Profile ctower on a synthetic world"
+    )
+    parser.add_argument(
+        "scenario",
+        nargs="?",
+        default="midgame",
+        metavar="SCENARIO",
+        help=f"scenario to run, from {', '.join(SCENARIOS)} (default: midgame)",
+    )
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument(
+        "--render", action="store_true", help="draw every tick on a null backend"
+    )
+    parser.add_argument(
+        "--sample-only",
+        action="store_true",
+        help="only sample the stacks, without the overhead of cProfile",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="PREFIX",
+        help="write PREFIX.pstats, .folded and .txt (default: ctower-SCENARIO)",
+    )
+    args = parser.parse_args()
+
+    if args.scenario not in SCENARIOS:
+        parser.error(f"unknown scenario: {args.scenario}")
+
+    game = build(args.scenario)
+    if args.render:
+        game.backend = NullBackend(*game.size)
+
+    profiler = Profiler(args.output or f"ctower-{args.scenario}", args.sample_only)
+    with profiler:
+        for _ in range(args.ticks):
+            game.tick()
+            if args.render:
+                game.render_all()
+                game.print_stats()
+                game.backend.flush()
+
+    sys.stdout.write(profiler.summary())
+    sys.stdout.write(f"\nwrote {', '.join(profiler.paths)}\n")
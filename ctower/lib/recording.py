@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Session recording, in the asciicast v2 format.
+
+A `CastWriter` appends the frames of a game to a cast, as output events,
+on its own thread. It wakes up a few times per second to handle the frames
+queued since then, so it seldom takes the GIL from the game loop.
+
+`record` hooks a writer to the render backend of a game. The escape
+sequences an AnsiBackend writes are already the diff of each frame, and
+are queued as they are, for one call per frame. Any other backend is
+wrapped in a `RecordingBackend`, which passes every cell write through and
+keeps a copy of the writes of the frame; the writer thread then drops the
+writes that repaint a cell unchanged (most of them, filtered against the
+cells recorded so far without a Python loop), and encodes the cells that
+changed with an AnsiBackend of its own.
+
+Casts can be played by asciinema, or by `ctower-play`, which replays
+them at any speed, or follows one while it is being recorded.
+"""
+
+from .render import RenderBackend, AnsiBackend, glyph
+from itertools import filterfalse
+from operator import itemgetter
+import collections
+import threading
+import argparse
+import time
+import json
+import sys
+import io
+
+CELL, VALUE = itemgetter(0, 1), itemgetter(2, 3)
+
+
+class CastWriter:
+    """
+    Appends frames, cell writes or escape sequences, to an asciicast file
+    """
+
+    def __init__(self, path, rows, cols, title="ctower", interval=0.1):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8")
+        self.rows = rows
+        self.cols = cols
+        self.ansi = AnsiBackend(io.BytesIO(), rows, cols)
+        self.shown = {}  # (y, x) -> (symbol, pair), as written by the game
+        self.queue = collections.deque()
+        self.interval = interval
+        self.closing = threading.Event()
+        self.t0 = time.monotonic()
+        self.frames = 0
+        self.events = 0
+        self.bytes = 0
+        self.busy = 0.0  # CPU seconds spent encoding
+
+        header = {
+            "version": 2,
+            "width": cols,
+            "height": rows,
+            "timestamp": int(time.time()),
+            "title": title,
+        }
+        self.file.write(json.dumps(header) + "\n")
+
+        # hidden cursor, cleared screen and the window border
+        ansi = self.ansi
+        self.prologue = f"\x1b[?25l{ansi.sgr[1]}\x1b[2J"
+        ansi.box(0, 0, rows, cols)
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def frame(self, writes):
+        """
+        queues the cell writes of a frame, (y, x, symbol, pair)
+        """
+        self.frames += 1
+        self.queue.append((time.monotonic() - self.t0, writes))
+
+    def output(self, data: bytes):
+        """
+        queues the escape sequences of a frame
+        """
+        self.frames += 1
+        self.queue.append((time.monotonic() - self.t0, data))
+
+    def _run(self):
+        while not self.closing.wait(self.interval):
+            self._encode()
+        self._encode()
+
+    def _encode(self):
+        ansi = self.ansi
+        shown = self.shown
+
+        while self.queue:
+            t, frame = self.queue.popleft()
+            start = time.thread_time()
+
+            if isinstance(frame, bytes):
+                data = frame.decode()
+            else:
+                # last write of every cell, but those showing already
+                cells = dict(zip(map(CELL, frame), map(VALUE, frame)))
+                changed = list(filterfalse(shown.items().__contains__, cells.items()))
+                shown.update(changed)
+                for (y, x), (symbol, pair) in changed:
+                    if 0 <= y < self.rows and 0 <= x < self.cols:
+                        ansi.wanted[y, x] = (glyph(symbol), pair)
+                        ansi.dirty.add((y, x))
+                data = ansi.encode().decode()
+
+            if self.prologue:
+                data, self.prologue = self.prologue + data, None
+            self.busy += time.thread_time() - start
+            if not data:
+                continue
+
+            line = json.dumps([round(t, 4), "o", data], ensure_ascii=False)
+            self.file.write(line + "\n")
+            self.events += 1
+            self.bytes += len(line) + 1
+
+        self.file.flush()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.closing.set()
+            self.thread.join()
+            self.file.close()
+
+
+class RecordingBackend(RenderBackend):
+    """
+    Draws on backend, and records every frame to a CastWriter
+    """
+
+    def __init__(self, backend, writer):
+        self.backend = backend
+        self.writer = writer
+        self.writes = []
+        # bound once, put runs for every cell drawn
+        self._put = backend.put
+        self._write = self.writes.append
+
+    @property
+    def frame_bytes(self):
+        return self.backend.frame_bytes
+
+    def setup(self):
+        self.backend.setup()
+
+    def size(self):
+        return self.backend.size()
+
+    def put(self, y, x, symbol, pair=1):
+        self._put(y, x, symbol, pair)
+        self._write((y, x, symbol, pair))
+
+    def text(self, y, x, string, pair=1):
+        self.backend.text(y, x, string, pair)
+        self.writes.extend((y, x + i, char, pair) for i, char in enumerate(string))
+
+    def flush(self):
+        written = self.backend.flush()
+        if self.writes:
+            self.writer.frame(self.writes[:])
+            self.writes.clear()
+        return written
+
+    def close(self):
+        self.backend.close()
+
+
+class CastStream:
+    """
+    Binary stream writing to out, and queuing what it writes to a CastWriter
+    """
+
+    def __init__(self, out, writer):
+        self.out = out
+        self.writer = writer
+
+    def write(self, data):
+        self.writer.output(bytes(data))
+        return self.out.write(data)
+
+    def flush(self):
+        self.out.flush()
+
+
+def record(backend, writer) -> RenderBackend:
+    """
+    backend, drawing as before and recording its frames to writer
+    """
+    if isinstance(backend, AnsiBackend):
+        backend.out = CastStream(backend.out, writer)
+        return backend
+    return RecordingBackend(backend, writer)
+
+
+def events(lines, follow=False, poll=0.05):
+    """
+    yields the (time, data) output events of the lines of a cast; when
+    follow is True, waits for the events still to be recorded
+    """
+    header = None
+    while header is None:
+        line = lines.readline()
+        if line:
+            header = json.loads(line)
+        elif follow:
+            time.sleep(poll)
+        else:
+            return
+
+    if header.get("version") != 2:
+        raise ValueError("not an asciicast v2 file")
+
+    pending = ""
+    while True:
+        pending += lines.readline()
+        if not pending.endswith("\n"):
+            # end of file, or an event still being written
+            if not follow:
+                break
+            time.sleep(poll)
+            continue
+
+        t, kind, data = json.loads(pending)
+        pending = ""
+        if kind == "o":
+            yield t, data
+
+
+def play(lines, out, speed=1.0, idle=2.0, follow=False):
+    """
+    writes the output events of a cast to out, speed times faster than
+    recorded (at once if speed is 0), waiting at most idle seconds between
+    two events. Returns the number of events played.
+    """
+    played = 0
+    last = 0.0
+    start = time.monotonic()
+    clock = 0.0  # playback time of the last event
+
+    for t, data in events(lines, follow):
+        if speed > 0:
+            clock += min(idle, t - last) / speed
+            delay = clock - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+        last = t
+
+        out.write(data)
+        out.flush()
+        played += 1
+
+    return played
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="ctower-play", description="Play a recorded ctower session"
+    )
+    parser.add_argument("cast", metavar="FILE", help="asciicast file to play")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="playback speed factor, 0 to show the last frame at once",
+    )
+    parser.add_argument(
+        "--idle",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="longest wait between two frames",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="keep playing a session while it is being recorded",
+    )
+    args = parser.parse_args()
+
+    out = sys.stdout
+    out.write("\x1b[?1049h")
+    try:
+        with open(args.cast, encoding="utf-8") as lines:
+            play(lines, out, args.speed, args.idle, args.follow)
+        if not args.follow:
+            input()
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        out.write("\x1b[0m\x1b[?25h\x1b[?1049l")
+        out.flush()
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Render backends.
+
+The game draws through a small interface of cell writes (`put`, `text`)
+and one `flush` per frame, so the terminal library is pluggable:
+
+  - CursesBackend: the curses screen, as the game always did
+  - AnsiBackend: keeps the wanted screen contents, and on flush writes
+    the cells that changed since the last frame as a single buffer of
+    ANSI escape sequences, with one write call
+  - NullBackend: draws nothing, for benchmarks and headless runs
+
+Every backend reports the bytes written in the last frame (`frame_bytes`).
+"""
+
+import shutil
+import sys
+
+# Color pairs of the game: number -> (foreground, background), 256 colors
+PALETTE = {
+    1: (250, 0),  # Default Color
+    2: (137, 236),  # FOG
+    3: (5, 0),  # FRUIT
+    4: (5, 243),
+    5: (3, 0),  # ENEMIES
+    6: (3, 243),
+    7: (2, 0),  # BASE
+    8: (2, 243),
+    9: (4, 0),  # ENEMY TRAPPED
+    10: (4, 243),
+    11: (1, 0),  # MOUNTAIN
+    12: (1, 243),
+    13: (25, 231),  # PLAYER
+    14: (25, 247),
+    15: (199, 0),  # ENEMY TRAPPED
+    16: (199, 243),
+    17: (225, 0),  # LINTERN
+    18: (225, 243),
+}
+
+# Black is redefined as a dark teal, in curses 0-1000 RGB units
+BLACK = (0, 100, 100)
+
+# curses alternative character set flag, and the line drawing symbols used
+ALTCHARSET = 0x400000
+ACS_ULCORNER = ALTCHARSET | ord("l")
+ACS_URCORNER = ALTCHARSET | ord("k")
+ACS_LLCORNER = ALTCHARSET | ord("m")
+ACS_LRCORNER = ALTCHARSET | ord("j")
+ACS_HLINE = ALTCHARSET | ord("q")
+ACS_VLINE = ALTCHARSET | ord("x")
+ACS_LTEE = ALTCHARSET | ord("t")  # curses.ACS_SSSB
+ACS_RTEE = ALTCHARSET | ord("u")  # curses.ACS_SBSS
+
+# unicode glyphs of the alternative character set (VT100 line drawing)
+ACS_GLYPHS = {
+    "l": "┌",
+    "k": "┐",
+    "m": "└",
+    "j": "┘",
+    "q": "─",
+    "x": "│",
+    "t": "├",
+    "u": "┤",
+    "~": "·",
+    "`": "◆",
+    "i": "§",
+}
+
+
+def glyph(symbol) -> str:
+    """
+    printable character of a curses symbol (a str, or an int char code
+    possibly flagged with ALTCHARSET)
+    """
+    if isinstance(symbol, str):
+        return symbol
+    char = chr(symbol & 0xFFFF)
+    if symbol & ALTCHARSET:
+        return ACS_GLYPHS.get(char, char)
+    return char
+
+
+class RenderBackend:
+    """
+    Interface of the render backends
+    """
+
+    frame_bytes = 0
+
+    def setup(self):
+        pass
+
+    def size(self) -> tuple:
+        """
+        (rows, cols) of the terminal
+        """
+        raise NotImplementedError
+
+    def put(self, y, x, symbol, pair=1):
+        """
+        draws a single cell
+        """
+        raise NotImplementedError
+
+    def text(self, y, x, string, pair=1):
+        for i, char in enumerate(string):
+            self.put(y, x + i, char, pair)
+
+    def box(self, top, left, rows, cols, pair=1):
+        """
+        draws a line box, with its corners at (top, left) and
+        (top + rows - 1, left + cols - 1)
+        """
+        bottom, right = top + rows - 1, left + cols - 1
+        for x in range(left + 1, right):
+            self.put(top, x, ACS_HLINE, pair)
+            self.put(bottom, x, ACS_HLINE, pair)
+        for y in range(top + 1, bottom):
+            self.put(y, left, ACS_VLINE, pair)
+            self.put(y, right, ACS_VLINE, pair)
+        self.put(top, left, ACS_ULCORNER, pair)
+        self.put(top, right, ACS_URCORNER, pair)
+        self.put(bottom, left, ACS_LLCORNER, pair)
+        self.put(bottom, right, ACS_LRCORNER, pair)
+
+    def flush(self) -> int:
+        """
+        shows the frame, returns the bytes written
+        """
+        return 0
+
+    def close(self):
+        pass
+
+
+class NullBackend(RenderBackend):
+    """
+    Draws nothing, counting the cells the game would draw
+    """
+
+    def __init__(self, rows=40, cols=160):
+        self.rows = rows
+        self.cols = cols
+        self.cells = 0
+
+    def size(self):
+        return self.rows, self.cols
+
+    def put(self, y, x, symbol, pair=1):
+        self.cells += 1
+
+    def text(self, y, x, string, pair=1):
+        self.cells += len(string)
+
+
+class CursesBackend(RenderBackend):
+    """
+    Draws on a curses screen. curses keeps its own frame diff and does not
+    tell how much it writes, so frame_bytes counts the characters handed to
+    it, an upper bound of what reaches the terminal.
+    """
+
+    def __init__(self, screen):
+        import curses
+
+        self.curses = curses
+        self.screen = screen
+        self.written = 0
+
+    def setup(self):
+        curses = self.curses
+
+        curses.curs_set(False)  # Do not display blinking cursor
+        curses.noecho()
+        curses.cbreak()
+        curses.start_color()
+
+        curses.init_color(curses.COLOR_BLACK, *BLACK)
+        for pair, (fg, bg) in PALETTE.items():
+            curses.init_pair(pair, fg, bg)
+
+        self.screen.keypad(True)
+        self.screen.nodelay(True)
+        self.screen.border(0)
+
+    def size(self):
+        return self.screen.getmaxyx()
+
+    def put(self, y, x, symbol, pair=1):
+        self.screen.addch(y, x, symbol, self.curses.color_pair(pair))
+        self.written += 1
+
+    def text(self, y, x, string, pair=1):
+        self.screen.addstr(y, x, string, self.curses.color_pair(pair))
+        self.written += len(string)
+
+    def flush(self):
+        self.screen.refresh()
+        self.frame_bytes, self.written = self.written, 0
+        return self.frame_bytes
+
+
+class AnsiBackend(RenderBackend):
+    """
+    Writes ANSI escape sequences to a binary stream.
+
+    Cell writes only update the wanted screen contents; flush compares them
+    with what the terminal shows, and encodes the changed cells, row by row,
+    into one buffer: the cursor is moved only when the next changed cell is
+    not the adjacent one, and the colors only when the pair changes.
+    """
+
+    def __init__(self, out=None, rows=None, cols=None):
+        self.out = sys.stdout.buffer if out is None else out
+        if rows is None or cols is None:
+            cols, rows = shutil.get_terminal_size()
+        self.rows = rows
+        self.cols = cols
+        self.wanted = {}  # (y, x) -> (char, pair)
+        self.shown = {}
+        self.dirty = set()
+        self.sgr = {
+            pair: f"\x1b[38;5;{fg};48;5;{bg}m" for pair, (fg, bg) in PALETTE.items()
+        }
+
+    def setup(self):
+        # alternate screen, hidden cursor, default colors, cleared screen
+        self.out.write(f"\x1b[?1049h\x1b[?25l{self.sgr[1]}\x1b[2J".encode())
+        self.out.flush()
+        self.box(0, 0, self.rows, self.cols)
+
+    def size(self):
+        return self.rows, self.cols
+
+    def put(self, y, x, symbol, pair=1):
+        if 0 <= y < self.rows and 0 <= x < self.cols:
+            self.wanted[y, x] = (glyph(symbol), pair)
+            self.dirty.add((y, x))
+
+    def encode(self) -> bytes:
+        """
+        escape sequences turning the shown screen into the wanted one
+        """
+        wanted, shown = self.wanted, self.shown
+        parts = []
+        cursor = None
+        pair = None
+
+        for cell in sorted(self.dirty):
+            value = wanted[cell]
+            if shown.get(cell) == value:
+                continue
+            shown[cell] = value
+
+            if cell != cursor:
+                parts.append(f"\x1b[{cell[0] + 1};{cell[1] + 1}H")
+            if value[1] != pair:
+                pair = value[1]
+                parts.append(self.sgr.get(pair, self.sgr[1]))
+            parts.append(value[0])
+            cursor = (cell[0], cell[1] + 1)
+
+        self.dirty.clear()
+        return "".join(parts).encode()
+
+    def flush(self):
+        data = self.encode()
+        if data:
+            self.out.write(data)
+            self.out.flush()
+        self.frame_bytes = len(data)
+        return self.frame_bytes
+
+    def close(self):
+        # default colors, visible cursor, back to the main screen
+        self.out.write(b"\x1b[0m\x1b[?25h\x1b[?1049l")
+        self.out.flush()
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic worlds.
+
+A scenario is a declarative spec, a dict with the world size, seed and
+the number of entities of each kind, from which `build` creates a
+headless Game directly, without playing until it gets there. Missing
+keys take the values of DEFAULT_SPEC.
+"""
+
+from .entities import Mine, Cannon, Satelite, Lintern, Bomb, Fruit, Spawner
+from .caps import EntityCaps
+from .settings import Settings
+
+DEFAULT_SPEC = {
+    "seed": 0,
+    "height": 40,
+    "width": 160,
+    "spawners": 16,
+    "zombies": 0,
+    "mines": 0,
+    "cannons": 0,
+    "satelites": 0,
+    "lanterns": 0,
+    "bombs": 0,
+    "fruits": 0,
+    "gold": 1000000,
+}
+
+SCENARIOS = {
+    "empty": {},
+    "early": {"zombies": 50, "mines": 5, "cannons": 5, "lanterns": 2},
+    "midgame": {
+        "height": 60,
+        "width": 200,
+        "spawners": 30,
+        "zombies": 500,
+        "mines": 50,
+        "cannons": 50,
+        "satelites": 5,
+        "lanterns": 10,
+        "bombs": 5,
+    },
+    "worst_case": {
+        "height": 100,
+        "width": 300,
+        "spawners": 50,
+        "zombies": 5000,
+        "mines": 250,
+        "cannons": 250,
+        "satelites": 20,
+        "lanterns": 100,
+        "bombs": 20,
+    },
+}
+
+
+def spec_of(spec) -> dict:
+    """
+    full spec, from a scenario name or a (partial) spec dict
+    """
+    if isinstance(spec, str):
+        if spec not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {spec}")
+        spec = SCENARIOS[spec]
+
+    unknown = set(spec).difference(DEFAULT_SPEC)
+    if unknown:
+        raise ValueError(f"Unknown scenario keys: {', '.join(sorted(unknown))}")
+
+    return {**DEFAULT_SPEC, **spec}
+
+
+def build(spec):
+    """
+    creates a headless Game with the world described by spec
+    """
+    from ctower.main import Game
+
+    spec = spec_of(spec)
+    game = Game.headless(spec["height"], spec["width"], seed=spec["seed"])
+    rng = game.rng
+
+    # the caps never remove the zombies the scenario asks for
+    game.caps = EntityCaps(
+        soft=max(Settings.ENEMY_SOFT_CAP, spec["zombies"]),
+        hard=max(Settings.ENEMY_HARD_CAP, spec["zombies"]),
+        fruits=max(Settings.FRUIT_CAP, spec["fruits"]),
+    )
+
+    taken = set((e.y, e.x) for e in game.mountains)
+    taken.add((game.player.y, game.player.x))
+
+    wanted = sum(
+        spec[kind]
+        for kind in (
+            "spawners",
+            "satelites",
+            "mines",
+            "cannons",
+            "lanterns",
+            "fruits",
+            "bombs",
+        )
+    )
+    if wanted > len(game.screen_area) - len(taken):
+        raise ValueError("Scenario does not fit in the world")
+
+    def cell():
+        while True:
+            y = rng.randint(game.min_y, game.max_y)
+            x = rng.randint(game.min_x, game.max_x)
+            if (y, x) not in taken:
+                taken.add((y, x))
+                return y, x
+
+    game.base.deployed = True
+    game.base.gold = spec["gold"]
+    game.coverage.add_provider(game.base)
+
+    game.spawners = [Spawner(*cell()) for _ in range(spec["spawners"])]
+
+    for _ in range(spec["satelites"]):
+        satelite = Satelite(*cell())
+        game.satelites.append(satelite)
+        game.coverage.add_provider(satelite)
+
+    providers = game.satelites + [game.base]
+    for kind, items, n in (
+        (Mine, game.mines, spec["mines"]),
+        (Cannon, game.cannons, spec["cannons"]),
+    ):
+        for _ in range(n):
+            building = kind(*cell(), clock=game.now)
+            items.append(building)
+            game.economy.register(building)
+            game.coverage.add_building(building, providers)
+
+    game.placement.invalidate()
+    game.buildings = game.mines + game.cannons + game.satelites
+
+    game.linterns = [Lintern(*cell()) for _ in range(spec["lanterns"])]
+    game.fruits = [Fruit(*cell()) for _ in range(spec["fruits"])]
+
+    # bombs go off one after the other
+    game.bombs_activated = [
+        Bomb(*cell(), t0=game.now - Bomb.timer + i / Settings.FPS)
+        for i in range(spec["bombs"])
+    ]
+
+    # zombies wander around the spawners
+    for _ in range(spec["zombies"] if game.spawners else 0):
+        spawner = rng.choice(game.spawners)
+        game.spawned += 1
+        enemy = spawner.spawn(game.spawned)
+        enemy.y = max(game.min_y, min(game.max_y, enemy.y + rng.randint(-5, 5)))
+        enemy.x = max(game.min_x, min(game.max_x, enemy.x + rng.randint(-5, 5)))
+        game.enemies.append(enemy)
+
+    return game
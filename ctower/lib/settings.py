@@ -4,24 +4,36 @@
 
 class Settings:
     FPS: int = 50
+    MAX_CATCHUP_TICKS: int = 15
+    MAX_FRAMESKIP: int = 5
+    IDLE_TIMEOUT: float = 0.25
     PLAYER_VISIBILITY: int = 5
     BASE_VISIBILITY: int = 10
     LINTERN_VISIBILITY: int = 4
     SATELITE_VISIBILITY: int = 10
-    SPAWNER_CHANCE: int = 5
+    SPAWN_RATE: float = 0.25  # zombies per second, shared by the spawners
+    SPAWN_RATE_PER_LEVEL: float = 0.05  # more zombies per player level
+    FRUIT_RATE: float = 0.1  # per second
+    BOMB_RATE: float = 0.05
     ENEMY_VISIBILITY: int = 30
+    ENEMY_COHORTS: int = 5  # frames the zombie moves are spread over
+    ENEMY_SOFT_CAP: int = 500
+    ENEMY_HARD_CAP: int = 2000
+    ENEMY_CAP_POLICY: str = "merge"  # merge | throttle | cull
+    ENEMY_MERGE_RADIUS: int = 3
+    FRUIT_CAP: int = 20
+    BOMB_CAP: int = 10
+    POOL_LIMIT: int = 1024
+    TRAP_RADIUS: int = 5
+    JOURNAL_DIR: str = "~/.ctower/session"
+    JOURNAL_CAPACITY: int = 4096  # records waiting for the writer thread
+    JOURNAL_FSYNC_INTERVAL: float = 0.5
+    CHECKPOINT_INTERVAL: int = 1500  # ticks
+    TUNING_POLL_INTERVAL: float = 1.0  # seconds between settings file checks
     INITIAL_GOLD: int = 100
+    # mirrored from the active archetypes, see archetypes.py
     MINE_INITIAL_COST: int = 50
     CANNON_INITIAL_COST: int = 50
     SATELITE_INITIAL_COST: int = 500
     LANTERN_INITIAL_COST: int = 50
-
-    MINE_PRODUCTION_RATE: float = 10
-    MINE_PRODUCTION_FACTOR: float = 1.5
-    MINE_MAINTENANCE_COST: int = 0
-    MINE_TIMER: int = 4
-
-    CANNON_PRODUCTION_RATE: float = 1.5
-    CANNON_PRODUCTION_FACTOR: float = 1.5
-    CANNON_MAINTENANCE_COST: int = 1
-    CANNON_TIMER: int = 2
+    MAX_BUILDING_LEVEL: int = 9
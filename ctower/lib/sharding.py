@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""
+Enemy movement engines.
+
+Moving the horde is the part of a tick that grows with the number of
+zombies times the number of targets. `move_enemy` is the movement rule;
+`LocalEngine` applies it in process, and `ShardedEngine` splits the world
+in horizontal bands, each one owned by a worker process.
+
+The positions of the sharded zombies live in a shared memory block, in
+one range of slots per band: a worker only goes through its own range,
+moves the zombies of the cohort in place, and lists the slots that
+moved. The coordinator copies those moves to their Enemy objects, which
+the rest of the game reads, and hands the zombies that left a band off
+to the range of their new one. A zombie the game changes by itself
+(spawned, killed, or taken again from the entity pool) is caught by
+comparing the objects with their slots, at C speed, before each step.
+
+Random walks are drawn from a counter based generator keyed on the game
+seed, the zombie uid and the step number, so both engines produce exactly
+the same moves for a given seed, whatever the number of shards.
+"""
+
+from multiprocessing import shared_memory
+from operator import attrgetter
+from itertools import chain
+from array import array
+from .settings import Settings
+import multiprocessing
+import time
+import math
+
+MASK = (1 << 64) - 1
+
+# header slots of the shared block
+N_TARGETS, STEP, SEED, STOP, MIN_Y, MAX_Y, MIN_X, MAX_X, PHASE, COHORTS = range(10)
+HEADER = 16
+
+# seconds to wait for the workers before they are given up as dead
+TIMEOUT = 5.0
+
+SLOT = attrgetter("y", "x", "uid")
+
+
+def mix(seed: int, uid: int, step: int) -> int:
+    """
+    splitmix64 of the (seed, uid, step) triple
+    """
+    z = (seed + uid * 0x9E3779B97F4A7C15 + step * 0xBF58476D1CE4E5B9) & MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK
+    return z ^ (z >> 31)
+
+
+def move_enemy(y, x, uid, targets, step, seed, limits):
+    """
+    returns the next position of a zombie at (y, x): one step towards the
+    nearest target in sight, or a random step if there is none
+    """
+    best = None
+    best_distance = Settings.ENEMY_VISIBILITY
+    for ty, tx in targets:
+        d = int(math.sqrt((y - ty) ** 2 + (x - tx) ** 2))
+        if d < best_distance:
+            best, best_distance = (ty, tx), d
+
+    if best is not None:
+        dy = int(math.copysign(1, best[0] - y))
+        dx = int(math.copysign(1, best[1] - x))
+    else:
+        h = mix(seed, uid, step)
+        dy, dx = h % 3 - 1, (h // 3) % 3 - 1
+
+    _, max_y, _, max_x = limits
+    return max(1, min(max_y, y + dy)), max(1, min(max_x, x + dx))
+
+
+class LocalEngine:
+    """
+    Moves every zombie in the current process
+    """
+
+    def move(self, enemies, targets, step, seed, limits, phase=0, cohorts=1):
+        """
+        moves the zombies of enemies whose uid is phase modulo cohorts
+        """
+        for enemy in enemies:
+            if cohorts == 1 or enemy.uid % cohorts == phase:
+                enemy.move(
+                    *move_enemy(
+                        enemy.y, enemy.x, enemy.uid, targets, step, seed, limits
+                    )
+                )
+
+    def close(self):
+        pass
+
+
+def band(y, min_y, max_y, shards):
+    """
+    index of the shard owning row y
+    """
+    rows = max_y - min_y + 1
+    return min(shards - 1, max(0, (y - min_y) * shards // rows))
+
+
+class Block:
+    """
+    Typed views over the shared memory block of a sharded engine; shard k
+    owns the slots k * capacity to (k + 1) * capacity - 1
+    """
+
+    def __init__(self, shm, shards, capacity, targets):
+        self.shm = shm
+        buf = shm.buf
+        offset = 0
+
+        def view(fmt, size, length):
+            nonlocal offset
+            v = buf[offset : offset + size * length].cast(fmt)
+            offset += size * length
+            return v
+
+        slots = shards * capacity
+        self.header = view("q", 8, HEADER)
+        self.counts = view("q", 8, shards)  # zombies in each range
+        self.moved_n = view("q", 8, shards)  # slots moved by the last step
+        self.uids = view("q", 8, slots)
+        self.ys = view("i", 4, slots)
+        self.xs = view("i", 4, slots)
+        self.moved = view("i", 4, slots)
+        self.targets = view("i", 4, 2 * targets)
+
+    @staticmethod
+    def size(shards, capacity, targets):
+        return (
+            8 * (HEADER + 2 * shards)
+            + shards * capacity * (8 + 4 + 4 + 4)
+            + (4 * 2 * targets)
+        )
+
+    def release(self):
+        for v in (
+            self.header,
+            self.counts,
+            self.moved_n,
+            self.uids,
+            self.ys,
+            self.xs,
+            self.moved,
+            self.targets,
+        ):
+            v.release()
+
+
+def _worker(name, shard, shards, capacity, targets, go, done):
+    shm = shared_memory.SharedMemory(name=name)
+    block = Block(shm, shards, capacity, targets)
+    header = block.header
+    lo = shard * capacity
+
+    try:
+        while True:
+            go.acquire()
+            if header[STOP]:
+                break
+
+            step, seed = header[STEP], header[SEED]
+            phase, cohorts = header[PHASE], header[COHORTS]
+            limits = (header[MIN_Y], header[MAX_Y], header[MIN_X], header[MAX_X])
+            t = block.targets
+            points = [(t[2 * i], t[2 * i + 1]) for i in range(header[N_TARGETS])]
+
+            ys, xs, uids, moved = block.ys, block.xs, block.uids, block.moved
+            n = 0
+            for i in range(lo, lo + block.counts[shard]):
+                uid = uids[i]
+                if uid % cohorts != phase:
+                    continue
+                y, x = move_enemy(ys[i], xs[i], uid, points, step, seed, limits)
+                if y != ys[i] or x != xs[i]:
+                    ys[i], xs[i] = y, x
+                    moved[lo + n] = i
+                    n += 1
+            block.moved_n[shard] = n
+
+            done.release()
+    finally:
+        block.release()
+        shm.close()
+
+
+class ShardedEngine:
+    """
+    Moves the zombies in worker processes, one per horizontal band of the
+    world. Steps with more zombies or targets than the shared block can
+    hold are run in process instead, and so is every step once a worker
+    has died.
+    """
+
+    def __init__(
+        self, shards=2, capacity=Settings.ENEMY_HARD_CAP, targets=1024, context=None
+    ):
+        self.shards = shards
+        self.capacity = capacity
+        self.max_targets = targets
+        self.handoffs = 0
+        self.fallbacks = 0
+        self.failed = False
+        self.local = LocalEngine()
+
+        self.residents = [[] for _ in range(shards)]  # Enemy of each slot
+        self.where = {}  # id of a resident -> (shard, index in its range)
+        self.ids = None  # ids of the enemies of the last step, in order
+        self.limits = None
+
+        ctx = multiprocessing.get_context(context)
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=Block.size(shards, capacity, targets)
+        )
+        self.block = Block(self.shm, shards, capacity, targets)
+        # semaphores rather than barriers: a barrier left waiting on a
+        # killed process blocks whoever aborts it, forever
+        self.go = [ctx.Semaphore(0) for _ in range(shards)]
+        self.done = ctx.Semaphore(0)
+        self.workers = [
+            ctx.Process(
+                target=_worker,
+                args=(
+                    self.shm.name,
+                    shard,
+                    shards,
+                    capacity,
+                    targets,
+                    self.go[shard],
+                    self.done,
+                ),
+                daemon=True,
+            )
+            for shard in range(shards)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    # Slots
+
+    def _write(self, shard, index, enemy):
+        block = self.block
+        i = shard * self.capacity + index
+        block.ys[i], block.xs[i], block.uids[i] = enemy.y, enemy.x, enemy.uid
+
+    def _add(self, enemy):
+        shard = band(enemy.y, self.limits[0], self.limits[1], self.shards)
+        residents = self.residents[shard]
+        self.where[id(enemy)] = (shard, len(residents))
+        self._write(shard, len(residents), enemy)
+        residents.append(enemy)
+
+    def _drop(self, shard, index):
+        """
+        frees a slot, moving the last zombie of the range into it
+        """
+        residents = self.residents[shard]
+        del self.where[id(residents[index])]
+        last = residents.pop()
+        if index < len(residents):
+            residents[index] = last
+            self.where[id(last)] = (shard, index)
+            block = self.block
+            i, j = shard * self.capacity + index, shard * self.capacity + len(residents)
+            block.ys[i], block.xs[i], block.uids[i] = (
+                block.ys[j],
+                block.xs[j],
+                block.uids[j],
+            )
+
+    def _sync(self, enemies, limits):
+        """
+        brings the slots up to date with the zombies the game added,
+        removed or changed since the last step
+        """
+        if limits != self.limits:
+            self.limits = limits
+            self.residents = [[] for _ in range(self.shards)]
+            self.where = {}
+            self.ids = None
+
+        ids = list(map(id, enemies))
+        if ids != self.ids:
+            current = dict(zip(ids, enemies))
+            for key in self.where.keys() - current.keys():
+                self._drop(*self.where[key])
+            for key in current.keys() - self.where.keys():
+                self._add(current[key])
+            self.ids = ids
+
+        block = self.block
+        for shard, residents in enumerate(self.residents):
+            lo = shard * self.capacity
+            hi = lo + len(residents)
+            slots = zip(block.ys[lo:hi], block.xs[lo:hi], block.uids[lo:hi])
+            if list(map(SLOT, residents)) == list(slots):
+                continue
+            # moved by the game, or taken again from the pool
+            for index, enemy in reversed(list(enumerate(residents))):
+                i = lo + index
+                if SLOT(enemy) != (block.ys[i], block.xs[i], block.uids[i]):
+                    self._drop(shard, index)
+                    self._add(enemy)
+
+    def move(self, enemies, targets, step, seed, limits, phase=0, cohorts=1):
+        """
+        moves the zombies of enemies whose uid is phase modulo cohorts
+        """
+        if (
+            self.failed
+            or len(enemies) > self.capacity
+            or len(targets) > self.max_targets
+        ):
+            self.fallbacks += 1
+            self.local.move(enemies, targets, step, seed, limits, phase, cohorts)
+            return
+
+        self._sync(enemies, limits)
+
+        block = self.block
+        header = block.header
+        header[N_TARGETS] = len(targets)
+        header[STEP] = step
+        header[SEED] = seed
+        header[PHASE], header[COHORTS] = phase, cohorts
+        header[MIN_Y], header[MAX_Y], header[MIN_X], header[MAX_X] = limits
+        if targets:
+            block.targets[: 2 * len(targets)] = array("i", chain.from_iterable(targets))
+        for shard, residents in enumerate(self.residents):
+            block.counts[shard] = len(residents)
+
+        for go in self.go:
+            go.release()
+        deadline = time.monotonic() + TIMEOUT
+        if not all(
+            self.done.acquire(timeout=max(0.0, deadline - time.monotonic()))
+            for _ in range(self.shards)
+        ):
+            self._fail()
+            self.fallbacks += 1
+            self.local.move(enemies, targets, step, seed, limits, phase, cohorts)
+            return
+
+        ys, xs, moved = block.ys, block.xs, block.moved
+        min_y, max_y = limits[0], limits[1]
+        leaving = []
+        for shard, residents in enumerate(self.residents):
+            lo = shard * self.capacity
+            for n in range(lo, lo + block.moved_n[shard]):
+                i = moved[n]
+                y = ys[i]
+                residents[i - lo].move(y, xs[i])
+                if band(y, min_y, max_y, self.shards) != shard:
+                    leaving.append((shard, i - lo))
+
+        # the zombies crossing a boundary go to the range of their new band;
+        # slots are freed from the end, so the indices left stay valid
+        for shard, index in sorted(leaving, reverse=True):
+            enemy = self.residents[shard][index]
+            self._drop(shard, index)
+            self._add(enemy)
+            self.handoffs += 1
+
+    def _fail(self):
+        """
+        gives up on the workers, the zombies are moved in process from now on
+        """
+        self.failed = True
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    def close(self):
+        if self.shm is None:
+            return
+
+        if self.failed or not all(worker.is_alive() for worker in self.workers):
+            self._fail()
+        else:
+            self.block.header[STOP] = 1
+            for go in self.go:
+                go.release()
+            for worker in self.workers:
+                worker.join(TIMEOUT)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+
+        self.residents = []
+        self.where = {}
+        self.block.release()
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+World snapshots, and the thread that draws them.
+
+A Snapshot is an immutable picture of what has to be drawn: the light
+sources, the drawable cells of every entity, the blast areas of the armed
+bombs and the status lines. The simulation publishes one after a tick, and
+a RenderThread draws the latest at its own rate, so a slow terminal no
+longer delays the simulation.
+
+Layers of entities that do not move (mountains, spawners, satelites and
+lanterns), and their light sources, are shared between snapshots until
+their list changes.
+"""
+
+from dataclasses import dataclass
+from collections import namedtuple
+from .settings import Settings
+import threading
+import time
+
+Point = namedtuple("Point", "y x")
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    tick: int
+    lights: tuple  # (Point, radius) of the moving light sources
+    static_lights: tuple  # (Point, radius) of the light sources that do not move
+    layers: tuple  # tuples of (y, x, symbol, color), in drawing order
+    blasts: tuple  # ((bomb id, t0), frozenset of cells) of the armed bombs
+    hud: tuple  # (y, x, text) of the status lines segments
+
+
+def cells(entities) -> tuple:
+    return tuple(
+        (e.y, e.x, e.symbol, e.color) for e in entities if e.deployed and e.visible
+    )
+
+
+class SnapshotBuilder:
+    def __init__(self):
+        self.static = {}  # layer name -> (key, cells)
+        self.static_lights = (None, ())  # (key, lights)
+        self.shared = 0
+
+    @staticmethod
+    def _key(entities):
+        return (id(entities), len(entities), id(entities[-1]) if entities else None)
+
+    def layer(self, name, entities) -> tuple:
+        """
+        cells of a list of entities that do not move, rebuilt only when
+        the list changes
+        """
+        key = self._key(entities)
+        cached = self.static.get(name)
+        if cached is not None and cached[0] == key:
+            self.shared += 1
+            return cached[1]
+
+        layer = cells(entities)
+        self.static[name] = (key, layer)
+        return layer
+
+    def lights(self, game) -> tuple:
+        """
+        light sources of the base, lanterns and satelites, rebuilt only
+        when one is built or destroyed
+        """
+        base = game.base
+        key = (
+            base.deployed,
+            base.y,
+            base.x,
+            self._key(game.linterns),
+            self._key(game.satelites),
+        )
+        if self.static_lights[0] == key:
+            return self.static_lights[1]
+
+        lights = []
+        if base.deployed:
+            lights.append((Point(base.y, base.x), Settings.BASE_VISIBILITY))
+        lights.extend(
+            (Point(l.y, l.x), Settings.LINTERN_VISIBILITY) for l in game.linterns
+        )
+        lights.extend(
+            (Point(s.y, s.x), Settings.SATELITE_VISIBILITY) for s in game.satelites
+        )
+        self.static_lights = (key, tuple(lights))
+        return self.static_lights[1]
+
+    def build(self, game, tick=0) -> Snapshot:
+        layers = (
+            self.layer("mountains", game.mountains),
+            cells(game.mines),
+            cells(game.cannons),
+            self.layer("satelites", game.satelites),
+            self.layer("linterns", game.linterns),
+            cells(game.enemies),
+            self.layer("spawners", game.spawners),
+            cells(game.fruits),
+            cells(game.bombs_activated),
+            cells(game.bombs_topick),
+            cells((game.base, game.player, game.trap)),
+        )
+
+        return Snapshot(
+            tick=tick,
+            lights=((Point(game.player.y, game.player.x), Settings.PLAYER_VISIBILITY),),
+            static_lights=self.lights(game),
+            layers=layers,
+            blasts=tuple(((id(b), b.t0), game.blast(b)) for b in game.bombs_activated),
+            hud=game.hud.segments(game),
+        )
+
+
+class RenderThread:
+    """
+    Draws the latest published snapshot, at most fps times per second.
+
+    The simulation publishes a new snapshot only when the previous one has
+    been taken (`wanted`), so no snapshot is built just to be dropped.
+    Holding `lock` pauses the drawing, e.g. while a message is on screen.
+    """
+
+    def __init__(self, present, fps=Settings.FPS):
+        self.present = present
+        self.interval = 1 / fps
+        self.lock = threading.RLock()
+        self.fresh = threading.Event()
+        self.latest = None
+        self.stopped = False
+        self.published = 0
+        self.frames = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def wanted(self) -> bool:
+        return not self.fresh.is_set()
+
+    def publish(self, snapshot):
+        self.latest = snapshot
+        self.published += 1
+        self.fresh.set()
+
+    def _run(self):
+        while not self.stopped:
+            start = time.perf_counter()
+            if not self.fresh.wait(self.interval):
+                continue
+
+            with self.lock:
+                snapshot = self.latest
+                self.fresh.clear()
+                if self.stopped:
+                    break
+                self.present(snapshot)
+            self.frames += 1
+
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - start)))
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped = True
+        self.fresh.set()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join()
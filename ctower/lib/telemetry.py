@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in session telemetry.
+
+Per tick gauges and counters, and the duration of the Game.loop phases,
+are written into preallocated ring buffers, so sampling does not build
+any object on the hot path. A background thread flushes them in batches
+to a JSONL or Prometheus text-format metrics file, and to a Chrome trace
+format file that can be loaded in chrome://tracing or Perfetto.
+"""
+
+from array import array
+from pathlib import Path
+import threading
+import json
+import time
+import os
+
+METRICS = (
+    "tick",
+    "time",
+    "frame_time",
+    "enemies",
+    "entities",
+    "gold",
+    "gold_rate",
+    "sounds",
+    "health",
+    "points",
+    "frame_bytes",
+)
+
+# Prometheus metric type of each sampled value
+COUNTERS = ("tick", "sounds", "points")
+
+PHASES = ("tick", "render", "input")
+TICK, RENDER, INPUT = range(len(PHASES))
+
+
+class Telemetry:
+    def __init__(
+        self,
+        path=None,
+        fmt="jsonl",
+        trace_path=None,
+        capacity=4096,
+        interval=1.0,
+        timer=time.perf_counter,
+    ):
+        if fmt not in ("jsonl", "prom"):
+            raise ValueError(f"Unknown telemetry format: {fmt}")
+
+        self.path = None if path is None else Path(path)
+        self.fmt = fmt
+        self.trace_path = None if trace_path is None else Path(trace_path)
+        self.capacity = capacity
+        self.interval = interval
+        self.timer = timer
+        self.t0 = timer()
+
+        width = len(METRICS)
+        self.samples = array("d", bytes(8 * capacity * width))
+        self.sample_head = 0
+        self.sample_tail = 0
+
+        self.span_phase = array("b", bytes(capacity))
+        self.span_start = array("d", bytes(8 * capacity))
+        self.span_end = array("d", bytes(8 * capacity))
+        self.span_head = 0
+        self.span_tail = 0
+        self.open_spans = array("d", bytes(8 * len(PHASES)))
+
+        self.dropped_samples = 0  # samples and spans lost to a full ring
+        self.dropped_spans = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.closed = False
+
+        if self.path is not None and self.fmt == "jsonl":
+            self.path.write_text("")
+
+        if self.trace_path is not None:
+            self.trace_path.write_text("[\n")
+            self._trace_started = False
+
+        self.writer = threading.Thread(target=self._run, daemon=True)
+        self.writer.start()
+
+    # Hot path
+
+    def sample(self, game, tick, frame_time):
+        """
+        records the gauges and counters of game after a tick
+        """
+        if self.sample_head - self.sample_tail >= self.capacity:
+            self.dropped_samples += 1
+            return
+
+        samples = self.samples
+        i = (self.sample_head % self.capacity) * len(METRICS)
+        samples[i] = tick
+        samples[i + 1] = game.now
+        samples[i + 2] = frame_time
+        samples[i + 3] = len(game.enemies)
+        samples[i + 4] = (
+            len(game.enemies)
+            + len(game.spawners)
+            + len(game.mines)
+            + len(game.cannons)
+            + len(game.satelites)
+            + len(game.linterns)
+            + len(game.fruits)
+            + len(game.bombs_topick)
+            + len(game.bombs_activated)
+        )
+        samples[i + 5] = game.base.gold
+        samples[i + 6] = game.economy.gold_per_second
+        samples[i + 7] = game.sounds_played
+        samples[i + 8] = game.player.health
+        samples[i + 9] = game.player.points
+        samples[i + 10] = game.frame_bytes
+        self.sample_head += 1
+
+        if self.sample_head - self.sample_tail >= self.capacity // 2:
+            self.wakeup.set()
+
+    def begin(self, phase):
+        self.open_spans[phase] = self.timer()
+
+    def end(self, phase):
+        if self.span_head - self.span_tail >= self.capacity:
+            self.dropped_spans += 1
+            return
+
+        i = self.span_head % self.capacity
+        self.span_phase[i] = phase
+        self.span_start[i] = self.open_spans[phase]
+        self.span_end[i] = self.timer()
+        self.span_head += 1
+
+    # Writer thread
+
+    def _run(self):
+        while not self.closed:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def _drain_samples(self):
+        head = self.sample_head
+        width = len(METRICS)
+        rows = []
+        for n in range(self.sample_tail, head):
+            i = (n % self.capacity) * width
+            rows.append(self.samples[i : i + width].tolist())
+        self.sample_tail = head
+        return rows
+
+    def _drain_spans(self):
+        head = self.span_head
+        spans = []
+        for n in range(self.span_tail, head):
+            i = n % self.capacity
+            spans.append((self.span_phase[i], self.span_start[i], self.span_end[i]))
+        self.span_tail = head
+        return spans
+
+    def flush(self):
+        """
+        writes every pending sample and span to their files
+        """
+        with self.lock:
+            rows = self._drain_samples()
+            spans = self._drain_spans()
+
+            if self.path is not None and rows:
+                if self.fmt == "jsonl":
+                    self._write_jsonl(rows)
+                else:
+                    self._write_prom(rows[-1])
+
+            if self.trace_path is not None and spans:
+                self._write_trace(spans)
+
+    def _write_jsonl(self, rows):
+        with self.path.open("a") as f:
+            for row in rows:
+                record = dict(zip(METRICS, row))
+                record["tick"] = int(record["tick"])
+                f.write(json.dumps(record) + "\n")
+
+    def _write_prom(self, row):
+        lines = []
+        for name, value in zip(METRICS, row):
+            kind = "counter" if name in COUNTERS else "gauge"
+            lines.append(f"# TYPE ctower_{name} {kind}")
+            lines.append(f"ctower_{name} {value}")
+        lines.append("# TYPE ctower_dropped_samples counter")
+        lines.append(f"ctower_dropped_samples {self.dropped_samples}")
+        lines.append("# TYPE ctower_dropped_spans counter")
+        lines.append(f"ctower_dropped_spans {self.dropped_spans}")
+
+        # the file is replaced atomically, as scrapers may read it at any time
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+
+    def _write_trace(self, spans):
+        pid = os.getpid()
+        with self.trace_path.open("a") as f:
+            for phase, start, end in spans:
+                event = {
+                    "name": PHASES[phase],
+                    "ph": "X",
+                    "ts": round((start - self.t0) * 1e6, 1),
+                    "dur": round((end - start) * 1e6, 1),
+                    "pid": pid,
+                    "tid": 1,
+                }
+                f.write(("  " if not self._trace_started else ",\n  "))
+                f.write(json.dumps(event))
+                self._trace_started = True
+
+    def close(self):
+        """
+        stops the writer thread and flushes everything left
+        """
+        self.closed = True
+        self.wakeup.set()
+        self.writer.join()
+        self.flush()
+
+        if self.trace_path is not None:
+            with self.trace_path.open("a") as f:
+                f.write("\n]\n")
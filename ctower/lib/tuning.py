@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Hot reloading of the settings.
+
+A settings file (JSON, or TOML) overrides Settings constants, and may
+swap the entity archetypes:
+
+    {
+      "settings": {"SPAWN_RATE": 0.5, "ENEMY_SOFT_CAP": 300},
+      "archetypes": "balance.json",
+      "migrate": false
+    }
+
+`archetypes` is the path of an archetypes file, relative to the settings
+file, or an inline definition (see archetypes.py). The constants mirrored
+from the archetypes (costs, visibility radii, max level) are changed
+through them only. Whatever the file leaves out takes its default value
+again, so removing a line undoes it.
+
+A `Watcher` polls the modification time of the file on its own thread,
+and compiles a changed file into a `Tuning`, validated as a whole: a file
+with any error is reported (`error`) and ignored. The game takes the
+latest tuning between two ticks and applies it at once, along with the
+state derived from the settings (see Game.retune). Entities keep the
+stats they were built with, unless the file asks to migrate them.
+"""
+
+from pathlib import Path
+import threading
+
+from .settings import Settings
+from .caps import POLICIES
+from . import archetypes
+
+TYPES = dict(Settings.__annotations__)
+DEFAULTS = {name: getattr(Settings, name) for name in TYPES}
+
+# changed through the archetypes only, see archetypes.use
+MIRRORED = frozenset(archetypes.SETTINGS).union(("MAX_BUILDING_LEVEL",))
+
+# constants the entity caps and the frame pacer are built with
+CAPS = frozenset(
+    (
+        "ENEMY_SOFT_CAP",
+        "ENEMY_HARD_CAP",
+        "ENEMY_CAP_POLICY",
+        "ENEMY_MERGE_RADIUS",
+        "FRUIT_CAP",
+        "BOMB_CAP",
+    )
+)
+PACING = frozenset(("FPS", "MAX_CATCHUP_TICKS", "MAX_FRAMESKIP", "IDLE_TIMEOUT"))
+
+
+class Tuning:
+    """
+    Validated settings, ready to be applied
+    """
+
+    def __init__(self, settings, table, migrate=False, source=None):
+        self.settings = settings  # every tunable Settings constant
+        self.archetypes = table
+        self.migrate = migrate
+        self.source = source
+
+    def apply(self) -> set:
+        """
+        sets the Settings constants and the active archetypes, returns the
+        names of the constants that changed
+        """
+        before = {name: getattr(Settings, name) for name in TYPES}
+        for name, value in self.settings.items():
+            setattr(Settings, name, value)
+        archetypes.use(self.archetypes)
+        return {
+            name for name, value in before.items() if getattr(Settings, name) != value
+        }
+
+
+def _check(name, value):
+    kind = TYPES[name]
+    if kind is float:
+        kind = (int, float)
+    if isinstance(value, bool) or not isinstance(value, kind):
+        raise ValueError(f"{name} must be of type {TYPES[name].__name__}")
+    if kind is str:
+        if name == "ENEMY_CAP_POLICY" and value not in POLICIES:
+            raise ValueError(f"{name} must be one of {', '.join(POLICIES)}")
+    elif value < 0 or (name == "FPS" and value == 0):
+        raise ValueError(f"{name} must be positive")
+
+
+def compile(definition: dict, base=".", source=None) -> Tuning:
+    """
+    validates a settings definition, and compiles its archetypes; paths are
+    relative to the directory base
+    """
+    unknown = set(definition).difference(("settings", "archetypes", "migrate"))
+    if unknown:
+        raise ValueError(f"unknown keys {', '.join(sorted(unknown))}")
+
+    overrides = definition.get("settings", {})
+    if not isinstance(overrides, dict):
+        raise ValueError("settings must be a table of Settings constants")
+
+    settings = {name: value for name, value in DEFAULTS.items() if name not in MIRRORED}
+    for name, value in overrides.items():
+        if name in MIRRORED:
+            raise ValueError(f"{name} is set by the archetypes")
+        if name not in TYPES:
+            raise ValueError(f"unknown setting {name}")
+        _check(name, value)
+        settings[name] = value
+
+    table = definition.get("archetypes")
+    if table is None:
+        table = archetypes.load()
+    elif isinstance(table, dict):
+        table = archetypes.compile(table, source=source)
+    else:
+        table = archetypes.load(Path(base) / table)
+
+    migrate = definition.get("migrate", False)
+    if not isinstance(migrate, bool):
+        raise ValueError("migrate must be true or false")
+
+    return Tuning(settings, table, migrate, source)
+
+
+def load(path) -> Tuning:
+    path = Path(path)
+    return compile(archetypes.read(path), base=path.parent, source=str(path))
+
+
+class Watcher:
+    """
+    Polls the modification time of a settings file, every interval seconds
+    on its own thread, and keeps the latest tuning compiled from it until
+    the game takes it. An archetypes file it refers to is not watched: touch
+    the settings file to reload it.
+    """
+
+    def __init__(self, path, interval=Settings.TUNING_POLL_INTERVAL):
+        self.path = Path(path)
+        self.interval = interval
+        self.stamp = None
+        self.pending = None
+        self.lock = threading.Lock()
+        self.reloads = 0
+        self.errors = 0
+        self.error = None  # of the last reload, None if it went fine
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def check(self) -> bool:
+        """
+        compiles the file if it changed since the last check, returns True
+        when a new tuning is pending
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return False  # e.g. while an editor replaces it
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self.stamp:
+            return False
+        self.stamp = stamp
+
+        try:
+            tuning = load(self.path)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            self.errors += 1
+            self.error = f"{self.path}: {e}"
+            return False
+
+        with self.lock:
+            self.pending = tuning
+        self.reloads += 1
+        self.error = None
+        return True
+
+    def take(self) -> Tuning:
+        """
+        the tuning pending, if any, which is then no longer pending
+        """
+        with self.lock:
+            tuning, self.pending = self.pending, None
+        return tuning
+
+    def start(self):
+        """
+        reads the file once right away, then watches it
+        """
+        self.check()
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread.is_alive():
+            self.thread.join()
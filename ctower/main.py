@@ -13,93 +13,199 @@ from ctower.lib.entities import (
 from ctower.lib.entities import Mountain, Mine, Cannon
 from ctower.lib.entities import Spawner, Enemy
 from ctower.lib.settings import Settings
+from ctower.lib.economy import Economy
+from ctower.lib.clock import WallClock, SimClock
+from ctower.lib.pacing import FramePacer
+from ctower.lib.caps import EntityCaps
+from ctower.lib.placement import PlacementMap, disc
+from ctower.lib.pool import EntityPool
+from ctower.lib.coverage import CoverageGraph
+from ctower.lib.occupancy import OccupancyMap, footprint
+from ctower.lib.sharding import LocalEngine, ShardedEngine
+from ctower.lib.inputs import InputPipeline, AsyncKeyReader
+from ctower.lib.telemetry import Telemetry, TICK, RENDER, INPUT
+from ctower.lib.render import RenderBackend, CursesBackend, AnsiBackend
+from ctower.lib.render import ACS_HLINE, ACS_LTEE, ACS_RTEE
+from ctower.lib.hud import Hud
+from ctower.lib.snapshot import Snapshot, SnapshotBuilder, RenderThread
+from ctower.lib.lighting import LightMap
+from ctower.lib.arrivals import Arrivals, FRUIT, BOMB
+from ctower.lib.journal import Journal
+from ctower.lib.recording import CastWriter
+from ctower.lib.tuning import Watcher
+from ctower.lib.profiling import Profiler
+from ctower.lib import tuning
+from ctower.lib import journal, recording
 
 from dataclasses import dataclass, field
+from contextlib import nullcontext
 from playsound import playsound
 from itertools import chain
 from pathlib import Path
 
 import threading
+import argparse
+import pickle
+import termios
 import random
 import curses
 import time
 import math
 import sys
+import tty
 import os
 
 
 @dataclass
 class Game:
     screen = None
+    pacer = None
+    reader = None
+    renderer = None
+    cast = None
+    prompt = None  # key a message waits for in a hosted game, "" for any key
+    economy: Economy = field(default_factory=Economy)
+    caps: EntityCaps = field(default_factory=EntityCaps)
+    placement: PlacementMap = field(default_factory=PlacementMap)
+    pool: EntityPool = field(default_factory=EntityPool)
+    coverage: CoverageGraph = field(default_factory=CoverageGraph)
+    occupancy: OccupancyMap = field(default_factory=OccupancyMap)
+    engine: LocalEngine = field(default_factory=LocalEngine)
+    rng: random.Random = field(default_factory=random.Random)
+    clock: WallClock = field(default_factory=WallClock)
+    now: float = 0.0
+    sound: bool = True
+    sounds_played: int = 0
+    outcome: str = None
+    telemetry: Telemetry = None
+    async_input: bool = False
+    backend: RenderBackend = None
+    frame_bytes: int = 0
+    render_thread: bool = False
+    enemy_cohorts: int = Settings.ENEMY_COHORTS
+    journal: Journal = None
+    watcher: Watcher = None  # of the settings file
+    record: str = None  # path of the asciicast to record to
+    resumed: bool = False
+    hosted: bool = False  # stepped by a multi-session Host, see host.py
+
+    # attributes saved in checkpoints, init() rebuilds everything else
+    WORLD = (
+        "rng",
+        "clock",
+        "now",
+        "ticks",
+        "outcome",
+        "sounds_played",
+        "enemy_clock",
+        "enemy_phase",
+        "enemy_steps",
+        "enemy_cohorts",
+        "spawned",
+        "arrivals",
+        "walk_seed",
+        "caps",
+        "economy",
+        "player",
+        "base",
+        "trap",
+        "mountains",
+        "spawners",
+        "enemies",
+        "fruits",
+        "bombs_topick",
+        "bombs_activated",
+        "mines",
+        "cannons",
+        "satelites",
+        "linterns",
+        "buildings",
+    )
 
     @classmethod
     def create(cls):
-        game = cls()
+        # game time moves with the simulation ticks, paced to real time
+        game = cls(clock=SimClock(time.time()))
         return game
 
-    def initscr(self, screen):
+    @classmethod
+    def headless(cls, height=40, width=160, seed=None, backend=None):
+        """
+        creates a game without a curses screen, driven by a simulated clock,
+        ready to be advanced with tick(). Nothing is drawn unless a render
+        backend is given.
+        """
+        game = cls(rng=random.Random(seed), clock=SimClock(), sound=False)
+        if backend is not None:
+            game.backend = backend
+            game.backend.setup()
+        game.set_limits(height, width)
+        game.init()
+        return game
 
+    def initscr(self, screen):
         self.screen = screen
+        self.run(CursesBackend(screen))
 
-        # Curses Settings
-        curses.curs_set(False)  # Do not display blinking cursor
-        curses.noecho()
-        curses.cbreak()
-        curses.start_color()
-
-        # Curses Color Pairs
-        curses.init_color(curses.COLOR_BLACK, 0, 100, 100)
-        curses.init_pair(1, 250, 0)  # Default Color
-        curses.init_pair(2, 137, 236)
-
-        curses.init_pair(3, curses.COLOR_MAGENTA, 0)  # FRUIT
-        curses.init_pair(4, curses.COLOR_MAGENTA, 243)  # FRUIT
-
-        curses.init_pair(5, curses.COLOR_YELLOW, 0)  # ENEMIES
-        curses.init_pair(6, curses.COLOR_YELLOW, 243)  # ENEMIES
-
-        curses.init_pair(7, curses.COLOR_GREEN, 0)  # BASE
-        curses.init_pair(8, curses.COLOR_GREEN, 243)  # BASE
+    def run(self, backend):
+        """
+        sets up the render backend, and plays a new (or the resumed) game on it
+        """
+        self.attach(backend)
+        self.loop()
 
-        curses.init_pair(9, curses.COLOR_BLUE, 0)  # ENEMY TRAPPED
-        curses.init_pair(10, curses.COLOR_BLUE, 243)  # ENEMY TRAPPED
+    def attach(self, backend):
+        """
+        sets up the render backend, and a new game on it unless resumed
+        """
+        if self.record is not None:
+            self.cast = CastWriter(self.record, *backend.size())
+            backend = recording.record(backend, self.cast)
 
-        curses.init_pair(11, curses.COLOR_RED, 0)  # MOUNTAIN
-        curses.init_pair(12, curses.COLOR_RED, 243)  # MOUNTAIN
+        self.backend = backend
+        self.backend.setup()
 
-        curses.init_pair(13, 25, 231)  # PLAYER
-        curses.init_pair(14, 25, 247)  # PLAYER
+        if not self.resumed:
+            self.set_limits(*self.backend.size())
+        else:
+            rows, cols = self.size
+            size = self.backend.size()
+            if size[0] < rows or size[1] < cols:
+                raise SystemExit(
+                    f"A {rows}x{cols} terminal is needed to resume this game"
+                )
 
-        curses.init_pair(15, 199, 0)  # ENEMY TRAPPED
-        curses.init_pair(16, 199, 243)  # ENEMY TRAPPED
+        # Draw Window Borders
+        self.backend.put(self.max_y + 1, 0, ACS_LTEE)
+        self.backend.put(self.max_y + 1, self.max_x + 1, ACS_RTEE)
 
-        curses.init_pair(17, 225, 0)  # LINTERN
-        curses.init_pair(18, 225, 243)  # LINTERN
+        for x in range(1, self.max_x + 1):
+            self.backend.put(self.max_y + 1, x, ACS_HLINE)
 
-        # Screen Settings
-        self.screen.keypad(True)
-        self.screen.nodelay(True)
-        self.screen.border(0)
+        if not self.resumed:
+            self.init()
 
+    def set_limits(self, rows, cols):
+        """
+        sets the world limits for a terminal of rows x cols
+        """
         self.min_y, self.min_x = (1, 1)
-        self.max_y, self.max_x = tuple(
-            i - j for i, j in zip(self.screen.getmaxyx(), (5, 2))
-        )
+        self.max_y, self.max_x = tuple(i - j for i, j in zip((rows, cols), (5, 2)))
 
         self.screen_limits = (self.min_y, self.max_y, self.min_x, self.max_x)
         self.screen_center = (self.max_y // 2, self.max_x // 2)
         self.screen_size = (self.max_x - self.min_x) * (self.max_y - self.min_y)
-
-        # Draw Window Borders
-        self.screen.addch(self.max_y + 1, 0, curses.ACS_SSSB)
-        self.screen.addch(self.max_y + 1, self.max_x + 1, curses.ACS_SBSS)
-
-        for x in range(1, self.max_x + 1):
-            self.screen.addch(self.max_y + 1, x, curses.ACS_HLINE)
-
-        self.init()
+        self.size = (rows, cols)
 
     def init(self):
+        self.now = self.clock.now()
+        self.enemy_clock = self.now
+        self.enemy_phase = 0
+        self.enemy_steps = 0
+        self.ticks = 0
+        self.spawned = 0
+        self.outcome = None
+
         # Game Components
         self.player = Player(*self.screen_center, world_limits=self.screen_limits)
         self.trap = Trap(*self.screen_center)
@@ -109,8 +215,8 @@ class Game:
             Mountain(y, x)
             for y, x in [
                 (
-                    random.randint(self.min_y, self.max_y),
-                    random.randint(self.min_x, self.max_x),
+                    self.rng.randint(self.min_y, self.max_y),
+                    self.rng.randint(self.min_x, self.max_x),
                 )
                 for i in range(10)
             ]
@@ -120,13 +226,22 @@ class Game:
             Spawner(y, x)
             for y, x in [
                 (
-                    random.randint(self.min_y, self.max_y),
-                    random.randint(self.min_x, self.max_x),
+                    self.rng.randint(self.min_y, self.max_y),
+                    self.rng.randint(self.min_x, self.max_x),
                 )
                 for i in range(self.screen_size // 400)
             ]
         ]
 
+        # seed of the zombies random walks
+        self.walk_seed = self.rng.getrandbits(63)
+        self.arrivals = Arrivals()
+        self.arrival_rates = None
+
+        self.economy = Economy()
+        self.placement = PlacementMap()
+        self.occupancy = OccupancyMap()
+        self.coverage = CoverageGraph()
         self.satelites = []
         self.mines = []
         self.cannons = []
@@ -143,275 +258,337 @@ class Game:
         )
 
         self.area_fog = set()
+        self.area_light = set()
+        self.lighting = LightMap(self.screen_limits)
+        self.light_frame = None
+        self.buildings = []
+        self.blasts = {}
+        self.blasts_drawn = {}
+        self.hud = Hud()
+        self.snapshots = SnapshotBuilder()
+
+        # Player actions, by name, shared by the keyboard and scripted bots
+        self.ACTIONS = {
+            "move_left": lambda: self.player.move(dx=-1),
+            "move_down": lambda: self.player.move(dy=1),
+            "move_up": lambda: self.player.move(dy=-1),
+            "move_right": lambda: self.player.move(dx=1),
+            "build_base": self.build_base,
+            "build_mine": self.build_mine,
+            "build_cannon": self.build_cannon,
+            "build_lantern": self.build_lantern,
+            "upgrade_building": self.upgrade_building,
+            "sell_building": self.sell_building,
+            "throw_bomb": self.throw_bomb,
+            "deploy_trap": self.deploy_trap,
+        }
 
         self.KEY_BINDINGS = {
-            ord("q"): sys.exit,
-            ord("h"): lambda: self.player.move(dx=-1),
-            ord("j"): lambda: self.player.move(dy=1),
-            ord("k"): lambda: self.player.move(dy=-1),
-            ord("l"): lambda: self.player.move(dx=1),
-            curses.KEY_DOWN: lambda: self.player.move(dy=1),
-            curses.KEY_UP: lambda: self.player.move(dy=-1),
-            curses.KEY_LEFT: lambda: self.player.move(dx=-1),
-            curses.KEY_RIGHT: lambda: self.player.move(dx=1),
-            ord("v"): self.build_base,
-            ord("m"): self.build_mine,
-            ord("c"): self.build_cannon,
-            ord("u"): self.upgrade_building,
-            ord("s"): self.sell_building,
-            ord("b"): self.throw_bomb,
-            ord("g"): self.build_lantern,
+            ord("q"): self.quit,
+            ord("h"): self.ACTIONS["move_left"],
+            ord("j"): self.ACTIONS["move_down"],
+            ord("k"): self.ACTIONS["move_up"],
+            ord("l"): self.ACTIONS["move_right"],
+            curses.KEY_DOWN: self.ACTIONS["move_down"],
+            curses.KEY_UP: self.ACTIONS["move_up"],
+            curses.KEY_LEFT: self.ACTIONS["move_left"],
+            curses.KEY_RIGHT: self.ACTIONS["move_right"],
+            ord("v"): self.ACTIONS["build_base"],
+            ord("m"): self.ACTIONS["build_mine"],
+            ord("c"): self.ACTIONS["build_cannon"],
+            ord("u"): self.ACTIONS["upgrade_building"],
+            ord("s"): self.ACTIONS["sell_building"],
+            ord("b"): self.ACTIONS["throw_bomb"],
+            ord("g"): self.ACTIONS["build_lantern"],
             ord("p"): self.pause,
             curses.KEY_F1: self.help,
-            ord(" "): self.deploy_trap,
+            ord(" "): self.ACTIONS["deploy_trap"],
         }
 
-        self.loop()
+        # Movement keys, coalesced by the input pipeline into one displacement
+        self.MOVE_KEYS = {
+            ord("h"): (0, -1),
+            ord("j"): (1, 0),
+            ord("k"): (-1, 0),
+            ord("l"): (0, 1),
+            curses.KEY_DOWN: (1, 0),
+            curses.KEY_UP: (-1, 0),
+            curses.KEY_LEFT: (0, -1),
+            curses.KEY_RIGHT: (0, 1),
+        }
+
+        self.inputs = InputPipeline(self.KEY_BINDINGS, self.MOVE_KEYS, self.player.move)
 
     def loop(self):
+        self.pacer = FramePacer()
+        telemetry = self.telemetry
+        journal = self.journal
+        frame_time = 0.0
+
+        if self.async_input and self.reader is None:
+            self.reader = AsyncKeyReader(self.inputs).start()
+
+        if self.render_thread and self.renderer is None:
+            self.renderer = RenderThread(self.present).start()
 
-        clock = time.time()
         while True:
+            frame_start = time.perf_counter()
+
+            ticks = self.pacer.due()
+            if ticks > 0 and self.reader is None:
+                self.inputs.drain(self.screen)
+
+            if ticks > 0 and self.watcher is not None and self.watcher.pending:
+                self.retune()
+
+            for i in range(ticks):
+                # Every key received is processed along with the first tick
+                commands = self.inputs.commands() if i == 0 else []
+                if i == 0 and journal is not None and self.inputs.last:
+                    journal.input(self.ticks, self.inputs.last)
+
+                if telemetry is not None:
+                    telemetry.begin(TICK)
+                    self.tick(*commands)
+                    telemetry.end(TICK)
+                    telemetry.sample(self, self.ticks, frame_time)
+                else:
+                    self.tick(*commands)
 
-            # 1. Process Buildings (Mine -> Dig, Cannon -> Shoot...)
-            #    ,unless they are destroyed by an enemy,
-            #     and pay for maintenance
+            if ticks > 0 and journal is not None:
+                journal.mark(self.ticks)
+                if journal.due(self.ticks):
+                    journal.checkpoint(self.ticks, self.save_state())
 
-            self.buildings = list(chain(self.mines, self.cannons, self.satelites))
-            for building in self.buildings:
-                if building.health <= 0:
-                    self.buildings.remove(building)
-                    self.clear(building)
+            if ticks > 0 and self.renderer is not None:
+                # the render thread draws on its own, as soon as it is free
+                if self.renderer.wanted:
+                    self.renderer.publish(self.snapshot())
 
-                    if building.kind == "Mine":
-                        self.mines.remove(building)
+            elif ticks > 0 and self.pacer.render():
+                if telemetry is not None:
+                    telemetry.begin(RENDER)
 
-                    elif building.kind == "Cannon":
-                        self.cannons.remove(building)
+                self.present(self.snapshot())
 
-                    elif building.kind == "Satelite":
-                        # When a satelite is destroyed, all dependent buildings collapses next turn.
-                        self.satelites.remove()
+                if telemetry is not None:
+                    telemetry.end(RENDER)
 
-                        dependents = nearby_entities(
-                            building,
-                            chain(self.mines, self.cannons),
-                            Settings.SATELITE_VISIBILITY,
-                        )
-                        if dependents is not None:
-                            for building_dep in dependents:
-                                building_dep.health = 0
+            if ticks > 0:
+                frame_time = time.perf_counter() - frame_start
 
-                else:
-                    if building.kind == "Mine" and building.dig_success():
-                        self.base.gold += building.dig_value
-
-                    elif building.kind == "Cannon" and building.shot_success():
-                        target = nearby_entities(
-                            building,
-                            self.enemies,
-                            d=building.production_rate,
-                            ret="choice",
-                        )
-
-                        if target is not None and target in self.enemies:
-                            self.enemies.remove(target)
-                            self.clear(target)
-                            self.player.points += 1
-                            building.kills += 1
-
-                        if self.base.gold < building.maintenance_cost:
-                            self.base.gold += building.cost_to_recover()
-                            self.buildings.remove(building)
-                            self.clear(building)
-
-                        else:
-                            self.base.gold -= building.maintenance_cost
-
-            # 2. Spawn Enemies
-            if random.randint(0, 1000) < Settings.SPAWNER_CHANCE + self.player.level:
-                s = random.choice(self.spawners)
-                self.enemies.append(s.spawn())
-
-            # 3. Enemies Actions
-            if time.time() > clock + max(0.2, 1 - self.player.level / 12):
-                for enemy in self.enemies:
-
-                    # a. scan targets
-                    targets = [
-                        {"target": target, "distance": enemy.distance(target)}
-                        for target in chain(
-                            self.buildings,
-                            [
-                                self.base,
-                                self.player,
-                            ],
-                        )
-                        if enemy.distance(target) < Settings.ENEMY_VISIBILITY
-                    ]
-
-                    # b. Choose the nearest target and moves towards it
-                    # TODO: Set weight to target kinds
-                    if len(targets) > 0:
-                        target = sorted(targets, key=lambda x: x["distance"])[0][
-                            "target"
-                        ]
-
-                        dx = int(math.copysign(1, target.x - enemy.x))
-                        dy = int(math.copysign(1, target.y - enemy.y))
-
-                    # if no targets, move randomly
-                    else:
-                        dy = random.randint(-1, 1)
-                        dx = random.randint(-1, 1)
-
-                    if (enemy.y, enemy.x) in self.area_light:
-                        self.clear(enemy)
-
-                    enemy.move(
-                        max(1, min(self.max_y, enemy.y + dy)),
-                        max(1, min(self.max_x, enemy.x + dx)),
-                    )
-
-                    # c. check collisions with player, buildings, base
-                    if collision(self.player, enemy):
-                        combat_result = random.randint(0, 99)
-                        if combat_result < 80 and enemy in self.enemies:
-                            play_sound("pos")
-                            self.enemies.remove(enemy)
-                            self.player.points += 1
-                            self.player.health -= random.randint(0, 2)
-
-                        else:
-                            play_sound("scream_fight")
-                            self.player.health -= random.randint(5, 10)
-
-                    for building in self.buildings:
-                        if collision(enemy, building):
-                            building.health -= random.randint(0, 2)
-
-                    if collision(self.base, enemy) and enemy in self.enemies:
-                        self.enemies.remove(enemy)
-                        self.player.points += 1
-                        self.base.health -= random.randint(0, 5)
-
-                    if self.trap.deployed:
-                        if distance(self.trap, enemy) <= 5 and enemy in self.enemies:
-                            self.enemies.remove(enemy)
-                            enemy.color = 9
-                            self.render(enemy)
-
-                clock = time.time()
-
-            # 4. Monitor Activated Bombs
-            if len(self.bombs_activated) > 0:
-                for bomb in self.bombs_activated:
-
-                    for (y, x) in bomb.area.intersection(self.screen_area):
-                        self.screen.addstr(y, x, "~", curses.color_pair(6))
-
-                    if bomb.is_kaboom:
-                        play_sound("kaboom")
-
-                        victims = nearby_entities(
-                            bomb,
-                            chain(
-                                self.enemies,
-                                self.spawners,
-                                [
-                                    self.player,
-                                ],
-                            ),
-                            d=bomb.strength,
-                        )
-
-                        if victims is not None:
-                            for victim in victims:
-                                if victim.kind == "Player":
-                                    play_sound("scream-bomb")
-                                    self.player.health -= 50
-
-                                else:
-                                    victim.health -= 5
-
-                        for (y, x) in bomb.area.intersection(self.screen_area):
-                            self.clear(y, x)
-
-                        self.bombs_activated.remove(bomb)
-                        self.clear(bomb)
-
-            for enemy in chain(self.enemies, self.spawners):
-                if enemy.health < 0 and enemy in chain(self.enemies, self.spawners):
-                    if enemy.kind == "Zombie":
-                        self.enemies.remove(enemy)
-                    elif enemy.kind == "Spawner":
-                        self.spawners.remove(enemy)
-
-                    self.clear(enemy)
-                    self.player.points += enemy.level
-
-            ## Recover Trap
-            if self.trap.deployed and distance(self.trap, self.player) == 0:
-                self.trap.deployed = False
-
-            ## Fruit Spawner
-            if random.randint(0, 1000) < 2:
-                self.fruits.append(
-                    Fruit(
-                        random.randint(self.min_y, self.max_y),
-                        random.randint(self.min_x, self.max_x),
-                    )
-                )
+            if self.outcome == "gameover":
+                self.gameover()
 
-            ## Bombs Spawner
-            if random.randint(0, 1000) < 1:
-                self.bombs_topick.append(
-                    Bomb(
-                        random.randint(self.min_y, self.max_y),
-                        random.randint(self.min_x, self.max_x),
-                    )
-                )
+            elif self.outcome == "gamewon":
+                self.gamewon()
 
-            ## Fruit check for collision
-            if len(self.fruits) > 0:
-                for fruit in self.fruits:
-                    if collision(self.player, fruit):
-                        play_sound("bonus")
-                        self.player.health += 10
-                        self.fruits.remove(fruit)
+            elif self.outcome == "quit":
+                sys.exit()
 
-            if len(self.bombs_topick) > 0:
-                for bomb in self.bombs_topick:
-                    if collision(self.player, bomb):
-                        play_sound("bonus")
-                        self.player.bombs += 1
-                        self.bombs_topick.remove(bomb)
+            # Wait for input for the rest of the frame budget
+            if telemetry is not None:
+                telemetry.begin(INPUT)
 
-            # Process the keystroke
-            key = self.screen.getch()
+            timeout = self.pacer.timeout(idle=self.is_idle())
+            if self.reader is not None:
+                self.inputs.wait(timeout / 1000)
+            else:
+                self.screen.timeout(timeout)
+                self.inputs.feed(self.screen.getch())
 
-            if key in self.KEY_BINDINGS.keys():
-                self.KEY_BINDINGS[key]()
+            if telemetry is not None:
+                telemetry.end(INPUT)
 
-            self.render_all()
-            self.print_stats()
+    def is_idle(self):
+        """
+        True when nothing in the world has to be updated at the frame rate,
+        so the loop can block waiting for input
+        """
+        return not (
+            self.enemies
+            or self.bombs_activated
+            or self.mines
+            or self.cannons
+            or self.trap.deployed
+        )
 
-            # Gameover Condition
-            if (
-                self.player.health <= 0
-                or self.base.health <= 0
-                or (
-                    self.base.gold < Settings.MINE_INITIAL_COST and len(self.mines) == 0
+    def tick(self, *commands):
+        """
+        advances the world one step, running the player commands (callables,
+        usually from KEY_BINDINGS or ACTIONS) after the world update, and
+        sets self.outcome when the game is over
+        """
+        self.now = self.clock.now()
+
+        # 1. Process Buildings (Mine -> Dig, Cannon -> Shoot...)
+        #    ,unless they are destroyed by an enemy,
+        #     and pay for maintenance
+
+        self.buildings = list(chain(self.mines, self.cannons, self.satelites))
+        for building in list(self.buildings):
+            if building.health <= 0:
+                self.buildings.remove(building)
+                self.economy.unregister(building)
+                self.placement.invalidate()
+                self.clear(building)
+
+                if building.kind == "Mine":
+                    self.mines.remove(building)
+                    self.coverage.remove_building(building)
+
+                elif building.kind == "Cannon":
+                    self.cannons.remove(building)
+                    self.coverage.remove_building(building)
+
+                elif building.kind == "Satelite":
+                    # When a satelite is destroyed, the buildings that only
+                    # depended on it collapse next turn.
+                    self.satelites.remove(building)
+
+                    for building_dep in self.coverage.remove_provider(building):
+                        building_dep.health = 0
+
+        # Mines production and cannons maintenance are settled in one pass
+        fired, unpaid = self.economy.settle(self.base, self.now)
+
+        for building in fired:
+            target = nearby_entities(
+                building,
+                self.enemies,
+                d=building.production_rate,
+                ret="choice",
+                rng=self.rng,
+            )
+
+            if target is not None and target in self.enemies:
+                self.enemies.remove(target)
+                self.clear(target)
+                self.pool.release(target)
+                self.player.points += 1
+                building.kills += 1
+
+        # Cannons that can not be maintained are sold
+        for building in unpaid:
+            self.remove_building(building)
+            self.clear(building)
+
+        # 2. Spawn Enemies, fruits and bombs, as they arrive
+        self.schedule()
+        for source in self.arrivals.due(self.now, self.rng):
+            if source == FRUIT:
+                self.fruits.append(self.pool.acquire(Fruit, *self.random_cell()))
+            elif source == BOMB:
+                self.bombs_topick.append(
+                    self.pool.acquire(Bomb, *self.random_cell(), t0=self.now)
                 )
-            ):
-                self.gameover()
+            elif self.caps.allow_spawn(self):
+                self.spawned += 1
+                self.enemies.append(source.spawn(self.spawned, pool=self.pool))
+
+        # 3. Enemies Actions, in round-robin cohorts of zombies: each one
+        #    moves once per cadence window, on its own frame of the window
+        cadence = max(0.2, 1 - self.player.level / 12)
+        cohorts = max(1, self.enemy_cohorts)
+        while self.now > self.enemy_clock + cadence * (self.enemy_phase + 1) / cohorts:
+            self.step_enemies(self.enemy_phase, cohorts)
+            self.enemy_phase += 1
+            if self.enemy_phase == cohorts:
+                self.enemy_phase = 0
+                self.enemy_steps += 1
+                self.enemy_clock = self.now
+
+        # 4. Monitor Activated Bombs, the ones going off together are
+        #    resolved in one pass
+        exploding = [bomb for bomb in self.bombs_activated if bomb.explodes(self.now)]
+        if exploding:
+            self.explode(exploding)
+
+        for enemy in chain(self.enemies, self.spawners):
+            if enemy.health < 0 and enemy in chain(self.enemies, self.spawners):
+                if enemy.kind == "Zombie":
+                    self.enemies.remove(enemy)
+                elif enemy.kind == "Spawner":
+                    self.spawners.remove(enemy)
+
+                self.clear(enemy)
+                self.player.points += enemy.level
+
+                if enemy.kind == "Zombie":
+                    self.pool.release(enemy)
+
+        ## Recover Trap
+        if self.trap.deployed and distance(self.trap, self.player) == 0:
+            self.trap.deployed = False
+
+        ## Keep the number of entities bounded
+        self.caps.enforce(self)
+
+        ## Fruits and bombs picked up by the player
+        self.occupy()
+        for entity in list(self.occupancy.at(self.player.y, self.player.x)):
+            if isinstance(entity, Fruit):
+                self.sfx("bonus")
+                self.player.health += 10
+                self.fruits.remove(entity)
+                self.pool.release(entity)
+
+            elif isinstance(entity, Bomb):
+                self.sfx("bonus")
+                self.player.bombs += 1
+                self.bombs_topick.remove(entity)
+                self.pool.release(entity)
+
+        for command in commands:
+            command()
 
-            # Gamewon Condition
-            if len(self.spawners) == 0:
-                self.gamewon()
+        self.player.level = self.player.points // 20 + 1
 
-            self.screen.refresh()
-            curses.napms(1000 // Settings.FPS)
+        # Gameover Condition
+        if (
+            self.player.health <= 0
+            or self.base.health <= 0
+            or (self.base.gold < Settings.MINE_INITIAL_COST and len(self.mines) == 0)
+        ):
+            self.outcome = "gameover"
+
+        # Gamewon Condition
+        elif len(self.spawners) == 0:
+            self.outcome = "gamewon"
+
+        self.ticks += 1
+        self.clock.advance(1 / Settings.FPS)
+
+    def schedule(self):
+        """
+        sets the arrival rates: the zombies are shared by the spawners in
+        proportion to their levels, and grow with the player level
+        """
+        total = Settings.SPAWN_RATE + Settings.SPAWN_RATE_PER_LEVEL * self.player.level
+        key = (
+            total,
+            Settings.FRUIT_RATE,
+            Settings.BOMB_RATE,
+            id(self.spawners),
+            len(self.spawners),
+        )
+        if key == self.arrival_rates:
+            return
+        self.arrival_rates = key
+
+        arrivals = self.arrivals
+        arrivals.keep(self.spawners)
+        levels = sum(spawner.level for spawner in self.spawners)
+        for spawner in self.spawners:
+            arrivals.set(spawner, total * spawner.level / levels, self.now, self.rng)
+        arrivals.set(FRUIT, Settings.FRUIT_RATE, self.now, self.rng)
+        arrivals.set(BOMB, Settings.BOMB_RATE, self.now, self.rng)
+
+    def random_cell(self) -> tuple:
+        return (
+            self.rng.randint(self.min_y, self.max_y),
+            self.rng.randint(self.min_x, self.max_x),
+        )
 
     def build_base(self):
         # first deploy base
@@ -419,6 +596,8 @@ class Game:
             self.base.deployed = True
             self.base.y = self.player.y
             self.base.x = self.player.x
+            self.placement.invalidate()
+            self.coverage.add_provider(self.base, chain(self.mines, self.cannons))
 
         # next, deploy satelites
         else:
@@ -437,73 +616,40 @@ class Game:
                 and self.base.gold >= Settings.SATELITE_INITIAL_COST
             ):
                 self.base.gold -= Settings.SATELITE_INITIAL_COST
-                self.satelites.append(Satelite(self.player.y, self.player.x))
+                satelite = Satelite(self.player.y, self.player.x)
+                self.satelites.append(satelite)
+                self.placement.invalidate()
+                self.coverage.add_provider(satelite, chain(self.mines, self.cannons))
 
     def build_mine(self):
-        # build mine, in the distance of 1 of a mine, but not ontop and
-        # not possible in an already built mine
-        # returns success
+        # build mine, in the distance of 1 of a mountain, but not ontop, in
+        # an empty cell within the influence of the base or a satelite
         if (
             self.base.deployed
-            and nearby_entities(
-                self.player,
-                chain(
-                    self.buildings,
-                    self.mountains,
-                    [
-                        self.base,
-                    ],
-                ),
-            )
-            is None
-            and nearby_entities(
-                self.player,
-                chain(
-                    self.satelites,
-                    [
-                        self.base,
-                    ],
-                ),
-                d=10,
-            )
-            is not None
-            and min(self.player.distance(mnt) for mnt in self.mountains) == 1
+            and self.placement.can_build_mine(self, self.player.y, self.player.x)
             and self.base.gold >= Settings.MINE_INITIAL_COST
         ):
             self.base.gold -= Settings.MINE_INITIAL_COST
-            self.mines.append(Mine(self.player.y, self.player.x))
+            mine = Mine(self.player.y, self.player.x, clock=self.now)
+            self.mines.append(mine)
+            self.economy.register(mine)
+            self.coverage.add_building(mine, chain(self.satelites, [self.base]))
+            self.placement.invalidate()
 
     def build_cannon(self):
         # build cannon
         # not possible in an already built building
         if (
             self.base.deployed
-            and nearby_entities(
-                self.player,
-                chain(
-                    self.buildings,
-                    self.mountains,
-                    [
-                        self.base,
-                    ],
-                ),
-            )
-            is None
-            and nearby_entities(
-                self.player,
-                chain(
-                    self.satelites,
-                    [
-                        self.base,
-                    ],
-                ),
-                d=10,
-            )
-            is not None
+            and self.placement.can_build_cannon(self, self.player.y, self.player.x)
             and self.base.gold >= Settings.CANNON_INITIAL_COST
         ):
             self.base.gold -= Settings.CANNON_INITIAL_COST
-            self.cannons.append(Cannon(self.player.y, self.player.x))
+            cannon = Cannon(self.player.y, self.player.x, clock=self.now)
+            self.cannons.append(cannon)
+            self.economy.register(cannon)
+            self.coverage.add_building(cannon, chain(self.satelites, [self.base]))
+            self.placement.invalidate()
 
     def deploy_trap(self):
         if self.trap.deployed == False:
@@ -518,70 +664,180 @@ class Game:
 
     def throw_bomb(self):
         if self.player.bombs > 0:
-            self.bombs_activated.append(Bomb(self.player.y, self.player.x))
+            self.bombs_activated.append(
+                self.pool.acquire(Bomb, self.player.y, self.player.x, t0=self.now)
+            )
             self.player.bombs -= 1
 
+    def blast(self, bomb) -> frozenset:
+        """
+        cells of the screen hit by bomb, computed once per bomb
+        """
+        cells = self.blasts.get(id(bomb))
+        if cells is None:
+            cells = frozenset(
+                (bomb.y + dy, bomb.x + dx) for dy, dx in disc(bomb.strength)
+            ).intersection(self.screen_area)
+            self.blasts[id(bomb)] = cells
+        return cells
+
+    def explode(self, bombs):
+        """
+        resolves the bombs going off on this tick, looking their victims up
+        in an index of the zombies, spawners and player by cell
+        """
+        victims = {}
+        for entity in chain(self.enemies, self.spawners, [self.player]):
+            victims.setdefault((entity.y, entity.x), []).append(entity)
+
+        for bomb in bombs:
+            self.sfx("kaboom")
+            blast = self.blast(bomb)
+
+            for cell in blast.intersection(victims):
+                for victim in victims[cell]:
+                    if victim.kind == "Player":
+                        self.sfx("scream-bomb")
+                        self.player.health -= 50
+
+                    else:
+                        victim.health -= 5
+
+            del self.blasts[id(bomb)]
+
+        exploded = set(id(bomb) for bomb in bombs)
+        self.bombs_activated = [
+            bomb for bomb in self.bombs_activated if id(bomb) not in exploded
+        ]
+        for bomb in bombs:
+            self.pool.release(bomb)
+
+    def step_enemies(self, phase=0, cohorts=1):
+        """
+        moves the cohort of zombies whose uid is phase modulo cohorts, and
+        resolves their contacts
+        """
+        if cohorts == 1:
+            cohort = self.enemies
+        else:
+            cohort = [enemy for enemy in self.enemies if enemy.uid % cohorts == phase]
+
+        # a. every zombie of the cohort moves towards the nearest target in sight,
+        #    or randomly if there is none
+        # TODO: Set weight to target kinds
+        targets = [
+            (target.y, target.x)
+            for target in chain(self.buildings, [self.base, self.player])
+        ]
+        self.engine.move(
+            self.enemies,
+            targets,
+            self.enemy_steps,
+            self.walk_seed,
+            self.screen_limits,
+            phase,
+            cohorts,
+        )
+
+        # b. check collisions with player, buildings, base and trap, by
+        #    looking up the cell each zombie moved to
+        self.occupy()
+        trapped = (
+            footprint(self.trap.y, self.trap.x, Settings.TRAP_RADIUS)
+            if self.trap.deployed
+            else ()
+        )
+
+        gone = []
+        removed = set()
+        for enemy in cohort:
+            here = self.occupancy.at(enemy.y, enemy.x)
+            if not here and (enemy.y, enemy.x) not in trapped:
+                continue
+
+            if any(entity is self.player for entity in here):
+                combat_result = self.rng.randint(0, 99)
+                if combat_result < 80:
+                    self.sfx("pos")
+                    removed.add(id(enemy))
+                    gone.append(enemy)
+                    self.player.points += 1
+                    self.player.health -= self.rng.randint(0, 2)
+
+                else:
+                    self.sfx("scream_fight")
+                    self.player.health -= self.rng.randint(5, 10)
+
+            for building in here:
+                if isinstance(building, (Mine, Cannon, Satelite)):
+                    building.health -= self.rng.randint(0, 2)
+
+            if any(entity is self.base for entity in here) and (
+                id(enemy) not in removed
+            ):
+                removed.add(id(enemy))
+                gone.append(enemy)
+                self.player.points += 1
+                self.base.health -= self.rng.randint(0, 5)
+
+            if (enemy.y, enemy.x) in trapped and id(enemy) not in removed:
+                removed.add(id(enemy))
+                gone.append(enemy)
+                enemy.color = 9
+                self.render(enemy)
+
+        if removed:
+            self.enemies[:] = [e for e in self.enemies if id(e) not in removed]
+
+        for enemy in gone:
+            self.pool.release(enemy)
+
+    def occupy(self):
+        """
+        brings the occupancy map up to date with the entities zombies can
+        run into
+        """
+        occupancy = self.occupancy
+        occupancy.layer("mines", self.mines)
+        occupancy.layer("cannons", self.cannons)
+        occupancy.layer("satelites", self.satelites)
+        occupancy.layer("fruits", self.fruits, self.pool.revision(Fruit))
+        occupancy.layer("bombs", self.bombs_topick, self.pool.revision(Bomb))
+        occupancy.place(self.base)
+        occupancy.place(self.player)
+
     def upgrade_building(self):
         building = nearby_entities(self.player, self.buildings, ret="one")
 
-        if building is not None and building.level < 9:
+        if building is not None and building.level < Settings.MAX_BUILDING_LEVEL:
             cost = building.cost_to_upgrade()
             if self.base.gold >= cost:
                 self.base.gold -= cost
                 building.upgrade()
+                self.economy.refresh(building)
 
     def sell_building(self):
         building = nearby_entities(self.player, self.buildings, ret="one")
         if building is not None:
-            self.base.gold += building.cost_to_recover()
+            self.remove_building(building)
+
+    def remove_building(self, building):
+        """
+        removes a mine or cannon from the world, recovering part of its cost
+        """
+        self.base.gold += building.cost_to_recover()
+        if building in self.buildings:
             self.buildings.remove(building)
-            if building.kind == "Mine":
-                self.mines.remove(building)
-            elif building.kind == "Cannon":
-                self.cannons.remove(building)
+        if building.kind == "Mine":
+            self.mines.remove(building)
+        elif building.kind == "Cannon":
+            self.cannons.remove(building)
+        self.economy.unregister(building)
+        self.placement.invalidate()
+        self.coverage.remove_building(building)
 
     def print_stats(self):
-        place = nearby_entities(
-            self.player,
-            chain(
-                self.mines,
-                self.cannons,
-                self.mountains,
-                self.satelites,
-                [
-                    self.base,
-                ],
-            ),
-            ret="one",
-        )
-
-        stats_line0 = f"Coord: ({self.player.y:3},{self.player.x:3})"
-        if place is not None:
-            stats_line0 += (
-                f"  Place: {place.kind}, lvl: {place.level}, health: {place.health}"
-            )
-
-            if place.kind == "Mine":
-                stats_line0 += f", production: {place.production_rate}, cost to (u)pgrade: {place.cost_to_upgrade()}, (s)ell for {place.cost_to_recover()}"
-                stats_line0 += f"  Time: {place.time_pending}"
-
-            elif place.kind == "Cannon":
-                stats_line0 += f", kills: {place.kills}, cost to (u)pgrade: {place.cost_to_upgrade()}"
-                stats_line0 += f"  Time: {place.time_pending}"
-
-        stats_line1 = f"Level: {self.player.level:2}     "
-        stats_line1 += f"Health: {self.player.health:3}     "
-        stats_line1 += f"Points: {self.player.points:3}     "
-        stats_line1 += f"Base Health: {self.base.health:3}     "
-        stats_line1 += f"Gold: {self.base.gold:4}     "
-        stats_line1 += f"Enemies: {len(self.enemies):3}     "
-        stats_line1 += f"Bombs: {self.player.bombs:3}"
-
-        self.screen.addstr(self.max_y + 2, 23, 138 * " ")
-        self.screen.addstr(self.max_y + 2, 5, stats_line0)
-        self.screen.addstr(self.max_y + 3, 23, stats_line1)
-
-        self.player.level = self.player.points // 20 + 1
+        self.hud.draw(self, self.backend)
 
     def help(self):
         """
@@ -605,9 +861,9 @@ class Game:
         )
 
     def pause(self):
-        self.message("PAUSE", None, curses.A_BOLD | curses.A_UNDERLINE)
+        self.message("PAUSE", None)
 
-    def message(self, text, key_continue=None, justify="center", *args):
+    def message(self, text, key_continue=None, justify="center", pair=1):
         """
         prints message in a pop-up window and waits for key to continue
         TODO: Compute x coordinates for differents values of justify
@@ -629,133 +885,283 @@ class Game:
         cols = max(len(t) for t in text) + 2
         rows = len(text)
 
-        win = curses.newwin(
-            rows + 2, cols + 2, (self.max_y - rows) // 2, (self.max_x - cols) // 2
-        )
-        win.border(0)
+        # the render thread is held while the message is on screen
+        lock = nullcontext() if self.renderer is None else self.renderer.lock
+        with lock:
+            top, left = (self.max_y - rows) // 2, (self.max_x - cols) // 2
+            self.backend.box(top, left, rows + 2, cols + 2)
 
-        for row, t in enumerate(text):
-            win.addstr(row + 1, (cols - len(t)) // 2 + 1, t, *args)
+            for row, t in enumerate(text):
+                self.backend.text(top + row + 1, left + 1, cols * " ")
+                self.backend.text(
+                    top + row + 1, left + (cols - len(t)) // 2 + 1, t, pair
+                )
 
-        win.refresh()
+            self.backend.flush()
 
-        while True:
-            key = win.getch()
-            if key is not curses.ERR:
-                if key_continue is not None:
-                    if key == ord(key_continue):
-                        break
+            if self.hosted:
+                # the host keeps the message on screen until the key arrives
+                self.prompt = key_continue or ""
+                return
+
+            while True:
+                if self.reader is None:
+                    self.screen.timeout(-1)
+                    key = self.screen.getch()
                 else:
-                    break
+                    key = self.inputs.pop()
+                if key is not curses.ERR:
+                    if key_continue is not None:
+                        if key == ord(key_continue):
+                            break
+                    else:
+                        break
+
+            self.render_all(reset_fog=True)
+
+        if self.pacer is not None:
+            self.pacer.reset()
+
+    def dismiss(self, key) -> bool:
+        """
+        closes the message of a hosted game if key is the one it waits for
+        """
+        if key == curses.ERR or (self.prompt and key != ord(self.prompt)):
+            return False
 
-        curses.endwin()
+        self.prompt = None
         self.render_all(reset_fog=True)
+        if self.pacer is not None:
+            self.pacer.reset()
+        return True
+
+    def quit(self):
+        # the game is left at the end of the frame, after a whole tick
+        self.outcome = "quit"
+
+    def save_state(self) -> bytes:
+        """
+        pickled world state, for a checkpoint
+        """
+        state = {name: getattr(self, name) for name in self.WORLD}
+        state["tick"] = self.ticks
+        state["size"] = self.size
+        return pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+
+    def load_state(self, state: dict):
+        """
+        sets up a game with the world state of a checkpoint
+        """
+        self.set_limits(*state["size"])
+        self.init()
+        for name in self.WORLD:
+            setattr(self, name, state[name])
+        if self.outcome == "quit":
+            self.outcome = None
+
+        # the coverage graph is keyed by object ids, so it is linked again
+        self.link_coverage()
+        self.inputs.move = self.player.move
+
+    def link_coverage(self):
+        """
+        links every building to the base and satelites in reach
+        """
+        buildings = list(chain(self.mines, self.cannons))
+        if self.base.deployed:
+            self.coverage.add_provider(self.base, buildings)
+        for satelite in self.satelites:
+            self.coverage.add_provider(satelite, buildings)
+
+    def resume(self, directory):
+        """
+        rebuilds the game journaled in directory, from its latest checkpoint
+        and the keys journaled after it
+        """
+        state, inputs, end = journal.load(directory)
+        self.load_state(state)
+        if self.watcher is not None:
+            self.retune()
+
+        # keys that quit or only show a message do not change the world
+        replay = InputPipeline(
+            {
+                key: command
+                for key, command in self.KEY_BINDINGS.items()
+                if command in self.ACTIONS.values()
+            },
+            self.MOVE_KEYS,
+            self.player.move,
+        )
+
+        sound, self.sound = self.sound, False
+        try:
+            while self.ticks < end:
+                for key in inputs.get(self.ticks, ()):
+                    replay.feed(key)
+                self.tick(*replay.commands())
+        finally:
+            self.sound = sound
+
+        self.resumed = True
+
+    def retune(self):
+        """
+        applies the settings file reloaded by the watcher, if it changed,
+        between two ticks: the Settings constants, the archetypes, and the
+        state of the game derived from them. The entities keep their stats,
+        unless the file asks to migrate them.
+        """
+        update = self.watcher.take()
+        if update is None:
+            return
+        changed = update.apply()
+
+        if changed & tuning.CAPS:
+            self.caps.soft = Settings.ENEMY_SOFT_CAP
+            self.caps.hard = max(Settings.ENEMY_SOFT_CAP, Settings.ENEMY_HARD_CAP)
+            self.caps.policy = Settings.ENEMY_CAP_POLICY
+            self.caps.merge_radius = Settings.ENEMY_MERGE_RADIUS
+            self.caps.fruits = Settings.FRUIT_CAP
+            self.caps.bombs = Settings.BOMB_CAP
+
+        if self.pacer is not None and changed & tuning.PACING:
+            self.pacer.dt = 1 / Settings.FPS
+            self.pacer.max_ticks = Settings.MAX_CATCHUP_TICKS
+            self.pacer.max_skip = Settings.MAX_FRAMESKIP
+            self.pacer.idle_timeout = Settings.IDLE_TIMEOUT
+        if self.renderer is not None and "FPS" in changed:
+            self.renderer.interval = 1 / Settings.FPS
+
+        if "POOL_LIMIT" in changed:
+            self.pool.limit = Settings.POOL_LIMIT
+
+        if "ENEMY_COHORTS" in changed:
+            # a new round of cohorts starts with the new count
+            self.enemy_cohorts = Settings.ENEMY_COHORTS
+            self.enemy_phase = 0
+            self.enemy_clock = self.now
+
+        if "SATELITE_VISIBILITY" in changed:
+            self.placement.reach = Settings.SATELITE_VISIBILITY
+            self.placement.invalidate()
+            self.coverage = CoverageGraph()
+            self.link_coverage()
+
+        if update.migrate:
+            for building in chain(self.mines, self.cannons):
+                building.migrate()
+
+        # light radii and symbols may have changed
+        self.snapshots = SnapshotBuilder()
+
+        if self.journal is not None:
+            self.journal.invalidate()
 
     def gameover(self):
         self.message(
             "¡¡¡ GAME OVER !!!",
             "q",
-            curses.A_STANDOUT,
+            pair=13,
         )
-        sys.exit()
+        if not self.hosted:
+            sys.exit()
 
     def gamewon(self):
         self.message(
             ["¡¡¡ CONGRATULATIONS, YOU WON !!!", "This is very impresive"], "q"
         )
-        sys.exit()
+        if not self.hosted:
+            sys.exit()
+
+    def sfx(self, asset):
+        self.sounds_played += 1
+        if self.sound:
+            play_sound(asset)
 
     def clear(self, *args):
         """
         clears one pixel from screen
         calling with an Entity instance (Player, Enemy...), or directly by coordinate
         """
+        if self.backend is None or self.renderer is not None:
+            return
+
         if isinstance(args[0], Entity):
             y, x = args[0].y, args[0].x
 
         else:
             y, x = args[0:2]
 
-        self.screen.addch(y, x, " ", curses.color_pair(1))
+        self.backend.put(y, x, " ", 1)
+
+    def snapshot(self) -> Snapshot:
+        return self.snapshots.build(self, self.pacer.ticks if self.pacer else 0)
+
+    def present(self, snapshot):
+        """
+        draws a snapshot of the world and the status lines, and shows the frame
+        """
+        self.draw(snapshot)
+        self.hud.paint(self.backend, snapshot.hud)
+        self.frame_bytes = self.backend.flush()
 
     def render_all(self, reset_fog=False):
         """
         render all visible entities and updates fog area
         """
-        ## Update Area Light
-        self.area_light = set(
-            surronding_area(
-                self.player, Settings.PLAYER_VISIBILITY, *self.screen_limits
-            )
-        )
-
-        if self.base.deployed:
-            self.area_light = set(
-                chain(
-                    self.area_light,
-                    surronding_area(
-                        self.base, Settings.BASE_VISIBILITY, *self.screen_limits
-                    ),
-                )
-            )
+        self.draw(self.snapshot(), reset_fog)
 
-        if len(self.linterns) > 0:
-
-            self.area_light = set(
-                chain(
-                    self.area_light,
-                    chain.from_iterable(
-                        surronding_area(
-                            l, Settings.LINTERN_VISIBILITY, *self.screen_limits
-                        )
-                        for l in self.linterns
-                    ),
-                )
-            )
-        if len(self.satelites) > 0:
-
-            self.area_light = set(
-                chain(
-                    self.area_light,
-                    chain.from_iterable(
-                        surronding_area(
-                            s, Settings.SATELITE_VISIBILITY, *self.screen_limits
-                        )
-                        for s in self.satelites
-                    ),
-                )
-            )
+    def draw(self, snapshot, reset_fog=False):
+        """
+        draws the entities of snapshot in the light area, and the fog
+        """
+        ## Update Area Light, the cell sets only change with the light frame
+        frame = self.lighting.compose(snapshot.static_lights, snapshot.lights)
+        changed = frame != self.light_frame
+        if changed:
+            self.light_frame = frame
+            self.area_light = self.lighting.lit(frame)
+        area_light = self.area_light
 
         # Remove fog from light area.
-        self.render_fog(self.area_light, method="remove")
+        self.render_fog(area_light, method="remove")
 
-        for item in chain(
-            self.mountains,
-            self.buildings,
-            self.satelites,
-            self.linterns,
-            self.enemies,
-            self.spawners,
-            self.fruits,
-            self.bombs_activated,
-            self.bombs_topick,
-            [self.base, self.player, self.trap],
-        ):
-
-            if (item.y, item.x) in self.area_light:
-                self.render(item)
+        for layer in snapshot.layers:
+            for y, x, symbol, color in layer:
+                if (y, x) in area_light:
+                    self.backend.put(y, x, symbol, color)
 
-        if self.screen_area.difference(self.area_light) != self.area_fog or reset_fog:
+        if changed or reset_fog:
             # render fog bg if it has changed or forced to reset
-            self.area_fog = self.screen_area.difference(self.area_light)
+            self.area_fog = self.lighting.dark(frame)
             self.render_fog(self.area_fog)
+            self.blasts_drawn.clear()
+
+        # blast areas of the armed bombs show over the fog; they are drawn
+        # once, and again only when the fog is redrawn over them. Fog comes
+        # back when the bomb is gone.
+        blasts = dict(snapshot.blasts)
+        for key in [key for key in self.blasts_drawn if key not in blasts]:
+            self.render_fog(self.blasts_drawn.pop(key).intersection(self.area_fog))
+
+        for key, cells in blasts.items():
+            if key not in self.blasts_drawn:
+                for y, x in cells.intersection(self.area_fog):
+                    self.backend.put(y, x, "~", 6)
+                self.blasts_drawn[key] = cells
 
     def render(self, entity, *args, **kwargs):
         """
         render single entity
         """
 
-        if not entity.deployed or not entity.visible:
+        if (
+            self.backend is None
+            or self.renderer is not None
+            or not entity.deployed
+            or not entity.visible
+        ):
             return
 
         c = entity.color
@@ -771,21 +1177,21 @@ class Game:
             raise BaseException
 
         if symbol_overwrite is None:
-            self.screen.addch(entity.y, entity.x, entity.symbol, curses.color_pair(c))
+            self.backend.put(entity.y, entity.x, entity.symbol, c)
         else:
-            self.screen.addch(entity.y, entity.x, symbol, curses.color_pair(c))
+            self.backend.put(entity.y, entity.x, symbol, c)
 
     def render_fog(self, area: list, method="set"):
         """
         sets or remove fog background in area defined as a list of points
         """
         if method == "set":
-            for (y, x) in area:
-                self.screen.addch(y, x, "-", curses.color_pair(2))
+            for y, x in area:
+                self.backend.put(y, x, "-", 2)
 
         elif method == "remove":
-            for (y, x) in area:
-                self.screen.addch(y, x, " ", curses.color_pair(1))
+            for y, x in area:
+                self.backend.put(y, x, " ", 1)
 
 
 def distance(objA, objB):
@@ -823,7 +1229,7 @@ def collision(objA: Entity, objB: Entity) -> bool:
     return objA.distance(objB) == 0
 
 
-def nearby_entities(objA, lst, d=0, ret="all"):
+def nearby_entities(objA, lst, d=0, ret="all", rng=random):
     """
     returns nearby entities from lst within d distance of objA
     """
@@ -839,7 +1245,7 @@ def nearby_entities(objA, lst, d=0, ret="all"):
         return result[0]
 
     elif ret == "choice":
-        return random.choice(result)
+        return rng.choice(result)
 
 
 def play_sound(asset):
@@ -852,8 +1258,156 @@ def play_sound(asset):
 
 
 def start():
+    parser = argparse.ArgumentParser(prog="ctower", description="Curses Defense Tower")
+    parser.add_argument(
+        "--telemetry", metavar="PATH", help="write session metrics to PATH"
+    )
+    parser.add_argument(
+        "--telemetry-format",
+        choices=("jsonl", "prom"),
+        default="jsonl",
+        help="JSON lines time series, or Prometheus text format snapshot",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="write Chrome trace events of the game loop phases to PATH",
+    )
+    parser.add_argument(
+        "--async-input",
+        action="store_true",
+        help="read the keyboard on an asyncio reader thread",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=0,
+        metavar="N",
+        help="move the zombies in N worker processes, one per band of the map",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("curses", "ansi"),
+        default="curses",
+        help="draw with curses, or with batched ANSI escape sequences",
+    )
+    parser.add_argument(
+        "--render-thread",
+        action="store_true",
+        help="draw on a separate thread, from snapshots of the world",
+    )
+    parser.add_argument(
+        "--journal",
+        metavar="DIR",
+        nargs="?",
+        const=Settings.JOURNAL_DIR,
+        help="journal the game to disk in DIR, so it can be resumed after a "
+        f"crash (default DIR: {Settings.JOURNAL_DIR}); off unless given",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="resume the game journaled in the journal directory, and keep "
+        "journaling it there",
+    )
+    parser.add_argument(
+        "--overwrite-journal",
+        action="store_true",
+        help="start a new game in a journal directory that holds one",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="record the game to PATH, an asciicast played by ctower-play",
+    )
+    parser.add_argument(
+        "--settings",
+        metavar="PATH",
+        help="apply the settings in PATH, reloaded whenever the file changes",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PREFIX",
+        help="profile the game, writing PREFIX.pstats, .folded and .txt on exit",
+    )
+    parser.add_argument(
+        "--profile-sample-only",
+        action="store_true",
+        help="profile by sampling the stacks only, without cProfile",
+    )
+    args = parser.parse_args()
+
     game = Game.create()
-    curses.wrapper(game.initscr)
+    game.record = args.record
+    if args.settings is not None:
+        game.watcher = Watcher(args.settings).start()
+        if game.watcher.pending is None:
+            game.watcher.stop()
+            parser.error(game.watcher.error or f"cannot read {args.settings}")
+    if args.resume and args.journal is None:
+        args.journal = Settings.JOURNAL_DIR
+    if args.resume:
+        try:
+            game.resume(args.journal)
+        except FileNotFoundError:
+            parser.error(f"there is no game to resume in {args.journal}")
+    if args.journal is not None:
+        try:
+            game.journal = Journal(
+                args.journal, resume=args.resume, overwrite=args.overwrite_journal
+            )
+        except FileExistsError:
+            parser.error(
+                f"{args.journal} holds a journaled game: resume it with --resume, "
+                "or start over with --overwrite-journal"
+            )
+    game.async_input = args.async_input
+    if args.render_thread:
+        # curses getch refreshes the screen, so keys must be read by the
+        # asyncio reader while the render thread draws
+        game.render_thread = True
+        game.async_input = True
+    if args.shards > 0:
+        game.engine = ShardedEngine(args.shards)
+    if args.telemetry is not None or args.trace is not None:
+        game.telemetry = Telemetry(args.telemetry, args.telemetry_format, args.trace)
+    profiler = None
+    if args.profile is not None:
+        profiler = Profiler(args.profile, args.profile_sample_only).start()
+
+    try:
+        if args.backend == "ansi":
+            # keys are read by the asyncio reader, from a terminal in cbreak mode
+            game.async_input = True
+            attributes = termios.tcgetattr(sys.stdin)
+            backend = AnsiBackend()
+            try:
+                tty.setcbreak(sys.stdin)
+                game.run(backend)
+            finally:
+                backend.close()
+                termios.tcsetattr(sys.stdin, termios.TCSADRAIN, attributes)
+        else:
+            curses.wrapper(game.initscr)
+    finally:
+        if game.renderer is not None:
+            game.renderer.stop()
+        if game.reader is not None:
+            game.reader.stop()
+        game.engine.close()
+        if game.telemetry is not None:
+            game.telemetry.close()
+        if game.journal is not None:
+            game.journal.close(getattr(game, "ticks", None))
+        if game.cast is not None:
+            game.cast.close()
+        if game.watcher is not None:
+            game.watcher.stop()
+        if profiler is not None:
+            # the terminal is restored by now
+            profiler.stop()
+            sys.stdout.write(profiler.summary())
+            sys.stdout.write(f"\nwrote {', '.join(profiler.paths)}\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import json
+
+from ctower.lib import archetypes
+from ctower.lib.entities import Mine, Cannon
+from ctower.lib.economy import upgrade_cost, recover_cost
+from ctower.lib.placement import PlacementMap
+from ctower.lib.settings import Settings
+
+
+@pytest.fixture
+def definition():
+    return archetypes.read()
+
+
+@pytest.fixture
+def swap():
+    yield archetypes.use
+    archetypes.use(archetypes.load())
+
+
+def recurrence(stats, levels):
+    """
+    stats of each level, upgrading one level at a time
+    """
+    health, rate = stats["health"], stats["production_rate"]
+    upkeep, timer = stats["maintenance_cost"], stats["timer"]
+    yield health, rate, upkeep, timer
+    for level in range(2, levels + 1):
+        health = 5 * level
+        rate = int(rate * stats["production_factor"])
+        upkeep += level
+        timer = max(1, timer - 0.5)
+        yield health, rate, upkeep, timer
+
+
+class TestCompile:
+    @pytest.mark.parametrize("kind", ["Mine", "Cannon"])
+    def test_levels_follow_recurrence(self, definition, kind):
+        table = archetypes.active()
+        expected = recurrence(definition["buildings"][kind], table.max_level)
+        for level, stats in enumerate(expected, start=1):
+            row = table.level(kind, level)
+            assert (
+                row.health,
+                row.production_rate,
+                row.maintenance_cost,
+                row.timer,
+            ) == stats
+            assert row.upgrade_cost == upgrade_cost(table.cost[kind], level)
+            assert row.recover_cost == recover_cost(table.cost[kind], level)
+
+    def test_symbols_and_colors(self):
+        table = archetypes.active()
+        assert [table.level("Mine", l).symbol for l in (1, 9)] == ["1", "9"]
+        assert [table.level("Mine", l).color for l in (2, 3)] == [1, 15]
+        assert [table.level("Cannon", l).symbol for l in (2, 9)] == ["V", "C"]
+        assert [table.level("Cannon", l).color for l in (4, 5)] == [1, 15]
+
+    def test_mirrored_settings(self):
+        table = archetypes.active()
+        assert Settings.MAX_BUILDING_LEVEL == table.max_level
+        assert Settings.CANNON_INITIAL_COST == table.cost["Cannon"]
+        assert Settings.SATELITE_VISIBILITY == table.visibility["Satelite"]
+
+    def test_toml(self, tmp_path):
+        path = tmp_path / "archetypes.toml"
+        lines = ["max_level = 9"]
+        for section, kinds in archetypes.read().items():
+            if section == "max_level":
+                continue
+            for kind, stats in kinds.items():
+                lines.append(f"[{section}.{kind}]")
+                lines.extend(f"{k} = {json.dumps(v)}" for k, v in stats.items())
+        path.write_text("\n".join(lines))
+
+        table = archetypes.load(path)
+        assert table.levels == archetypes.active().levels
+
+
+class TestValidate:
+    @pytest.mark.parametrize(
+        "change",
+        [
+            lambda d: d.update(max_level=0),
+            lambda d: d["buildings"]["Mine"].update(speed=1),
+            lambda d: d["buildings"]["Mine"].pop("timer"),
+            lambda d: d["buildings"]["Mine"].update(cost="free"),
+            lambda d: d["buildings"]["Mine"].update(timer_min=0),
+            lambda d: d["buildings"]["Mine"].update(timer=0),
+            lambda d: d["buildings"]["Cannon"].update(timer=1, timer_min=2),
+            lambda d: d["buildings"]["Cannon"].update(symbols="IVX"),
+            lambda d: d["buildings"]["Cannon"].update(colors=[[2, 1]]),
+            lambda d: d["kinds"].pop("Zombie"),
+        ],
+    )
+    def test_rejects(self, definition, change):
+        change(definition)
+        with pytest.raises(ValueError):
+            archetypes.compile(definition)
+
+
+class TestEntities:
+    def test_upgrade_is_lookup(self):
+        mine = Mine(0, 0)
+        for level in range(2, Settings.MAX_BUILDING_LEVEL + 1):
+            mine.upgrade()
+            row = archetypes.active().level("Mine", level)
+            assert (mine.level, mine.symbol, mine.timer) == (
+                level,
+                row.symbol,
+                row.timer,
+            )
+
+        mine.upgrade()
+        assert mine.level == Settings.MAX_BUILDING_LEVEL
+
+    def test_explicit_stats_are_kept(self):
+        cannon = Cannon(0, 0, level=3, timer=7)
+        assert cannon.timer == 7
+        assert cannon.symbol == "X"
+
+    def test_swap(self, definition, swap):
+        definition["buildings"]["Cannon"]["cost"] = 80
+        definition["buildings"]["Cannon"]["timer"] = 3
+        definition["kinds"]["Satelite"]["visibility"] = 12
+        swap(archetypes.compile(definition))
+
+        cannon = Cannon(0, 0)
+        assert cannon.timer == 3
+        assert cannon.cost_to_upgrade() == upgrade_cost(80, 1)
+        assert Settings.CANNON_INITIAL_COST == 80
+        assert PlacementMap().reach == 12
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pickle
+import random
+
+from ctower.lib.arrivals import Arrivals, FRUIT, BOMB
+from ctower.lib.entities import Spawner
+from ctower.main import Game
+
+
+class CountingRandom(random.Random):
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.draws = 0
+
+    def expovariate(self, rate):
+        self.draws += 1
+        return super().expovariate(rate)
+
+
+def run(arrivals, rng, seconds, dt):
+    """
+    sources of the arrivals of seconds of game time, in steps of dt
+    """
+    sources = []
+    for tick in range(1, int(seconds / dt) + 1):
+        sources.extend(arrivals.due(tick * dt, rng))
+    return sources
+
+
+class TestArrivals:
+    def test_rate(self):
+        rng = random.Random(1)
+        arrivals = Arrivals()
+        arrivals.set(FRUIT, 2.0, 0.0, rng)
+        arrivals.set(BOMB, 0.5, 0.0, rng)
+
+        sources = run(arrivals, rng, 2000, 0.02)
+        assert abs(sources.count(FRUIT) / 2000 - 2.0) < 0.1
+        assert abs(sources.count(BOMB) / 2000 - 0.5) < 0.05
+
+    def test_independent_of_frame_rate(self):
+        counts = []
+        for dt in (1 / 50, 1 / 7, 3.0):
+            rng = random.Random(2)
+            arrivals = Arrivals()
+            arrivals.set(FRUIT, 1.5, 0.0, rng)
+            counts.append(len(run(arrivals, rng, 300, dt)))
+        assert counts[0] == counts[1] == counts[2]
+
+    def test_no_draws_while_nothing_arrives(self):
+        rng = CountingRandom(3)
+        arrivals = Arrivals()
+        arrivals.set(FRUIT, 0.01, 0.0, rng)
+        arrivals.set(BOMB, 0.0, 0.0, rng)
+        draws = rng.draws
+
+        for tick in range(1, 1000):
+            if arrivals.due(tick / 50, rng):
+                break
+        assert rng.draws == draws
+
+    def test_rate_change_and_keep(self):
+        rng = random.Random(4)
+        spawners = [Spawner(1, 1), Spawner(2, 2)]
+        arrivals = Arrivals()
+        for spawner in spawners:
+            arrivals.set(spawner, 1.0, 0.0, rng)
+        entry = list(arrivals.sources.values())[0][:]
+
+        arrivals.set(spawners[0], 1.0, 5.0, rng)
+        assert list(arrivals.sources.values())[0] == entry
+        arrivals.set(spawners[0], 2.0, 5.0, rng)
+        assert list(arrivals.sources.values())[0][0] > 5.0
+
+        arrivals.keep(spawners[1:])
+        assert len(arrivals) == 1
+        sources = run(arrivals, rng, 10, 0.1)
+        assert sources and all(source is spawners[1] for source in sources)
+
+    def test_pickled(self):
+        rng = random.Random(5)
+        spawner = Spawner(1, 1)
+        arrivals = Arrivals()
+        arrivals.set(spawner, 1.0, 0.0, rng)
+        arrivals.set(FRUIT, 1.0, 0.0, rng)
+
+        spawner, arrivals = pickle.loads(pickle.dumps((spawner, arrivals)))
+        arrivals.set(spawner, 1.0, 0.0, rng)
+        arrivals.keep([spawner])
+        assert len(arrivals) == 2
+        assert arrivals.next < float("inf")
+
+
+class TestGameSpawns:
+    def test_shared_by_level(self):
+        game = Game.headless(seed=6)
+        game.caps.soft = game.caps.hard = 10**6
+        game.spawners = [Spawner(5, 5, level=10), Spawner(30, 100, level=30)]
+
+        counts = {}
+        game.schedule()
+        for _ in range(200):
+            game.now += 1.0
+            for source in game.arrivals.due(game.now, game.rng):
+                counts[id(source)] = counts.get(id(source), 0) + 1
+
+        low, high = (counts[id(spawner)] for spawner in game.spawners)
+        assert 2 < high / low < 4.5
+
+    def test_no_spawners(self):
+        game = Game.headless(seed=7)
+        game.spawners = []
+        for _ in range(500):
+            game.tick()
+        assert game.enemies == []
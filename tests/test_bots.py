@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from ctower.lib.bots import BOTS, Observation, observe, run
+from ctower.main import Game
+
+
+@pytest.fixture
+def game():
+    return Game.headless(40, 160, seed=1)
+
+
+class TestHeadless:
+    def test_same_seed_same_world(self):
+        a, b = Game.headless(seed=7), Game.headless(seed=7)
+        for _ in range(2000):
+            a.tick()
+            b.tick()
+        assert [(e.y, e.x) for e in a.enemies] == [(e.y, e.x) for e in b.enemies]
+
+    def test_tick_runs_commands(self, game):
+        y, x = game.player.y, game.player.x
+        game.tick(game.ACTIONS["move_left"])
+        assert (game.player.y, game.player.x) == (y, x - 1)
+
+
+class TestBots:
+    def test_observe(self, game):
+        obs = observe(game)
+        assert isinstance(obs, Observation)
+        assert (obs.y, obs.x) == (game.player.y, game.player.x)
+        assert obs.gold == game.base.gold
+
+    @pytest.mark.parametrize("name", sorted(BOTS))
+    def test_bot_actions_are_known(self, game, name):
+        bot = BOTS[name](seed=1)
+        for tick in range(200):
+            actions = bot.act(observe(game, tick))
+            assert set(actions) <= set(game.ACTIONS)
+            game.tick(*[game.ACTIONS[a] for a in actions])
+
+    @pytest.mark.parametrize("name", sorted(BOTS))
+    def test_run(self, game, name):
+        stats = run(game, BOTS[name](seed=1), 2000)
+        assert stats["ticks"] == 2000
+
+    def test_greedy_miner_builds_mines(self, game):
+        run(game, BOTS["greedy-miner"](seed=1), 3000, restart=False)
+        assert game.base.deployed
+        assert len(game.mines) > 0
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from statistics import mean
+from array import array
+import time
+import gc
+import pytest
+
+from ctower.lib.caps import EntityCaps
+from ctower.lib.entities import Enemy, Fruit
+from ctower.main import Game
+
+
+@pytest.fixture
+def game():
+    game = Game.headless(seed=1)
+    game.spawners = game.spawners[:1]
+    return game
+
+
+class TestCaps:
+    def test_merge(self, game):
+        game.caps = EntityCaps(soft=2, hard=10, policy="merge")
+        game.enemies = [Enemy(10, 10), Enemy(10, 11), Enemy(11, 10), Enemy(30, 30)]
+        game.caps.enforce(game)
+
+        assert len(game.enemies) == 2
+        assert game.enemies[0].level == 3
+        assert sum(e.health for e in game.enemies) == 8
+
+    def test_cull_oldest(self, game):
+        game.caps = EntityCaps(soft=2, hard=10, policy="cull")
+        enemies = [Enemy(i, i) for i in range(5)]
+        game.enemies = list(enemies)
+        game.caps.enforce(game)
+        assert game.enemies == enemies[3:]
+
+    def test_hard_cap(self, game):
+        game.caps = EntityCaps(soft=2, hard=3, policy="merge")
+        game.enemies = [Enemy(i * 10, i * 10) for i in range(6)]
+        game.caps.enforce(game)
+        assert len(game.enemies) == 3
+        assert not game.caps.allow_spawn(game)
+
+    def test_throttle(self, game):
+        game.caps = EntityCaps(soft=0, hard=100, policy="throttle")
+        game.enemies = [Enemy(0, 0)] * 99
+        allowed = sum(game.caps.allow_spawn(game) for _ in range(1000))
+        assert allowed < 100
+
+    def test_fruit_cap(self, game):
+        game.caps = EntityCaps(fruits=2)
+        game.fruits = [Fruit(i, i) for i in range(4)]
+        game.caps.enforce(game)
+        assert [f.y for f in game.fruits] == [2, 3]
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            EntityCaps(policy="ignore")
+
+
+class TestSoak:
+    def test_100k_ticks_bounded(self):
+        """
+        an unattended session with no cannons keeps memory and frame time
+        bounded: the horde is pinned at the caps
+        """
+        game = Game.headless(seed=1)
+        game.caps = EntityCaps(soft=40, hard=80)
+        game.player.health = game.base.health = 10**9
+
+        tick_times = array("d")
+        peak_enemies = 0
+        for tick in range(100_000):
+            if tick == 50_000:
+                gc.collect()
+                objects = len(gc.get_objects())
+
+            t0 = time.perf_counter()
+            game.tick()
+            tick_times.append(time.perf_counter() - t0)
+            peak_enemies = max(peak_enemies, len(game.enemies))
+
+        gc.collect()
+        assert game.outcome is None
+        assert peak_enemies <= 80
+        assert len(gc.get_objects()) - objects < 1000
+
+        # once the horde has reached the caps, frame time stays flat
+        steady = mean(tick_times[50_000:75_000])
+        last = mean(tick_times[75_000:])
+        assert last < 2 * steady + 50e-6
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from ctower.lib.coverage import CoverageGraph
+from ctower.lib.entities import Base, Mine, Cannon, Satelite
+from ctower.main import Game
+
+
+@pytest.fixture
+def graph():
+    return CoverageGraph(reach=10)
+
+
+class TestCoverageGraph:
+    def test_collapse_only_dependents(self, graph):
+        base, satelite = Base(0, 0), Satelite(0, 15)
+        shared, lonely = Mine(0, 8), Cannon(0, 20)
+
+        graph.add_provider(base)
+        graph.add_provider(satelite)
+        graph.add_building(shared, [base, satelite])
+        graph.add_building(lonely, [base, satelite])
+
+        assert graph.providers_of(shared) == 2
+        assert graph.remove_provider(satelite) == [lonely]
+        assert graph.providers_of(shared) == 1
+
+    def test_new_provider_covers_existing_buildings(self, graph):
+        mine = Mine(0, 30)
+        graph.add_building(mine)
+        satelite = Satelite(0, 25)
+        graph.add_provider(satelite, [mine])
+        assert graph.dependents_of(satelite) == [mine]
+
+    def test_sold_building_is_forgotten(self, graph):
+        satelite, mine = Satelite(0, 0), Mine(0, 1)
+        graph.add_provider(satelite)
+        graph.add_building(mine, [satelite])
+        graph.remove_building(mine)
+        assert graph.remove_provider(satelite) == []
+
+
+class TestSateliteDestroyed:
+    def test_dependents_collapse(self):
+        game = Game.headless(seed=1)
+        game.spawners = []
+        game.base.gold = 10_000
+
+        game.player.y, game.player.x = 10, 10
+        game.build_base()
+        game.player.y, game.player.x = 25, 25
+        game.build_base()  # satelite
+        satelite = game.satelites[0]
+
+        game.player.y, game.player.x = 17, 18
+        game.build_cannon()  # covered by base and satelite
+        game.player.y, game.player.x = 30, 30
+        game.build_cannon()  # covered by satelite only
+        shared, lonely = game.cannons
+
+        satelite.health = 0
+        game.tick()
+        assert satelite not in game.satelites
+        assert lonely.health == 0 and shared.health > 0
+
+        game.tick()
+        assert game.cannons == [shared]
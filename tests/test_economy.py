@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from ctower.lib.entities import Base, Mine, Cannon
+from ctower.lib.economy import Economy, cost_table
+from ctower.lib.settings import Settings
+
+
+@pytest.fixture
+def economy():
+    return Economy()
+
+
+class TestCostTable:
+    def test_matches_formula(self):
+        upgrade, recover = cost_table(50)
+        for lvl in range(1, Settings.MAX_BUILDING_LEVEL + 1):
+            assert upgrade[lvl] == 50 + 50 * (2 ** (lvl - 1))
+            assert recover[lvl] == sum(
+                int(50 + 50 * (2 ** (l - 2))) // 2 for l in range(1, lvl + 1)
+            )
+
+    def test_building_costs_use_table(self):
+        mine = Mine(0, 0)
+        assert mine.cost_to_upgrade() == cost_table(mine.base_cost)[0][1]
+        assert mine.cost_to_recover() == cost_table(mine.base_cost)[1][1]
+
+
+class TestSettle:
+    def test_production_and_upkeep(self, economy):
+        base = Base(0, 0, gold=0)
+        mine = Mine(0, 1, clock=0)
+        cannon = Cannon(0, 2, clock=0)
+        economy.register(mine)
+        economy.register(cannon)
+
+        fired, unpaid = economy.settle(base, now=100)
+
+        assert fired == [cannon]
+        assert unpaid == []
+        assert base.gold == mine.dig_value - cannon.maintenance_cost
+        assert mine.clock == cannon.clock == 100
+
+    def test_nothing_due(self, economy):
+        base = Base(0, 0, gold=10)
+        economy.register(Mine(0, 1, clock=100))
+
+        assert economy.settle(base, now=101) == ([], [])
+        assert base.gold == 10
+
+    def test_unpaid_cannon(self, economy):
+        base = Base(0, 0, gold=0)
+        cannon = Cannon(0, 2, clock=0)
+        economy.register(cannon)
+
+        fired, unpaid = economy.settle(base, now=100)
+        assert unpaid == [cannon]
+        assert base.gold == 0
+
+
+class TestGoldPerSecond:
+    def test_projection(self, economy):
+        mine = Mine(0, 1)
+        cannon = Cannon(0, 2)
+        economy.register(mine)
+        economy.register(cannon)
+
+        expected = mine.dig_value / mine.timer
+        expected -= cannon.maintenance_cost / cannon.timer
+        assert economy.gold_per_second == pytest.approx(expected)
+
+        economy.unregister(cannon)
+        assert economy.gold_per_second == pytest.approx(mine.dig_value / mine.timer)
+
+    def test_refresh_after_upgrade(self, economy):
+        mine = Mine(0, 1)
+        economy.register(mine)
+        mine.upgrade()
+        economy.refresh(mine)
+        assert economy.gold_per_second == pytest.approx(mine.dig_value / mine.timer)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import pytest
+
+from ctower.lib.host import Host, NullTransport
+from ctower.main import Game
+
+
+class Transport(NullTransport):
+    def __init__(self, buffered=0):
+        super().__init__()
+        self.data = bytearray()
+        self.buffered = buffered
+
+    def write(self, data):
+        self.data += data
+
+    def get_write_buffer_size(self):
+        return self.buffered
+
+
+class Timer:
+    """
+    time of the session pacers, moved by hand
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def opened(host, seed, timer, transport=None):
+    game = Game.headless(seed=seed)
+    game.resumed = True
+    session = host.open(transport or Transport(), game)
+    session.pacer.timer = timer
+    session.pacer.reset()
+    return session
+
+
+def frames(host, timer, count):
+    """
+    steps the sessions of host count frames of 1 / FPS, as the scheduler does
+    """
+    for _ in range(count):
+        timer.now += host.dt
+        for session in host.sessions:
+            if not session.closed and session.wake <= timer.now:
+                session.step(timer.now)
+
+
+@pytest.fixture
+def timer():
+    return Timer()
+
+
+@pytest.fixture
+def host():
+    return Host()
+
+
+class TestSession:
+    def test_plays_and_draws(self, host, timer):
+        session = opened(host, 1, timer)
+        frames(host, timer, 50)
+
+        # an idle game catches up with its ticks every IDLE_TIMEOUT
+        assert 40 <= session.game.ticks <= 50
+        assert session.pacer.frames > 0
+        assert session.transport.data.startswith(b"\x1b[?1049h")
+
+    def test_games_isolated(self, host, timer):
+        solo = Host()
+        alone = opened(solo, 2, timer)
+        frames(solo, timer, 100)
+
+        timer.now = 0.0
+        session = opened(host, 2, timer)
+        other = opened(host, 3, timer)
+        other.feed(b"lllljjjv")
+        frames(host, timer, 100)
+
+        game = session.game
+        assert game.ticks == alone.game.ticks
+        assert game.rng.getstate() == alone.game.rng.getstate()
+        assert (game.player.y, game.player.x) == (
+            alone.game.player.y,
+            alone.game.player.x,
+        )
+        assert other.game.rng.getstate() != game.rng.getstate()
+
+    def test_quit(self, host, timer):
+        session = opened(host, 1, timer)
+        frames(host, timer, 5)
+        session.feed(b"q")
+        frames(host, timer, 1)
+
+        assert session.closed
+        assert session.transport.closed
+        assert session.transport.data.endswith(b"\x1b[?1049l")
+
+    def test_pause_holds_only_its_game(self, host, timer):
+        session = opened(host, 1, timer)
+        other = opened(host, 2, timer)
+        frames(host, timer, 5)
+
+        session.feed(b"p")
+        frames(host, timer, 1)
+        ticks = session.game.ticks, other.game.ticks
+        assert session.game.prompt == ""
+
+        frames(host, timer, 20)
+        assert session.game.ticks == ticks[0]
+        assert other.game.ticks > ticks[1]
+
+        session.feed(b"x")
+        frames(host, timer, 20)
+        assert session.game.prompt is None
+        assert session.game.ticks > ticks[0]
+
+    def test_gameover_waits_for_q(self, host, timer):
+        session = opened(host, 1, timer)
+        session.game.outcome = "gameover"
+        frames(host, timer, 1)
+        assert session.game.prompt == "q"
+
+        session.feed(b"x")
+        frames(host, timer, 1)
+        assert not session.closed
+
+        session.feed(b"q")
+        frames(host, timer, 1)
+        assert session.closed
+
+    def test_slow_connection_drops_frames(self, host, timer):
+        session = opened(host, 1, timer, Transport(buffered=10**9))
+        sent = len(session.transport.data)
+        frames(host, timer, 20)
+
+        assert session.congested > 0
+        assert len(session.transport.data) == sent
+
+
+class TestHost:
+    def test_serves_clients(self, tmp_path):
+        path = str(tmp_path / "host.sock")
+        host = Host(max_sessions=1)
+
+        async def client():
+            server = asyncio.ensure_future(host.serve(path=path))
+            while not (tmp_path / "host.sock").exists():
+                await asyncio.sleep(0.01)
+
+            reader, writer = await asyncio.open_unix_connection(path)
+            screen = await reader.read(4096)
+
+            turned, away = await asyncio.open_unix_connection(path)
+            full = await turned.read()
+            away.close()
+
+            writer.write(b"q")
+            rest = await reader.read()
+            server.cancel()
+            return screen, full, rest
+
+        screen, full, rest = asyncio.run(client())
+        assert screen.startswith(b"\x1b[?1049h")
+        assert b"full" in full
+        assert rest.endswith(b"\x1b[?1049l")
+        assert host.steps > 0 and host.errors == 0
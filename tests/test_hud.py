@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from ctower.main import Game
+from ctower.lib.entities import Mine
+from ctower.lib.render import NullBackend
+
+
+class RecordingBackend(NullBackend):
+    def __init__(self):
+        super().__init__()
+        self.lines = {}
+
+    def text(self, y, x, string, pair=1):
+        super().text(y, x, string, pair)
+        self.lines[y, x] = string
+
+
+@pytest.fixture
+def backend():
+    return RecordingBackend()
+
+
+@pytest.fixture
+def game(backend):
+    game = Game.headless(seed=3, backend=backend)
+    game.player.y, game.player.x = 5, 5
+    return game
+
+
+class TestHud:
+    def test_first_frame_draws_every_segment(self, game):
+        assert game.hud.draw(game, game.backend) == 3
+
+    def test_nothing_redrawn_when_nothing_changes(self, game):
+        game.hud.draw(game, game.backend)
+        assert game.hud.draw(game, game.backend) == 0
+
+    def test_only_changed_segments_are_redrawn(self, game, backend):
+        game.hud.draw(game, game.backend)
+        game.base.gold += 10
+        assert game.hud.draw(game, game.backend) == 1
+        status = backend.lines[game.max_y + 3, 23]
+        assert f"Gold: {game.base.gold:4}" in status
+
+    def test_shorter_text_is_padded(self, game, backend):
+        mine = Mine(5, 5, clock=game.now)
+        game.mines.append(mine)
+        game.placement.invalidate()
+        game.hud.draw(game, game.backend)
+        long = backend.lines[game.max_y + 2, 21]
+        assert "Place: Mine" in long
+
+        game.player.move(dx=1)
+        game.hud.draw(game, game.backend)
+        short = backend.lines[game.max_y + 2, 21]
+        assert short.strip() == ""
+        assert len(short) == len(long)
+
+    def test_place_follows_the_world(self, game):
+        assert game.hud.place(game) is None
+        mine = Mine(5, 5, clock=game.now)
+        game.mines.append(mine)
+        game.placement.invalidate()
+        assert game.hud.place(game) is mine
+
+
+class TestPlayerLevel:
+    def test_level_is_updated_by_the_tick(self):
+        game = Game.headless(seed=3)
+        game.player.points = 45
+        game.tick()
+        assert game.player.level == 3
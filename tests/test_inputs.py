@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import curses
+import os
+import pytest
+
+from ctower.lib.inputs import AsyncKeyReader, InputPipeline, decode
+from ctower.main import Game
+
+
+class FakeScreen:
+    def __init__(self, keys):
+        self.keys = list(keys)
+
+    def timeout(self, ms):
+        pass
+
+    def getch(self):
+        return self.keys.pop(0) if self.keys else curses.ERR
+
+
+@pytest.fixture
+def game():
+    return Game.headless(seed=1)
+
+
+class TestDecode:
+    def test_plain_and_arrow_keys(self):
+        assert decode(b"h\x1b[Am\x1bOP") == [
+            ord("h"),
+            curses.KEY_UP,
+            ord("m"),
+            curses.KEY_F1,
+        ]
+
+
+class TestInputPipeline:
+    def test_coalesces_repeated_moves(self, game):
+        y, x = game.player.y, game.player.x
+        for key in b"llll":
+            game.inputs.feed(key)
+
+        commands = game.inputs.commands()
+        assert len(commands) == 1
+
+        game.tick(*commands)
+        assert (game.player.y, game.player.x) == (y, x + 4)
+        assert game.inputs.coalesced == 3
+
+    def test_actions_keep_their_order(self):
+        log = []
+        pipeline = InputPipeline(
+            {ord("m"): lambda: log.append("m"), ord("c"): lambda: log.append("c")},
+            {ord("l"): (0, 1)},
+            lambda dy, dx: log.append((dy, dx)),
+        )
+        for key in b"llmlcc":
+            pipeline.feed(key)
+
+        for command in pipeline.commands():
+            command()
+        assert log == [(0, 2), "m", (0, 1), "c", "c"]
+
+    def test_displacement_bounded_by_world_limits(self, game):
+        for _ in range(500):
+            game.inputs.feed(curses.KEY_RIGHT)
+        game.tick(*game.inputs.commands())
+        assert game.player.x == game.max_x
+
+    def test_drain_reads_every_pending_key(self, game):
+        game.inputs.drain(FakeScreen(b"hjk"))
+        assert list(game.inputs.keys) == list(b"hjk")
+
+
+class TestAsyncKeyReader:
+    def test_reads_from_fd(self, game):
+        r, w = os.pipe()
+        reader = AsyncKeyReader(game.inputs, fd=r).start()
+        try:
+            os.write(w, b"l\x1b[B")
+            assert game.inputs.pop(timeout=2) == ord("l")
+            assert game.inputs.pop(timeout=2) == curses.KEY_DOWN
+        finally:
+            reader.stop()
+            os.close(r)
+            os.close(w)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import pytest
+
+from ctower.lib.journal import Journal, load, JOURNAL
+from ctower.main import Game
+
+# keys typed along the game: move around, deploy the base, build, throw a bomb
+SCRIPT = {
+    3: "llll",
+    10: "v",
+    20: "jjm",
+    40: "hc",
+    60: "kkkkg",
+    90: "b",
+    130: "lu",
+    170: "q",
+    230: "jjj",
+}
+
+
+def play(game, journal, ticks, script=SCRIPT):
+    """
+    runs ticks as the game loop does, journaling them
+    """
+    for _ in range(ticks):
+        for key in script.get(game.ticks, ""):
+            game.inputs.feed(ord(key))
+        commands = game.inputs.commands()
+        if game.inputs.last:
+            journal.input(game.ticks, game.inputs.last)
+        game.tick(*commands)
+
+        journal.mark(game.ticks)
+        if journal.due(game.ticks):
+            journal.checkpoint(game.ticks, game.save_state())
+
+
+def world(game):
+    """
+    comparable picture of the world state
+    """
+    state = {}
+    for name in Game.WORLD:
+        value = getattr(game, name)
+        if name == "rng":
+            value = value.getstate()
+        elif name == "arrivals":
+            value = value.__getstate__()
+        elif hasattr(value, "__dict__") and not hasattr(value, "__dataclass_fields__"):
+            value = vars(value)
+        state[name] = repr(value)
+    del state["outcome"]
+    return state
+
+
+@pytest.fixture
+def session(tmp_path):
+    game = Game.headless(seed=4)
+    game.base.gold = 1000
+    journal = Journal(tmp_path, checkpoint_interval=100, fsync_interval=0.01)
+    play(game, journal, 250)
+    journal.close(game.ticks)
+    return game, tmp_path
+
+
+class TestResume:
+    def test_same_world(self, session):
+        game, path = session
+        resumed = Game.headless(seed=5)
+        resumed.resume(path)
+
+        assert resumed.ticks == 250
+        assert world(resumed) == world(game)
+        assert resumed.outcome is None
+
+    def test_from_latest_checkpoint(self, session):
+        _, path = session
+        state, inputs, end = load(path)
+        assert state["tick"] == 201
+        assert end == 250
+        assert inputs == {230: [ord("j")] * 3}
+
+    def test_goes_on_after_resume(self, session):
+        game, path = session
+        resumed = Game.headless(seed=5)
+        resumed.resume(path)
+
+        journal = Journal(path, resume=True, checkpoint_interval=100)
+        play(resumed, journal, 60, {260: "hh"})
+        journal.close(resumed.ticks)
+
+        again = Game.headless(seed=6)
+        again.resume(path)
+        assert again.ticks == 310
+        assert world(again) == world(resumed)
+
+    def test_torn_last_line(self, session):
+        game, path = session
+        with open(path / JOURNAL, "a") as f:
+            f.write('{"t": 260, "ke')
+
+        resumed = Game.headless(seed=5)
+        resumed.resume(path)
+        assert world(resumed) == world(game)
+
+    def test_replay_stops_at_gap(self, session):
+        _, path = session
+        with open(path / JOURNAL, "a") as f:
+            f.write('{"gap": true}\n{"t": 300}\n')
+
+        _, _, end = load(path)
+        assert end == 250
+
+    def test_nothing_to_resume(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            Game.headless().resume(tmp_path)
+
+
+class TestJournal:
+    def test_records(self, session):
+        _, path = session
+        records = [json.loads(line) for line in open(path / JOURNAL)]
+        assert "version" in records[0]
+        assert [r["t"] for r in records if r.get("checkpoint")] == [1, 101, 201]
+        assert {"t": 170, "keys": [ord("q")]} in records
+        assert records[-1] == {"t": 250}
+
+    def test_not_started_over(self, session):
+        _, path = session
+        before = (path / JOURNAL).read_text()
+        with pytest.raises(FileExistsError):
+            Journal(path)
+        assert (path / JOURNAL).read_text() == before
+
+        Journal(path, overwrite=True).close(0)
+        records = [json.loads(line) for line in open(path / JOURNAL)]
+        assert "version" in records[0] and len(records) == 2
+
+    def test_quit_waits_for_the_tick(self):
+        game = Game.headless(seed=1)
+        game.KEY_BINDINGS[ord("q")]()
+        assert game.outcome == "quit"
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import pytest
+
+from ctower.lib.entities import Lintern
+from ctower.lib.lighting import LightMap
+from ctower.lib.snapshot import Point
+from ctower.lib.render import NullBackend
+from ctower.main import Game, surronding_area
+
+LIMITS = (1, 35, 1, 158)
+
+
+def scan(sources, limits=LIMITS):
+    """
+    light area as computed by merging the surronding area of every source
+    """
+    area = set()
+    for point, radius in sources:
+        area.update(surronding_area(point, radius, *limits))
+    return area
+
+
+@pytest.fixture
+def sources():
+    rng = random.Random(7)
+    return tuple(
+        (Point(rng.randint(1, 35), rng.randint(1, 158)), rng.choice((4, 5, 10)))
+        for _ in range(60)
+    ) + ((Point(1, 1), 10), (Point(35, 158), 4))
+
+
+class TestLightMap:
+    def test_matches_surronding_area(self, sources):
+        lighting = LightMap(LIMITS)
+        frame = lighting.compose(sources[:-5], sources[-5:])
+        assert lighting.lit(frame) == scan(sources)
+        assert lighting.dark(frame) == set(lighting.cells).difference(scan(sources))
+
+    def test_static_layer_cached(self, sources):
+        lighting = LightMap(LIMITS)
+        player = ((Point(10, 10), 5),)
+        first = lighting.compose(sources, player)
+        second = lighting.compose(sources, ((Point(11, 10), 5),))
+        assert lighting.rebuilds == 1
+        assert first != second
+
+        lighting.compose(sources[1:], player)
+        assert lighting.rebuilds == 2
+
+    def test_no_sources(self):
+        lighting = LightMap(LIMITS)
+        frame = lighting.compose((), ())
+        assert lighting.lit(frame) == set()
+        assert len(lighting.dark(frame)) == 35 * 158
+
+
+class TestGameLight:
+    def test_static_lights_shared_until_built(self):
+        game = Game.headless(seed=2)
+        a = game.snapshot()
+        game.player.move(dx=1)
+        b = game.snapshot()
+        assert a.static_lights is b.static_lights
+
+        game.linterns.append(Lintern(3, 3))
+        c = game.snapshot()
+        assert c.static_lights is not b.static_lights
+        assert (Point(3, 3), 4) in c.static_lights
+
+    def test_area_light(self):
+        game = Game.headless(seed=2, backend=NullBackend())
+        game.linterns = [Lintern(5, 5), Lintern(30, 100)]
+        game.render_all()
+        snapshot = game.snapshot()
+        assert game.area_light == scan(
+            snapshot.static_lights + snapshot.lights, game.screen_limits
+        )
+        assert game.area_fog == game.screen_area.difference(game.area_light)
@@ -242,6 +242,39 @@ class TestBombs:
         game.throw_bomb()
         assert game.player.bombs == 0
 
+    def test_explosion_hits_within_strength(self):
+        game = Game.headless(seed=1)
+        game.spawners = [Spawner(1, 1)]
+        near, far = Enemy(20, 25, health=20), Enemy(20, 26, health=20)
+        game.enemies = [near, far]
+        game.bombs_activated = [Bomb(20, 20, t0=game.now - 10)]
+
+        game.explode(game.bombs_activated)
+
+        assert near.health == 15
+        assert far.health == 20
+        assert game.bombs_activated == []
+        assert game.blasts == {}
+
+    def test_bombs_going_off_together(self):
+        game = Game.headless(seed=1)
+        enemy = Enemy(20, 20, health=20)
+        game.enemies = [enemy]
+        bombs = [Bomb(20, 21, t0=game.now - 10), Bomb(21, 20, t0=game.now - 10)]
+        game.bombs_activated = list(bombs) + [Bomb(30, 30, t0=game.now)]
+
+        game.explode(bombs)
+
+        assert enemy.health == 10
+        assert len(game.bombs_activated) == 1
+
+    def test_blast_is_clipped_to_screen(self):
+        game = Game.headless(seed=1)
+        bomb = Bomb(1, 1)
+        assert game.blast(bomb) <= game.screen_area
+        assert (1, 1) in game.blast(bomb)
+        assert game.blast(bomb) is game.blast(bomb)
+
 
 class TestBuildings:
     def test_upgrade(self, game):
@@ -283,3 +316,48 @@ class TestBuildings:
             game.base.gold = building.cost_to_upgrade() - 1
             game.upgrade_building()
             assert building.level == 1
+
+
+class CountingEngine:
+    def __init__(self):
+        self.moves = []
+
+    def move(self, enemies, targets, step, seed, limits, phase=0, cohorts=1):
+        self.moves.append(
+            [enemy.uid for enemy in enemies if enemy.uid % cohorts == phase]
+        )
+
+    def close(self):
+        pass
+
+
+class TestEnemyCohorts:
+    def run(self, cohorts, ticks=200):
+        game = Game.headless(seed=1)
+        game.enemy_cohorts = cohorts
+        game.engine = CountingEngine()
+        game.caps.soft = game.caps.hard = 50
+        game.enemies = [Enemy(5, 5 + i, uid=i) for i in range(50)]
+        moved_per_tick = []
+        for _ in range(ticks):
+            before = len(game.engine.moves)
+            game.tick()
+            moved_per_tick.append(
+                sum(len(uids) for uids in game.engine.moves[before:])
+            )
+        return game, moved_per_tick
+
+    def test_same_speed(self):
+        _, all_at_once = self.run(1)
+        game, spread = self.run(5)
+        moved = [uid for uids in game.engine.moves for uid in uids]
+        counts = [moved.count(uid) for uid in range(50)]
+        assert max(counts) - min(counts) <= 1
+        assert abs(sum(spread) - sum(all_at_once)) <= 50
+
+    def test_work_is_spread(self):
+        _, all_at_once = self.run(1)
+        _, spread = self.run(5)
+        assert max(all_at_once) == 50
+        assert max(spread) == 10
+        assert spread.count(0) < all_at_once.count(0)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from ctower.lib.entities import Enemy, Fruit, Bomb, Mine, Cannon, Trap
+from ctower.lib.occupancy import OccupancyMap, footprint
+from ctower.lib.settings import Settings
+from ctower.main import Game
+
+
+class StillEngine:
+    """
+    leaves the zombies where the test put them
+    """
+
+    def move(self, enemies, targets, step, seed, limits, phase=0, cohorts=1):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def game():
+    game = Game.headless(seed=1)
+    game.engine = StillEngine()
+    game.spawners = []
+    game.enemy_clock = float("-inf")
+    return game
+
+
+class TestOccupancyMap:
+    def test_place_and_move(self):
+        occupancy = OccupancyMap()
+        enemy = Enemy(1, 1)
+        occupancy.place(enemy)
+        assert occupancy.at(1, 1) == [enemy]
+
+        enemy.move(2, 3)
+        occupancy.place(enemy)
+        assert occupancy.at(1, 1) == ()
+        assert occupancy.at(2, 3) == [enemy]
+
+        occupancy.remove(enemy)
+        occupancy.remove(enemy)
+        assert len(occupancy) == 0
+        assert occupancy.cells == {}
+
+    def test_layer_rebuilt_on_change(self):
+        occupancy = OccupancyMap()
+        fruits = [Fruit(1, 1), Fruit(1, 1)]
+        occupancy.layer("fruits", fruits)
+        occupancy.layer("fruits", fruits)
+        assert occupancy.rebuilds == 1
+        assert len(occupancy.at(1, 1)) == 2
+
+        fruits.pop()
+        fruits.append(Fruit(4, 4))
+        occupancy.layer("fruits", fruits)
+        assert occupancy.rebuilds == 2
+        assert len(occupancy.at(1, 1)) == 1
+        assert occupancy.at(4, 4) == [fruits[-1]]
+
+    def test_footprint_matches_distance(self):
+        trap = Trap(10, 10)
+        cells = footprint(10, 10, 5)
+        for y in range(0, 21):
+            for x in range(0, 21):
+                inside = trap.distance(Enemy(y, x)) <= 5
+                assert ((y, x) in cells) == inside
+
+
+class TestContacts:
+    def test_enemy_damages_building(self, game):
+        mine = Mine(5, 5)
+        game.mines = [mine]
+        game.enemies = [Enemy(5, 5), Enemy(5, 6)]
+        health = mine.health
+        game.rng.seed(0)
+
+        for _ in range(20):
+            game.enemy_clock = float("-inf")
+            game.tick()
+
+        assert mine.health < health
+        assert len(game.enemies) == 2
+
+    def test_enemy_reaching_base(self, game):
+        game.base.deployed = True
+        game.enemies = [Enemy(game.base.y, game.base.x), Enemy(1, 1)]
+        game.tick()
+        assert [(e.y, e.x) for e in game.enemies] == [(1, 1)]
+        assert game.player.points == 1
+
+    def test_trap_captures_within_radius(self, game):
+        game.trap = Trap(20, 20, deployed=True)
+        radius = Settings.TRAP_RADIUS
+        inside, outside = Enemy(20, 20 + radius), Enemy(20, 21 + radius)
+        game.enemies = [inside, outside]
+        game.tick()
+        assert game.enemies == [outside]
+
+    def test_pooled_pickup_respawned(self, game):
+        y, x = game.player.y, game.player.x
+        game.fruits = [game.pool.acquire(Fruit, y, x)]
+        health = game.player.health
+        game.tick()
+        assert game.fruits == []
+        assert game.player.health == health + 10
+
+        # the fruit picked up is the next one handed out, somewhere else
+        fruit = game.pool.acquire(Fruit, 2, 2)
+        game.fruits.append(fruit)
+        game.tick()
+        assert game.fruits == [fruit]
+        assert fruit not in game.occupancy.at(y, x)
+        assert fruit in game.occupancy.at(2, 2)
+        assert game.player.health == health + 10
+
+    def test_player_picks_up(self, game):
+        y, x = game.player.y, game.player.x
+        game.fruits = [Fruit(y, x), Fruit(y + 1, x)]
+        game.bombs_topick = [Bomb(y, x, t0=game.now)]
+        health, bombs = game.player.health, game.player.bombs
+        game.tick()
+        assert len(game.fruits) == 1
+        assert game.bombs_topick == []
+        assert game.player.health == health + 10
+        assert game.player.bombs == bombs + 1
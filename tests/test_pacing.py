@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from ctower.lib.pacing import FramePacer
+
+
+class FakeTimer:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def timer():
+    return FakeTimer()
+
+
+@pytest.fixture
+def pacer(timer):
+    return FramePacer(fps=50, max_ticks=10, max_skip=3, timer=timer)
+
+
+class TestFramePacer:
+    def test_first_tick_is_due(self, pacer):
+        assert pacer.due() == 1
+        assert pacer.due() == 0
+
+    def test_sleeps_only_remaining_budget(self, pacer, timer):
+        pacer.due()
+        timer.t = 0.015
+        assert pacer.timeout() == 5
+
+    def test_catch_up_after_slow_frame(self, pacer, timer):
+        pacer.due()
+        timer.t = 0.065
+        assert pacer.due() == 3
+
+    def test_backlog_is_bounded(self, pacer, timer):
+        pacer.due()
+        timer.t = 10
+        assert pacer.due() == 10
+        assert pacer.due() == 0
+
+    def test_drops_render_frames_while_behind(self, pacer, timer):
+        pacer.due()
+        timer.t = 0.1
+        assert not pacer.render()
+        assert pacer.dropped == 1
+
+    def test_render_is_not_starved(self, pacer, timer):
+        pacer.due()
+        timer.t = 1
+        renders = [pacer.render() for _ in range(4)]
+        assert renders == [False, False, False, True]
+
+    def test_idle_timeout(self, pacer):
+        assert pacer.timeout(idle=True) == int(pacer.idle_timeout * 1000)
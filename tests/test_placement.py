@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from itertools import chain
+import random
+import pytest
+
+from ctower.lib.entities import Base, Player, Mountain, Mine, Cannon, Satelite
+from ctower.lib.placement import PlacementMap
+from ctower.main import Game, nearby_entities
+
+
+@pytest.fixture
+def game():
+    rng = random.Random(3)
+    game = Game()
+    game.base = Base(20, 20, deployed=True)
+    game.player = Player(0, 0)
+    game.mountains = [
+        Mountain(rng.randint(0, 40), rng.randint(0, 40)) for _ in range(15)
+    ]
+    game.mines = [Mine(rng.randint(0, 40), rng.randint(0, 40)) for _ in range(5)]
+    game.cannons = [Cannon(rng.randint(0, 40), rng.randint(0, 40)) for _ in range(5)]
+    game.satelites = [Satelite(35, 35)]
+    game.buildings = list(chain(game.mines, game.cannons, game.satelites))
+    return game
+
+
+def scan_cannon(game, cell):
+    """
+    eligibility as computed by scanning every entity
+    """
+    player = Player(*cell)
+    blocked = chain(game.buildings, game.mountains, [game.base])
+    covered = chain(game.satelites, [game.base])
+    return (
+        nearby_entities(player, blocked) is None
+        and nearby_entities(player, covered, d=10) is not None
+    )
+
+
+def scan_mine(game, cell):
+    player = Player(*cell)
+    return (
+        scan_cannon(game, cell)
+        and min(player.distance(mnt) for mnt in game.mountains) == 1
+    )
+
+
+class TestPlacementMap:
+    def test_matches_entity_scan(self, game):
+        placement = PlacementMap()
+        for y in range(-5, 50):
+            for x in range(-5, 50):
+                assert placement.can_build_cannon(game, y, x) == scan_cannon(
+                    game, (y, x)
+                )
+                assert placement.can_build_mine(game, y, x) == scan_mine(game, (y, x))
+
+    def test_cached_until_invalidated(self, game):
+        placement = PlacementMap()
+        placement.update(game)
+        cells = placement.cannon_cells
+
+        placement.update(game)
+        assert placement.cannon_cells is cells
+
+        placement.invalidate()
+        placement.update(game)
+        assert placement.cannon_cells is not cells
+
+    def test_building_updates_layer(self, game):
+        mountain = game.mountains[0]
+        game.player.y, game.player.x = mountain.y, mountain.x + 1
+        game.base.y, game.base.x = mountain.y, mountain.x + 5
+        game.base.gold = 1000
+
+        assert "Mine" in game.placement.buildable(game, game.player.y, game.player.x)
+        game.build_mine()
+        assert game.placement.buildable(game, game.player.y, game.player.x) == ()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from ctower.lib.entities import Enemy, Bomb, Fruit, Spawner
+from ctower.lib.pool import EntityPool
+from ctower.lib.bench import gc_pressure
+from ctower.lib.scenarios import build
+
+
+@pytest.fixture
+def pool():
+    return EntityPool(limit=2)
+
+
+class TestEntityPool:
+    def test_reuses_released_instances(self, pool):
+        enemy = pool.acquire(Enemy, 1, 1, uid=1)
+        enemy.health = -3
+        enemy.color = 9
+        pool.release(enemy)
+
+        again = pool.acquire(Enemy, 5, 6, uid=2)
+        assert again is enemy
+        assert (again.y, again.x, again.uid) == (5, 6, 2)
+        assert again.health == Enemy(0, 0).health
+        assert again.color == 5
+        assert not again.pooled
+
+    def test_types_do_not_mix(self, pool):
+        pool.release(pool.acquire(Fruit, 1, 1))
+        bomb = pool.acquire(Bomb, 1, 1, t0=0.0)
+        assert isinstance(bomb, Bomb)
+        assert bomb.t0 == 0.0
+
+    def test_double_release(self, pool):
+        enemy = pool.acquire(Enemy, 1, 1)
+        pool.release(enemy)
+        pool.release(enemy)
+        assert pool.acquire(Enemy, 1, 1) is enemy
+        assert pool.acquire(Enemy, 1, 1) is not enemy
+
+    def test_limit(self, pool):
+        enemies = [pool.acquire(Enemy, 1, 1) for _ in range(5)]
+        for enemy in enemies:
+            pool.release(enemy)
+        assert len(pool.free[Enemy]) == 2
+
+    def test_stats(self, pool):
+        enemies = [pool.acquire(Enemy, 1, 1) for _ in range(3)]
+        pool.release(enemies[0])
+        pool.acquire(Enemy, 1, 1)
+
+        stats = pool.stats()["Enemy"]
+        assert stats["created"] == 3
+        assert stats["reused"] == 1
+        assert stats["released"] == 1
+        assert stats["live"] == 3
+        assert stats["high_water"] == 3
+
+    def test_spawn_from_pool(self, pool):
+        enemy = Spawner(3, 4).spawn(7, pool=pool)
+        assert (enemy.y, enemy.x, enemy.uid) == (3, 4, 7)
+        assert pool.stats()["Enemy"]["created"] == 1
+
+
+class TestGamePool:
+    def test_dead_zombies_are_reused(self):
+        game = build({"cannons": 30, "spawners": 5, "seed": 1})
+        for _ in range(3000):
+            game.tick()
+            for enemy in game.enemies:
+                assert not enemy.pooled
+
+        stats = game.pool.stats()["Enemy"]
+        assert stats["reused"] > 0
+        assert stats["live"] == len(game.enemies)
+
+    def test_gc_pressure(self):
+        spec = {"cannons": 30, "spawners": 10}
+        unpooled = gc_pressure(spec, ticks=300, pooled=False)
+        pooled = gc_pressure(spec, ticks=300, pooled=True)
+        assert pooled["pool"]["Enemy"]["created"] <= (
+            unpooled["pool"]["Enemy"]["created"]
+        )
+        assert unpooled["entity_blocks_allocated"] > 0
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pstats
+
+from ctower.lib.profiling import Profiler, StackSampler, WATCHED
+from ctower.lib.render import NullBackend
+from ctower.lib.scenarios import build
+
+
+def crowded():
+    game = build("early")
+    game.backend = NullBackend(*game.size)
+    return game
+
+
+def play(game, ticks):
+    for _ in range(ticks):
+        game.tick()
+        game.render_all()
+
+
+def stacks(path):
+    """
+    stack -> count of a collapsed stacks file
+    """
+    folded = {}
+    for line in open(path):
+        stack, count = line.rsplit(" ", 1)
+        folded[stack] = int(count)
+    return folded
+
+
+class TestProfiler:
+    def test_files(self, tmp_path):
+        game = crowded()
+        profiler = Profiler(tmp_path / "out" / "game", interval=0.001)
+        with profiler:
+            play(game, 300)
+
+        assert [p.rsplit(".", 1)[1] for p in profiler.paths] == [
+            "pstats",
+            "folded",
+            "txt",
+        ]
+        stats = pstats.Stats(profiler.paths[0])
+        assert any(key[2] == "tick" for key in stats.stats)
+
+        folded = stacks(profiler.paths[1])
+        assert sum(folded.values()) == profiler.sampler.samples > 0
+        assert any("main.py:Game.tick" in stack for stack in folded)
+
+        summary = open(profiler.paths[2]).read()
+        for name, _, _ in WATCHED:
+            assert name in summary
+
+    def test_calls(self, tmp_path):
+        game = crowded()
+        with Profiler(tmp_path / "game") as profiler:
+            play(game, 300)
+
+        calls = profiler.calls()
+        assert set(calls) == {name for name, _, _ in WATCHED}
+        assert calls["Entity.distance"][0] > 0
+        assert calls["addch"][0] == 0
+
+    def test_sample_only(self, tmp_path):
+        game = crowded()
+        with Profiler(tmp_path / "game", sample_only=True, interval=0.001) as profiler:
+            play(game, 300)
+
+        assert [p.rsplit(".", 1)[1] for p in profiler.paths] == ["folded", "txt"]
+        assert not (tmp_path / "game.pstats").exists()
+        sampled = profiler.sampled()
+        assert sampled["addch"] == [0, 0]
+        assert all(inside >= running for inside, running in sampled.values())
+
+
+class TestStackSampler:
+    def test_other_thread_not_sampled(self):
+        sampler = StackSampler(thread_id=-1, interval=0.001).start()
+        sum(range(10**6))
+        sampler.stop()
+        assert sampler.samples == 0
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import re
+import json
+import pytest
+
+from ctower.lib.recording import CastWriter, RecordingBackend, events, play, record
+from ctower.lib.render import AnsiBackend, NullBackend
+from ctower.main import Game
+
+ESCAPE = re.compile(r"\x1b\[(?:(\d+);(\d+)H|[?\d;]*[a-zA-Z])")
+
+
+def screen(data):
+    """
+    cells shown by a terminal fed data, as {(y, x): char}
+    """
+    cells = {}
+    y = x = 0
+    pos = 0
+    for match in ESCAPE.finditer(data):
+        for char in data[pos : match.start()]:
+            cells[y, x] = char
+            x += 1
+        if match.group(1):
+            y, x = int(match.group(1)) - 1, int(match.group(2)) - 1
+        pos = match.end()
+    for char in data[pos:]:
+        cells[y, x] = char
+        x += 1
+    return cells
+
+
+@pytest.fixture
+def cast(tmp_path):
+    return str(tmp_path / "game.cast")
+
+
+class TestRecording:
+    def test_cast_replays_the_frames(self, cast):
+        out = io.BytesIO()
+        writer = CastWriter(cast, 10, 30)
+        backend = RecordingBackend(AnsiBackend(out, 10, 30), writer)
+        backend.setup()
+
+        backend.text(2, 2, "hello", 2)
+        backend.put(3, 3, "@", 3)
+        backend.flush()
+        backend.flush()  # nothing drawn, nothing recorded
+        backend.text(2, 2, "help!", 2)
+        backend.flush()
+        writer.close()
+
+        with open(cast) as f:
+            header = json.loads(f.readline())
+            assert (header["version"], header["width"], header["height"]) == (2, 30, 10)
+            f.seek(0)
+            assert len(list(events(f))) == 2
+
+        replayed = io.StringIO()
+        with open(cast) as f:
+            assert play(f, replayed, speed=0) == 2
+        assert screen(replayed.getvalue()) == screen(out.getvalue().decode())
+        assert writer.frames == 2
+
+    def test_ansi_output_recorded(self, cast):
+        out = io.BytesIO()
+        writer = CastWriter(cast, 10, 30)
+        backend = AnsiBackend(out, 10, 30)
+        assert record(backend, writer) is backend
+        backend.setup()
+
+        backend.text(2, 2, "hello", 2)
+        backend.flush()
+        backend.put(3, 3, "@", 3)
+        backend.flush()
+        writer.close()
+
+        replayed = io.StringIO()
+        with open(cast) as f:
+            assert play(f, replayed, speed=0) == 3
+        assert screen(replayed.getvalue()) == screen(out.getvalue().decode())
+        assert isinstance(record(NullBackend(), writer), RecordingBackend)
+
+    def test_partial_event_skipped(self, cast):
+        with open(cast, "w") as f:
+            f.write(json.dumps({"version": 2, "width": 10, "height": 5}) + "\n")
+            f.write(json.dumps([0.1, "o", "a"]) + "\n")
+            f.write(json.dumps([0.2, "i", "q"]) + "\n")
+            f.write('[0.3, "o", "b')
+
+        with open(cast) as f:
+            assert list(events(f)) == [(0.1, "a")]
+
+    def test_not_a_cast(self, cast):
+        with open(cast, "w") as f:
+            f.write(json.dumps({"version": 1}) + "\n")
+        with open(cast) as f, pytest.raises(ValueError):
+            list(events(f))
+
+    def test_game_frames_recorded(self, cast):
+        writer = CastWriter(cast, 40, 160)
+        game = Game.headless(seed=3, backend=RecordingBackend(NullBackend(), writer))
+        for _ in range(5):
+            game.player.move(dx=1)
+            game.tick()
+            game.render_all()
+            game.print_stats()
+            game.backend.flush()
+        writer.close()
+
+        with open(cast) as f:
+            frames = list(events(f))
+        assert len(frames) == writer.events == 5
+        assert all(t2 >= t1 for (t1, _), (t2, _) in zip(frames, frames[1:]))
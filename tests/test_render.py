@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import pytest
+
+from ctower.main import Game
+from ctower.lib.render import AnsiBackend, NullBackend, glyph, PALETTE
+from ctower.lib.render import ALTCHARSET, ACS_HLINE
+
+
+@pytest.fixture
+def out():
+    return io.BytesIO()
+
+
+@pytest.fixture
+def ansi(out):
+    return AnsiBackend(out, rows=10, cols=20)
+
+
+class TestGlyph:
+    def test_plain_symbols(self):
+        assert glyph("@") == "@"
+        assert glyph(ord("#")) == "#"
+
+    def test_alternative_charset(self):
+        assert glyph(ACS_HLINE) == "─"
+        assert glyph(4194430) == "·"  # curses.ACS_BULLET
+
+    def test_palette_has_every_pair(self):
+        assert sorted(PALETTE) == list(range(1, 19))
+
+
+class TestAnsiBackend:
+    def test_frame_is_one_write(self, ansi, out):
+        ansi.put(1, 1, "a", 1)
+        ansi.put(1, 2, "b", 1)
+        ansi.put(3, 5, "c", 5)
+
+        n = ansi.flush()
+        data = out.getvalue()
+        assert n == len(data) == ansi.frame_bytes
+        assert data.count(b"\x1b[2;2H") == 1
+        assert b"ab" in data  # adjacent cells share the cursor move
+        assert b"\x1b[4;6H" in data
+        assert b"\x1b[38;5;3;48;5;0m" in data
+
+    def test_only_changes_are_written(self, ansi, out):
+        ansi.put(1, 1, "a", 1)
+        ansi.flush()
+
+        ansi.put(1, 1, "a", 1)
+        assert ansi.flush() == 0
+
+        ansi.put(1, 1, "b", 1)
+        assert ansi.flush() > 0
+        assert out.getvalue().endswith(b"b")
+
+    def test_cells_outside_the_terminal_are_clipped(self, ansi):
+        ansi.put(10, 0, "a")
+        ansi.text(0, 18, "abc")
+        assert set(ansi.wanted) == {(0, 18), (0, 19)}
+
+    def test_unicode_is_encoded(self, ansi, out):
+        ansi.put(0, 0, ALTCHARSET | ord("`"), 7)
+        ansi.flush()
+        assert "◆".encode() in out.getvalue()
+
+    def test_setup_and_close(self, ansi, out):
+        ansi.setup()
+        assert out.getvalue().startswith(b"\x1b[?1049h")
+        assert ansi.flush() > 0  # window border
+        ansi.close()
+        assert out.getvalue().endswith(b"\x1b[?1049l")
+
+
+class TestGameRendering:
+    def test_null_backend_counts_cells(self):
+        backend = NullBackend()
+        game = Game.headless(seed=1, backend=backend)
+        game.render_all()
+        game.print_stats()
+        assert backend.cells >= len(game.screen_area)
+        assert backend.flush() == 0
+
+    def test_second_frame_is_a_diff(self, out):
+        backend = AnsiBackend(out, rows=40, cols=160)
+        game = Game.headless(40, 160, seed=1, backend=backend)
+        game.render_all()
+        game.print_stats()
+        first = backend.flush()
+
+        game.tick(lambda: game.player.move(dx=1))
+        game.render_all()
+        game.print_stats()
+        second = backend.flush()
+
+        assert 0 < second < first / 10
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from ctower.lib.scenarios import SCENARIOS, build, spec_of
+from ctower.lib.bench import bench, percentile
+
+
+@pytest.fixture
+def spec():
+    return {
+        "seed": 5,
+        "spawners": 4,
+        "zombies": 300,
+        "mines": 10,
+        "cannons": 10,
+        "satelites": 2,
+        "lanterns": 3,
+        "bombs": 2,
+    }
+
+
+class TestScenarios:
+    def test_counts(self, spec):
+        game = build(spec)
+        assert len(game.spawners) == 4
+        assert len(game.enemies) == 300
+        assert len(game.mines) == len(game.cannons) == 10
+        assert len(game.satelites) == 2
+        assert len(game.linterns) == 3
+        assert len(game.bombs_activated) == 2
+        assert game.base.deployed
+
+    def test_buildings_are_wired(self, spec):
+        game = build(spec)
+        assert len(game.economy.buildings) == 20
+        assert len(game.coverage) == 20
+
+    def test_same_spec_same_world(self, spec):
+        a, b = build(spec), build(spec)
+        for _ in range(50):
+            a.tick()
+            b.tick()
+        assert [(e.y, e.x) for e in a.enemies] == [(e.y, e.x) for e in b.enemies]
+
+    def test_zombies_are_not_capped(self):
+        game = build({"zombies": 3000})
+        game.tick()
+        assert len(game.enemies) >= 2990
+
+    def test_unknown_keys(self):
+        with pytest.raises(ValueError):
+            spec_of({"dragons": 1})
+        with pytest.raises(ValueError):
+            spec_of("nowhere")
+
+    def test_does_not_fit(self):
+        with pytest.raises(ValueError):
+            build({"height": 10, "width": 10, "lanterns": 1000})
+
+    @pytest.mark.parametrize("name", sorted(SCENARIOS))
+    def test_builtin_specs_are_valid(self, name):
+        assert spec_of(name)["seed"] == 0
+
+
+class TestBench:
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 51
+        assert percentile(values, 99) == 100
+        assert percentile([], 99) == 0.0
+
+    def test_report(self, spec):
+        result = bench(spec, ticks=20, render=True, name="test")
+        assert result["scenario"] == "test"
+        assert result["ticks"] == 20
+        assert result["ticks_per_second"] > 0
+        assert result["frame_ms_p99"] >= result["frame_ms_p50"] > 0
+        assert result["peak_rss_kb"] > 0
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import time
+import pytest
+
+from ctower.lib.entities import Enemy, Cannon
+from ctower.lib.sharding import LocalEngine, ShardedEngine, band, move_enemy
+from ctower.lib import sharding
+from ctower.main import Game
+
+
+@pytest.fixture
+def sharded():
+    engine = ShardedEngine(shards=3, capacity=1000)
+    yield engine
+    engine.close()
+
+
+def crowded_game(seed):
+    """
+    a game with a horde spread over the whole map and some buildings
+    """
+    game = Game.headless(seed=seed)
+    game.player.health = game.base.health = 10**9
+    rng = random.Random(seed)
+    for uid in range(1, 301):
+        game.enemies.append(
+            Enemy(rng.randint(1, game.max_y), rng.randint(1, game.max_x), uid=-uid)
+        )
+    game.cannons = [
+        Cannon(rng.randint(1, game.max_y), rng.randint(1, game.max_x), health=10**9)
+        for _ in range(20)
+    ]
+    return game
+
+
+def state(game):
+    return [(e.uid, e.y, e.x, e.level) for e in game.enemies], game.player.points
+
+
+class TestBands:
+    def test_every_row_has_one_owner(self):
+        owners = [band(y, 1, 35, 4) for y in range(1, 36)]
+        assert owners == sorted(owners)
+        assert set(owners) == {0, 1, 2, 3}
+
+    def test_random_walk_is_deterministic(self):
+        limits = (1, 35, 1, 158)
+        assert move_enemy(10, 10, 7, [], 3, 42, limits) == move_enemy(
+            10, 10, 7, [], 3, 42, limits
+        )
+
+
+class TestShardedEngine:
+    def test_same_outcome_as_local_engine(self, sharded):
+        local = crowded_game(seed=11)
+        shards = crowded_game(seed=11)
+        shards.engine = sharded
+
+        for _ in range(1500):
+            local.tick()
+            shards.tick()
+
+        assert state(local) == state(shards)
+        assert sharded.handoffs > 0
+        assert sharded.fallbacks == 0
+
+    def test_zombies_kept_in_their_band(self, sharded):
+        game = crowded_game(seed=12)
+        game.engine = sharded
+        for _ in range(300):
+            game.tick()
+
+        min_y, max_y = game.min_y, game.max_y
+        residents = sharded.residents
+        assert sum(map(len, residents)) == len(game.enemies)
+        for shard, enemies in enumerate(residents):
+            lo = shard * sharded.capacity
+            for index, enemy in enumerate(enemies):
+                assert band(enemy.y, min_y, max_y, 3) == shard
+                assert sharded.block.ys[lo + index] == enemy.y
+                assert sharded.block.uids[lo + index] == enemy.uid
+
+    def test_pooled_zombie_taken_again(self, sharded):
+        game = crowded_game(seed=13)
+        local = crowded_game(seed=13)
+        game.engine = sharded
+        for g in (game, local):
+            for _ in range(10):
+                g.tick()
+            # the same object comes back, somewhere else and with a new uid
+            enemy = g.enemies[0]
+            g.pool.release(enemy)
+            g.enemies[0] = g.pool.acquire(Enemy, 2, 2, uid=10**6)
+            assert g.enemies[0] is enemy
+            for _ in range(50):
+                g.tick()
+        assert state(game) == state(local)
+
+    def test_dead_worker(self, monkeypatch):
+        monkeypatch.setattr(sharding, "TIMEOUT", 0.5)
+        engine = ShardedEngine(shards=2, capacity=10)
+        enemies = [Enemy(5, 5, uid=1)]
+        engine.move(enemies, [(9, 9)], 0, 1, (1, 35, 1, 158))
+        # killed while waiting for the next step
+        engine.workers[0].kill()
+        engine.workers[0].join()
+
+        t0 = time.perf_counter()
+        engine.move(enemies, [(9, 9)], 1, 1, (1, 35, 1, 158))
+        engine.close()
+        assert time.perf_counter() - t0 < 2 * sharding.TIMEOUT + 1
+        assert (enemies[0].y, enemies[0].x) == (7, 7)
+        assert engine.failed and engine.fallbacks == 1
+        assert not any(worker.is_alive() for worker in engine.workers)
+
+    def test_close_with_dead_worker(self):
+        engine = ShardedEngine(shards=2, capacity=10)
+        engine.workers[1].kill()
+        engine.workers[1].join()
+
+        t0 = time.perf_counter()
+        engine.close()
+        assert time.perf_counter() - t0 < sharding.TIMEOUT
+        assert not any(worker.is_alive() for worker in engine.workers)
+
+    def test_falls_back_beyond_capacity(self):
+        engine = ShardedEngine(shards=2, capacity=2)
+        try:
+            enemies = [Enemy(5, 5, uid=i) for i in range(3)]
+            expected = [Enemy(5, 5, uid=i) for i in range(3)]
+            limits = (1, 35, 1, 158)
+            engine.move(enemies, [(9, 9)], 0, 1, limits)
+            LocalEngine().move(expected, [(9, 9)], 0, 1, limits)
+            assert enemies == expected
+            assert engine.fallbacks == 1
+        finally:
+            engine.close()
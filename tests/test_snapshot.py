@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import dataclasses
+import io
+import time
+import pytest
+
+from ctower.main import Game
+from ctower.lib.entities import Bomb, Lintern
+from ctower.lib.render import AnsiBackend
+from ctower.lib.snapshot import RenderThread
+
+
+@pytest.fixture
+def game():
+    return Game.headless(40, 160, seed=2)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    return condition()
+
+
+class TestSnapshot:
+    def test_is_immutable(self, game):
+        snapshot = game.snapshot()
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            snapshot.tick = 1
+        assert isinstance(snapshot.layers, tuple)
+
+    def test_static_layers_are_shared(self, game):
+        a = game.snapshot()
+        game.tick()
+        b = game.snapshot()
+        assert a.layers[0] is b.layers[0]  # mountains
+
+        game.linterns.append(Lintern(3, 3))
+        c = game.snapshot()
+        assert c.layers[4] is not b.layers[4]
+        assert (3, 3) in [(y, x) for y, x, _, _ in c.layers[4]]
+
+    def test_does_not_follow_the_world(self, game):
+        snapshot = game.snapshot()
+        y, x = game.player.y, game.player.x
+        game.player.move(dx=1)
+        assert snapshot.lights[0][0] == (y, x)
+        assert (y, x) in [(y, x) for y, x, _, _ in snapshot.layers[-1]]
+
+
+class TestDraw:
+    def test_blast_marks_give_way_to_fog(self, game):
+        game.backend = AnsiBackend(io.BytesIO(), rows=40, cols=160)
+        bomb = Bomb(5, 5, t0=game.now)
+        game.bombs_activated = [bomb]
+        game.render_all()
+        assert game.backend.wanted[5, 5] == ("~", 6)
+
+        game.explode([bomb])
+        game.render_all()
+        assert game.backend.wanted[5, 5] == ("-", 2)
+
+
+class TestRenderThread:
+    def test_draws_the_latest_snapshot(self):
+        drawn = []
+        renderer = RenderThread(drawn.append, fps=1000).start()
+        try:
+            assert renderer.wanted
+            renderer.publish("a")
+            assert wait_for(lambda: drawn == ["a"])
+            assert wait_for(lambda: renderer.wanted)
+        finally:
+            renderer.stop()
+
+    def test_simulation_is_not_held_by_rendering(self, game):
+        renderer = RenderThread(lambda snapshot: time.sleep(0.05)).start()
+        try:
+            t0 = time.perf_counter()
+            for _ in range(100):
+                game.tick()
+                if renderer.wanted:
+                    renderer.publish(game.snapshot())
+            elapsed = time.perf_counter() - t0
+        finally:
+            renderer.stop()
+
+        assert renderer.published < 100
+        assert elapsed < 100 * 0.05 / 2
+
+    def test_lock_pauses_drawing(self):
+        drawn = []
+        renderer = RenderThread(drawn.append, fps=1000).start()
+        try:
+            with renderer.lock:
+                renderer.publish("a")
+                time.sleep(0.02)
+                assert drawn == []
+            assert wait_for(lambda: drawn == ["a"])
+        finally:
+            renderer.stop()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import curses
+import json
+import pytest
+
+from ctower.lib.telemetry import Telemetry, METRICS, TICK, RENDER
+from ctower.lib.pacing import FramePacer
+from ctower.lib.render import NullBackend
+from ctower.main import Game
+from ctower import main
+
+
+class FakeScreen:
+    def __init__(self, keys):
+        self.keys = list(keys)
+
+    def timeout(self, ms):
+        pass
+
+    def getch(self):
+        return self.keys.pop(0) if self.keys else curses.ERR
+
+
+@pytest.fixture
+def game():
+    return Game.headless(seed=1)
+
+
+def record(telemetry, game, ticks):
+    for tick in range(ticks):
+        telemetry.begin(TICK)
+        game.tick()
+        telemetry.end(TICK)
+        telemetry.sample(game, tick, 0.001)
+
+
+class TestTelemetry:
+    def test_jsonl(self, game, tmp_path):
+        path = tmp_path / "metrics.jsonl"
+        telemetry = Telemetry(path)
+        record(telemetry, game, 100)
+        telemetry.close()
+
+        rows = [json.loads(line) for line in path.read_text().splitlines()]
+        assert len(rows) == 100
+        assert set(rows[0]) == set(METRICS)
+        assert rows[-1]["enemies"] == len(game.enemies)
+
+    def test_prometheus(self, game, tmp_path):
+        path = tmp_path / "metrics.prom"
+        telemetry = Telemetry(path, fmt="prom")
+        record(telemetry, game, 10)
+        telemetry.close()
+
+        text = path.read_text()
+        assert "# TYPE ctower_tick counter" in text
+        assert "ctower_tick 9.0" in text
+        assert "# TYPE ctower_gold gauge" in text
+
+    def test_trace(self, game, tmp_path):
+        path = tmp_path / "trace.json"
+        telemetry = Telemetry(trace_path=path)
+        record(telemetry, game, 5)
+        telemetry.begin(RENDER)
+        telemetry.end(RENDER)
+        telemetry.close()
+
+        events = json.loads(path.read_text())
+        assert [e["name"] for e in events] == ["tick"] * 5 + ["render"]
+        assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+
+    def test_full_buffer_drops(self, game, tmp_path):
+        telemetry = Telemetry(tmp_path / "m.jsonl", capacity=4, interval=60)
+        telemetry.wakeup.set = lambda: None  # keep the writer asleep
+        record(telemetry, game, 6)
+        telemetry.end(RENDER)
+        assert telemetry.dropped_samples == 2
+        assert telemetry.dropped_spans == 3
+
+        del telemetry.wakeup.set
+        telemetry.close()
+
+    def test_catch_up_ticks_numbered(self, game, tmp_path, monkeypatch):
+        class Behind(FramePacer):
+            def due(self):
+                self.ticks += 3
+                return 3
+
+        monkeypatch.setattr(main, "FramePacer", Behind)
+        game.screen = FakeScreen([ord("q")])
+        game.backend = NullBackend(*game.size)
+        game.telemetry = Telemetry(tmp_path / "m.jsonl")
+        with pytest.raises(SystemExit):
+            game.loop()
+        game.telemetry.close()
+
+        records = [json.loads(line) for line in open(tmp_path / "m.jsonl")]
+        assert [r["tick"] for r in records] == [1, 2, 3]
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            Telemetry(fmt="csv")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import pytest
+
+from ctower.lib import archetypes, tuning
+from ctower.lib.entities import Mine, Satelite
+from ctower.lib.settings import Settings
+from ctower.lib.tuning import Watcher
+from ctower.main import Game
+
+
+@pytest.fixture(autouse=True)
+def settings():
+    """
+    restores the Settings constants and the archetypes changed by a test
+    """
+    saved = {name: getattr(Settings, name) for name in tuning.TYPES}
+    table = archetypes.active()
+    yield
+    for name, value in saved.items():
+        setattr(Settings, name, value)
+    archetypes.use(table)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "settings.json"
+
+
+def write(path, definition, mtime=None):
+    path.write_text(json.dumps(definition))
+    if mtime is not None:
+        # a later modification time, whatever the file system resolution
+        os.utime(path, ns=(mtime, mtime))
+
+
+class TestCompile:
+    @pytest.mark.parametrize(
+        "definition",
+        [
+            {"settings": {"NO_SUCH_SETTING": 1}},
+            {"settings": {"MINE_INITIAL_COST": 10}},
+            {"settings": {"ENEMY_SOFT_CAP": "many"}},
+            {"settings": {"ENEMY_SOFT_CAP": True}},
+            {"settings": {"ENEMY_SOFT_CAP": -1}},
+            {"settings": {"FPS": 0}},
+            {"settings": {"ENEMY_CAP_POLICY": "ignore"}},
+            {"settings": [1]},
+            {"archetypes": {"max_level": 0}},
+            {"migrate": "yes"},
+            {"setting": {}},
+        ],
+    )
+    def test_invalid(self, definition):
+        with pytest.raises(ValueError):
+            tuning.compile(definition)
+
+    def test_float_accepts_int(self):
+        update = tuning.compile({"settings": {"IDLE_TIMEOUT": 1}})
+        assert update.settings["IDLE_TIMEOUT"] == 1
+
+    def test_apply_and_revert(self):
+        changed = tuning.compile({"settings": {"SPAWN_RATE": 9}}).apply()
+        assert changed == {"SPAWN_RATE"}
+        assert Settings.SPAWN_RATE == 9
+
+        changed = tuning.compile({}).apply()
+        assert changed == {"SPAWN_RATE"}
+        assert Settings.SPAWN_RATE == tuning.DEFAULTS["SPAWN_RATE"]
+
+    def test_archetypes_path(self, path, tmp_path):
+        definition = archetypes.read()
+        definition["kinds"]["Satelite"]["visibility"] = 12
+        (tmp_path / "balance.json").write_text(json.dumps(definition))
+        write(path, {"archetypes": "balance.json"})
+
+        changed = tuning.load(path).apply()
+        assert changed == {"SATELITE_VISIBILITY"}
+        assert Settings.SATELITE_VISIBILITY == 12
+
+
+class TestWatcher:
+    def test_reloads_on_change(self, path):
+        write(path, {"settings": {"ENEMY_SOFT_CAP": 100}})
+        watcher = Watcher(path, interval=60).start()
+        try:
+            assert watcher.take().settings["ENEMY_SOFT_CAP"] == 100
+            assert watcher.take() is None
+            assert not watcher.check()
+
+            stamp = watcher.stamp[0]
+            write(path, {"settings": {"ENEMY_SOFT_CAP": 200}}, mtime=stamp + 10**9)
+            assert watcher.check()
+            assert watcher.take().settings["ENEMY_SOFT_CAP"] == 200
+        finally:
+            watcher.stop()
+
+    def test_invalid_file_ignored(self, path):
+        write(path, {"settings": {"ENEMY_SOFT_CAP": "many"}})
+        watcher = Watcher(path, interval=60)
+        assert not watcher.check()
+        assert watcher.pending is None
+        assert "ENEMY_SOFT_CAP" in watcher.error
+
+        path.write_text("{")
+        os.utime(path, ns=(watcher.stamp[0] + 10**9,) * 2)
+        assert not watcher.check()
+        assert watcher.errors == 2
+
+    def test_zero_timer_ignored(self, path):
+        definition = archetypes.read()
+        definition["buildings"]["Mine"]["timer"] = 0
+        write(path, {"archetypes": definition})
+        watcher = Watcher(path, interval=60)
+        assert not watcher.check()
+        assert "timer" in watcher.error
+
+    def test_missing_file(self, tmp_path):
+        watcher = Watcher(tmp_path / "nothing.json")
+        assert not watcher.check()
+        assert watcher.error is None
+
+
+class TestRetune:
+    def game(self, path, definition):
+        write(path, definition)
+        game = Game.headless(seed=4)
+        game.watcher = Watcher(path, interval=60)
+        game.watcher.check()
+        return game
+
+    def test_derived_state(self, path):
+        definition = archetypes.read()
+        definition["kinds"]["Satelite"]["visibility"] = 3
+        game = self.game(
+            path,
+            {
+                "settings": {"ENEMY_SOFT_CAP": 7, "ENEMY_COHORTS": 2, "POOL_LIMIT": 3},
+                "archetypes": definition,
+            },
+        )
+        game.enemy_phase = 4
+        game.satelites.append(Satelite(3, 3))
+        static = game.snapshot().static_lights
+
+        game.retune()
+        assert (game.caps.soft, game.caps.hard) == (7, Settings.ENEMY_HARD_CAP)
+        assert (game.enemy_cohorts, game.enemy_phase) == (2, 0)
+        assert game.pool.limit == 3
+        assert game.placement.reach == game.coverage.reach == 3
+        assert static[0][1] == 10
+        assert game.snapshot().static_lights[0][1] == 3
+        game.tick()
+
+    def test_entities_keep_stats(self, path):
+        definition = archetypes.read()
+        definition["buildings"]["Mine"]["production_rate"] = 100
+        game = self.game(path, {"archetypes": definition})
+        mine = Mine(5, 5)
+        rate = mine.production_rate
+        game.mines.append(mine)
+
+        game.retune()
+        assert mine.production_rate == rate
+        assert Mine(6, 6).production_rate == 100
+
+    def test_migrate(self, path):
+        definition = archetypes.read()
+        definition["buildings"]["Mine"]["production_rate"] = 100
+        game = self.game(path, {"archetypes": definition, "migrate": True})
+        mine = Mine(5, 5)
+        mine.health -= 1
+        health = mine.health
+        game.mines.append(mine)
+
+        game.retune()
+        assert mine.production_rate == 100
+        assert mine.health == health